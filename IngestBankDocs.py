@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Index a bank's documents into its RAG collection (one collection per bank,
+with `text`, `source` and `embedding` fields, plus `content_hash`).
+
+Documents (.txt / .md files, or directories of them) are read one at a time
+and split into paragraph-based chunks, so an edit only changes the chunks
+around it. Every chunk is keyed by the SHA-256 of its text: chunks already
+in the collection for that source are kept as they are, new chunks are
+embedded in batches and bulk-inserted, and chunks that disappeared from the
+source are deleted. Re-indexing an updated brochure therefore only embeds
+and writes the chunks that changed. A chunk's source is its path relative to
+the directory given on the command line (or the file name for a file), so
+same-named files in different folders are kept apart.
+
+    python IngestBankDocs.py --bank BankA docs/banka/
+
+Writes to Milvus, or to the local NumPy store when VECTOR_BACKEND=numpy.
+Configuration: VECTOR_BACKEND, INGEST_BATCH_SIZE, CHUNK_MIN_CHARS, CHUNK_MAX_CHARS, CHUNK_OVERLAP_CHARS.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+from tools.vectorstore import NumpyVectorStore, get_vector_store, vector_backend
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DOC_EXTENSIONS = (".txt", ".md")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def _paragraphs(lines: Iterable[str]) -> Iterator[str]:
+    current: List[str] = []
+    for line in lines:
+        if line.strip():
+            current.append(line.strip())
+        elif current:
+            yield " ".join(current)
+            current = []
+    if current:
+        yield " ".join(current)
+
+
+def _split_long(text: str, max_chars: int, overlap: int) -> Iterator[str]:
+    words = text.split()
+    start = 0
+    while start < len(words):
+        end, length = start, 0
+        while end < len(words) and (length + len(words[end]) + 1 <= max_chars or end == start):
+            length += len(words[end]) + 1
+            end += 1
+        yield " ".join(words[start:end])
+        if end >= len(words):
+            return
+        # Step back so consecutive windows share about `overlap` characters.
+        back, kept = end, 0
+        while back > start + 1 and kept + len(words[back - 1]) + 1 <= overlap:
+            back -= 1
+            kept += len(words[back]) + 1
+        start = back
+
+
+def chunk_lines(
+    lines: Iterable[str],
+    min_chars: int | None = None,
+    max_chars: int | None = None,
+    overlap: int | None = None,
+) -> Iterator[str]:
+    """
+    Split a document into chunks, streaming over its lines.
+    Paragraphs (separated by blank lines) shorter than min_chars are merged
+    with the following ones; paragraphs longer than max_chars are split into
+    overlapping word windows. Boundaries depend only on nearby paragraphs,
+    so editing one paragraph leaves the other chunks, and their hashes, intact.
+    Args:
+        lines (Iterable[str]): The document's lines.
+        min_chars (int | None): Smallest chunk worth indexing on its own.
+        max_chars (int | None): Largest chunk.
+        overlap (int | None): Characters shared by consecutive windows of a long paragraph.
+    Yields:
+        str: The chunks, in document order.
+    """
+    min_chars = min_chars or int(os.getenv("CHUNK_MIN_CHARS", "200"))
+    max_chars = max_chars or int(os.getenv("CHUNK_MAX_CHARS", "1000"))
+    overlap = overlap if overlap is not None else int(os.getenv("CHUNK_OVERLAP_CHARS", "150"))
+
+    pending = ""
+    for paragraph in _paragraphs(lines):
+        pending = f"{pending} {paragraph}".strip() if pending else paragraph
+        if len(pending) < min_chars:
+            continue
+        yield from _split_long(pending, max_chars, overlap) if len(pending) > max_chars else [pending]
+        pending = ""
+    if pending:
+        yield from _split_long(pending, max_chars, overlap) if len(pending) > max_chars else [pending]
+
+
+def _relative_source(path: str, root: str) -> str:
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def iter_documents(paths: Sequence[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (path, source) for every .txt/.md file under the given files and
+    directories, in sorted order. The source is the path relative to the
+    directory it was found under, or the file name for a file argument.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    if name.lower().endswith(DOC_EXTENSIONS):
+                        full = os.path.join(root, name)
+                        yield full, _relative_source(full, path)
+        else:
+            yield path, os.path.basename(path)
+
+
+class MilvusSink:
+    """
+    Writes chunks to a Milvus collection, creating it (with an IVF_FLAT index)
+    if needed and loading it so existing chunks can be queried.
+    """
+    def __init__(self, collection_name: str, dim: int, nlist: int = 128):
+        from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+        from tools.ragtools import connect_milvus
+        connect_milvus()
+        if not utility.has_collection(collection_name):
+            schema = CollectionSchema([
+                FieldSchema("id", DataType.INT64, is_primary=True, auto_id=True),
+                FieldSchema("text", DataType.VARCHAR, max_length=8192),
+                FieldSchema("source", DataType.VARCHAR, max_length=1024),
+                FieldSchema("content_hash", DataType.VARCHAR, max_length=64),
+                FieldSchema("embedding", DataType.FLOAT_VECTOR, dim=dim),
+            ], description=f"{collection_name} documents")
+            collection = Collection(collection_name, schema)
+            collection.create_index("embedding", {"index_type": "IVF_FLAT", "metric_type": "L2", "params": {"nlist": nlist}})
+            logger.info(f"Created Milvus collection {collection_name}")
+        self.collection = Collection(collection_name)
+        if "content_hash" not in {f.name for f in self.collection.schema.fields}:
+            raise RuntimeError(f"Collection {collection_name} has no content_hash field; drop it and ingest again")
+        # query() and delete() need the collection loaded.
+        self.collection.load()
+
+    def existing(self, source: str) -> Dict[str, List[Any]]:
+        """
+        Return every stored row id of a source, grouped by chunk hash.
+        """
+        rows = self.collection.query(expr=f"source == {json.dumps(source)}", output_fields=["id", "content_hash"])
+        ids: Dict[str, List[Any]] = {}
+        for row in rows:
+            ids.setdefault(row["content_hash"], []).append(row["id"])
+        return ids
+
+    def insert(self, rows: List[Dict[str, Any]], vectors: np.ndarray):
+        self.collection.insert([
+            [r["text"] for r in rows],
+            [r["source"] for r in rows],
+            [r["content_hash"] for r in rows],
+            vectors,
+        ])
+
+    def delete(self, ids: List[Any]):
+        self.collection.delete(f"id in {list(ids)}")
+
+    def finish(self):
+        self.collection.flush()
+
+
+class NumpySink:
+    """Rewrites a local NumPy collection, reusing the vectors of unchanged chunks."""
+    def __init__(self, collection_name: str, store: NumpyVectorStore | None = None, nlist: int = 0):
+        self.name = collection_name
+        self.store = store or get_vector_store()
+        self.nlist = nlist
+        self.docs: List[Dict[str, Any]] = []
+        self.vectors: List[np.ndarray] = []
+        self.dim: int | None = None
+        if self.store.exists(collection_name):
+            index = self.store.collection(collection_name)
+            self.docs = list(index.docs)
+            self.vectors = list(np.array(index.vectors))
+            self.dim = index.meta["dim"] or None
+        self._deleted: set = set()
+
+    def existing(self, source: str) -> Dict[str, List[Any]]:
+        ids: Dict[str, List[Any]] = {}
+        for i, doc in enumerate(self.docs):
+            if doc.get("source") == source:
+                ids.setdefault(doc.get("content_hash"), []).append(i)
+        return ids
+
+    def insert(self, rows: List[Dict[str, Any]], vectors: np.ndarray):
+        self.docs.extend(rows)
+        self.vectors.extend(vectors)
+        self.dim = vectors.shape[-1]
+
+    def delete(self, ids: List[Any]):
+        self._deleted.update(ids)
+
+    def finish(self):
+        if self.dim is None:
+            logger.warning(f"Nothing to index into {self.name}; not creating an empty collection")
+            return
+        keep = [i for i in range(len(self.docs)) if i not in self._deleted]
+        vectors = np.stack([self.vectors[i] for i in keep]) if keep else np.zeros((0, self.dim), dtype=np.float32)
+        self.store.build(self.name, vectors, [self.docs[i] for i in keep], nlist=self.nlist)
+
+
+class Ingestion:
+    """
+    Incremental, batched indexing of one bank's documents.
+    1. Streams each document into chunks and hashes them.
+    2. Skips chunks whose hash is already stored for that source.
+    3. Embeds new chunks in batches of INGEST_BATCH_SIZE and inserts each batch.
+    4. Deletes chunks that are no longer in the source, and duplicate rows
+       of a chunk left by earlier runs.
+    """
+    def __init__(self, sink, embed: Callable[[List[str]], Any], batch_size: int | None = None, chunker=chunk_lines):
+        self.sink = sink
+        self.embed = embed
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", "64"))
+        self.chunker = chunker
+        self.counts = {"documents": 0, "chunks": 0, "unchanged": 0, "embedded": 0, "deleted": 0}
+
+    def _flush(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        vectors = np.asarray(self.embed([r["text"] for r in rows]), dtype=np.float32)
+        self.sink.insert(rows, vectors)
+        self.counts["embedded"] += len(rows)
+
+    def ingest_document(self, path: str, source: str | None = None):
+        """
+        Index one document.
+        Args:
+            path (str): The file to read.
+            source (str | None): Name stored with its chunks; defaults to the file name.
+                run() passes the path relative to the ingest root.
+        """
+        source = source or os.path.basename(path)
+        existing = self.sink.existing(source)
+        seen, batch = set(), []
+        with open(path, encoding="utf-8") as f:
+            for text in self.chunker(f):
+                digest = content_hash(text)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                self.counts["chunks"] += 1
+                if digest in existing:
+                    self.counts["unchanged"] += 1
+                    continue
+                batch.append({"text": text, "source": source, "content_hash": digest})
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+        self._flush(batch)
+
+        # Keep one row per chunk still in the source; drop the rest.
+        stale = [row_id for digest, ids in existing.items() for row_id in (ids[1:] if digest in seen else ids)]
+        if stale:
+            self.sink.delete(stale)
+            self.counts["deleted"] += len(stale)
+        self.counts["documents"] += 1
+
+    def run(self, paths: Sequence[str]) -> Dict[str, int]:
+        started = time.monotonic()
+        for path, source in iter_documents(paths):
+            self.ingest_document(path, source)
+            logger.info(f"Indexed {path}: {self.counts}")
+        self.sink.finish()
+        logger.info(f"Ingestion finished in {time.monotonic() - started:.1f}s")
+        return self.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bank", required=True, help="Collection (bank) name.")
+    parser.add_argument("paths", nargs="+", help="Documents or directories of .txt/.md files.")
+    parser.add_argument("--batch-size", type=int, default=None, help="Chunks per embedding batch.")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (Milvus default 128, NumPy default 0 = exact).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    from tools.ragtools import get_embedder
+    model = get_embedder()
+
+    def embed(texts):
+        return model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+    if vector_backend() == "numpy":
+        sink = NumpySink(args.bank, nlist=args.nlist or 0)
+    else:
+        sink = MilvusSink(args.bank, dim=model.get_sentence_embedding_dimension(), nlist=args.nlist or 128)
+    print(Ingestion(sink, embed, batch_size=args.batch_size).run(args.paths))
+
+
+if __name__ == "__main__":
+    main()
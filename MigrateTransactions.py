@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Move transactions embedded in `cards` documents into the `transactions` collection.
+
+Cards are streamed in _id order, their embedded transactions normalized
+(transaction_store.normalize_transaction) and written with ordered bulk upserts
+keyed by a deterministic _id, so re-running never duplicates rows. Once a
+card's rows are written, the card is marked with the length of the array that
+was copied (transaction_store.MIGRATED_FIELD); dual reads stop falling back to
+marked cards. After every flushed batch the last fully written card _id is
+stored in the `migrations` collection; an interrupted run resumes from there.
+
+Rollout:
+    1. Deploy with TRANSACTIONS_READ_MODE=dual (reads fall back to embedded arrays).
+    2. python MigrateTransactions.py                 # resumable, re-runnable
+    3. Switch to TRANSACTIONS_READ_MODE=collection once verified.
+    4. python MigrateTransactions.py --unset-embedded  # drop the embedded arrays
+
+Configuration: MONGO_URI, MONGO_DB, MIGRATION_BATCH_SIZE.
+"""
+import os
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import get_db
+from transaction_store import MIGRATED_FIELD, ensure_indexes, normalize_transaction
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "split_card_transactions"
+
+
+class TransactionMigration:
+    """
+    A streaming, resumable split of embedded card transactions.
+    1. Streams cards that still embed transactions, resuming after the checkpointed _id.
+    2. Normalizes dates and amounts; malformed rows are counted and skipped.
+    3. Flushes ordered ReplaceOne upserts in batches at card boundaries, then
+       marks the flushed cards as migrated.
+    4. Checkpoints progress and logs throughput after every batch.
+    """
+    def __init__(self, db, batch_size: int | None = None):
+        self.cards = db["cards"]
+        self.transactions = db["transactions"]
+        self.migrations = db["migrations"]
+        self.batch_size = batch_size or int(os.getenv("MIGRATION_BATCH_SIZE", "1000"))
+        self.counts = {"cards": 0, "transactions": 0, "skipped": 0, "batches": 0}
+        self._started = time.monotonic()
+
+    def checkpoint(self) -> dict:
+        return self.migrations.find_one({"_id": MIGRATION_ID}) or {}
+
+    def _save_checkpoint(self, last_card_id, done: bool = False):
+        self.migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {
+                "$set": {"last_card_id": last_card_id, "done": done, "updated_at": datetime.now(timezone.utc)},
+                "$inc": dict(self._batch_counts),
+                "$setOnInsert": {"started_at": datetime.now(timezone.utc)},
+            },
+            upsert=True,
+        )
+
+    def _write(self, ops: list, marks: list, last_card_id):
+        if ops:
+            try:
+                self.transactions.bulk_write(ops, ordered=True)
+            except BulkWriteError as e:
+                logger.error(f"Batch after card {last_card_id} failed: {e.details.get('writeErrors', [])[:1]}")
+                raise
+        # Only after the rows exist, so a dual read never misses a card.
+        if marks:
+            self.cards.bulk_write(marks, ordered=False)
+
+    def _flush(self, ops: list, marks: list, last_card_id):
+        self._write(ops, marks, last_card_id)
+        self.counts["batches"] += 1
+        self._save_checkpoint(last_card_id)
+        self._batch_counts = {"cards": 0, "transactions": 0, "skipped": 0}
+
+        elapsed = time.monotonic() - self._started
+        rate = self.counts["transactions"] / elapsed if elapsed else 0.0
+        logger.info(
+            f"batch {self.counts['batches']}: cards={self.counts['cards']} "
+            f"transactions={self.counts['transactions']} skipped={self.counts['skipped']} "
+            f"({rate:,.0f} txn/s)"
+        )
+
+    def _count(self, name: str, n: int = 1):
+        self.counts[name] += n
+        self._batch_counts[name] += n
+
+    def _copy_card(self, card: dict, ops: list, marks: list):
+        txns = card.get("transactions") or []
+        for txn in txns:
+            try:
+                doc = normalize_transaction(card["clientId"], card["cardNumber"], txn)
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping transaction on card {card['_id']}: {e}")
+                self._count("skipped")
+                continue
+            ops.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+            self._count("transactions")
+        marks.append(UpdateOne({"_id": card["_id"]}, {"$set": {MIGRATED_FIELD: len(txns)}}))
+        self._count("cards")
+
+    def run(self, restart: bool = False) -> dict:
+        """
+        Migrate every card that still embeds transactions.
+        Args:
+            restart (bool): Ignore the stored checkpoint and start from the first card.
+        Returns:
+            dict: Cards, transactions, skipped rows and batches processed in this run.
+        """
+        ensure_indexes(self.transactions)
+        if restart:
+            self.migrations.delete_one({"_id": MIGRATION_ID})
+
+        query = {"transactions.0": {"$exists": True}}
+        last_card_id = self.checkpoint().get("last_card_id")
+        if last_card_id is not None:
+            logger.info(f"Resuming after card {last_card_id}")
+            query["_id"] = {"$gt": last_card_id}
+
+        self._batch_counts = {"cards": 0, "transactions": 0, "skipped": 0}
+        ops, marks = [], []
+        cursor = (
+            self.cards.find(query, {"clientId": 1, "cardNumber": 1, "transactions": 1})
+            .sort("_id", 1)
+            .batch_size(max(1, self.batch_size // 10))
+        )
+        for card in cursor:
+            self._copy_card(card, ops, marks)
+            last_card_id = card["_id"]
+
+            # Flush at card boundaries so the checkpoint never splits a card;
+            # counting marks too bounds runs of cards with only malformed rows.
+            if len(ops) >= self.batch_size or len(marks) >= self.batch_size:
+                self._flush(ops, marks, last_card_id)
+                ops, marks = [], []
+
+        if ops or self._batch_counts["cards"]:
+            self._flush(ops, marks, last_card_id)
+        self._save_checkpoint(last_card_id, done=True)
+        logger.info(f"Migration complete: {self.counts}")
+        return dict(self.counts)
+
+    @staticmethod
+    def _embedded_matches_migrated(equal: bool) -> dict:
+        size = {"$size": {"$ifNull": ["$transactions", []]}}
+        return {
+            MIGRATED_FIELD: {"$exists": True},
+            "transactions": {"$exists": True},
+            "$expr": {"$eq" if equal else "$ne": [size, f"${MIGRATED_FIELD}"]},
+        }
+
+    def recopy_changed(self) -> int:
+        """
+        Copy again the cards whose embedded array changed since they were
+        migrated (e.g. transactions appended by a legacy writer).
+        Returns:
+            int: Number of cards copied again.
+        """
+        self._batch_counts = {"cards": 0, "transactions": 0, "skipped": 0}
+        ops, marks, copied = [], [], 0
+        cursor = self.cards.find(
+            self._embedded_matches_migrated(False), {"clientId": 1, "cardNumber": 1, "transactions": 1}
+        ).sort("_id", 1)
+        for card in cursor:
+            self._copy_card(card, ops, marks)
+            copied += 1
+            if len(ops) >= self.batch_size or len(marks) >= self.batch_size:
+                self._write(ops, marks, card["_id"])
+                ops, marks = [], []
+        if marks:
+            self._write(ops, marks, None)
+        return copied
+
+    def unset_embedded(self) -> int:
+        """
+        Remove the embedded arrays of cards whose transactions were migrated.
+        Cards that changed since they were migrated are copied again first;
+        the unset only matches cards whose array still has the length that
+        was copied, so rows appended meanwhile are kept for the next run.
+        Returns:
+            int: Number of cards updated.
+        """
+        checkpoint = self.checkpoint()
+        if not checkpoint.get("done"):
+            raise RuntimeError("Run the migration to completion before unsetting embedded transactions.")
+        copied = self.recopy_changed()
+        if copied:
+            logger.info(f"Copied {copied} cards again that changed after migrating")
+        res = self.cards.update_many(self._embedded_matches_migrated(True), {"$unset": {"transactions": ""}})
+        logger.info(f"Removed embedded transactions from {res.modified_count} cards")
+        return res.modified_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=None, help="Transactions per bulk write.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over.")
+    parser.add_argument("--unset-embedded", action="store_true", help="Drop embedded arrays after migrating.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    migration = TransactionMigration(get_db(), batch_size=args.batch_size)
+    if args.unset_embedded:
+        migration.unset_embedded()
+    else:
+        print(migration.run(restart=args.restart))
+
+
+if __name__ == "__main__":
+    main()
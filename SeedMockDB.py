@@ -5,16 +5,19 @@ import calendar
 from datetime import datetime, timedelta, timezone
 
 from dotenv import load_dotenv
-from pymongo import MongoClient
-import bcrypt
+
+from database import get_client, db_name
+from tools.bcryptpool import get_bcrypt_pool
+from transaction_store import ensure_indexes, normalize_transaction
 
 load_dotenv()
 MONGODB_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-DB_NAME = os.getenv("MONGO_DB", "fransa_demo")
+DB_NAME = db_name()
 
-mongo = MongoClient(MONGODB_URI)[DB_NAME]
+mongo = get_client(MONGODB_URI)[DB_NAME]
 users = mongo["users"]
 cards = mongo["cards"]
+transactions = mongo["transactions"]
 
 def _stan() -> str:
     return datetime.utcnow().strftime("%H%M%S%f")[-12:]
@@ -69,6 +72,7 @@ def _card_doc(
     city: str,
     email: str,
     channelId: str,
+    pinHash: str,
     add_seed_txns: bool = True,
 ) -> dict:
     now = datetime.utcnow()
@@ -84,7 +88,7 @@ def _card_doc(
         "status": random.choice(["A", "B"]),
         "expiryDate": expiry,
         "cvv2": f"{random.randint(0, 999):03d}",
-        "pinHash": bcrypt.hashpw(b"1234", bcrypt.gensalt()).decode(),
+        "pinHash": pinHash,
         "availableBalance": round(random.uniform(10, 1000), 2),
         "currentBalance": round(random.uniform(10, 1000), 2),
         "cashback": round(random.uniform(0, 50), 2),
@@ -119,6 +123,8 @@ def _card_doc(
 def main():
     users.delete_many({})
     cards.delete_many({})
+    transactions.delete_many({})
+    ensure_indexes(transactions)
 
     users_seed = [
         {
@@ -144,9 +150,13 @@ def main():
     ]
     users.insert_many(users_seed)
 
+    # Hash every card's PIN in parallel on the bcrypt pool.
+    currencies = [(user, random.sample(["840", "422", "978"], 3)) for user in users_seed]
+    pin_hashes = iter(get_bcrypt_pool().hash_many(["1234"] * sum(len(c) for _, c in currencies)))
+
     card_docs = []
-    for user in users_seed:
-        for currency in random.sample(["840", "422", "978"], 3):
+    for user, user_currencies in currencies:
+        for currency in user_currencies:
             card_docs.append(
                 _card_doc(
                     clientId=user["clientId"],
@@ -157,14 +167,24 @@ def main():
                     city="Beirut",
                     email=user["email"],
                     channelId=random.choice(["WEB", "MOB"]),
+                    pinHash=next(pin_hashes),
                 )
             )
 
+    # Transactions are stored normalized in their own collection, not embedded in the card.
+    txn_docs = [
+        normalize_transaction(doc["clientId"], doc["cardNumber"], txn)
+        for doc in card_docs
+        for txn in doc.pop("transactions")
+    ]
     cards.insert_many(card_docs)
+    if txn_docs:
+        transactions.insert_many(txn_docs)
 
     ucount = users.count_documents({})
     ccount = cards.count_documents({})
-    print(f"Seed complete. users={ucount}, cards={ccount}")
+    tcount = transactions.count_documents({})
+    print(f"Seed complete. users={ucount}, cards={ccount}, transactions={tcount}")
     print("Sample cards:")
     for c in cards.find({}, {"_id": 0, "clientId": 1, "cardToken": 1, "currency": 1, "status": 1}).limit(6):
         print(c)
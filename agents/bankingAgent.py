@@ -1,9 +1,10 @@
 import os
 import logging
-from typing import Dict, Any
+from typing import Any
 from dotenv import load_dotenv
 from langchain_ollama import ChatOllama
 from langgraph.prebuilt import ToolNode
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from tools.mcptools import build_banking_tools
 from prompts.banking_prompt import banking_prompt
 from langgraph.graph import MessagesState, StateGraph, START, END
@@ -14,37 +15,67 @@ logger = logging.getLogger(__name__)
 class BankingAgent:
     """
     An agent for handling banking-related queries using LLMs and tools.
-    1. Initializes with user context and builds banking tools.
-    2. Defines an LLM node to process messages and add system prompts if missing.
+    1. Binds the shared banking tools to the LLM once.
+    2. Defines an LLM node that prepends the system prompt to each call and
+       logs the prompt-token count reported by the model.
     3. Implements a router to decide whether to continue with tool calls or end.
-    4. Constructs a state graph connecting the LLM and tool nodes.
+    4. Constructs and compiles a state graph connecting the LLM and tool nodes.
+    The compiled graph is reused across invocations; the user's context is
+    passed per run through config["configurable"]["user_ctx"]. It never
+    inherits the intent graph's checkpointer: its messages carry tool-call
+    arguments such as PINs, so only the final answer is persisted.
     """
-    def __init__(self, user_ctx: Dict[str, Any]):
-        self.user_ctx = user_ctx
-        self.tools = build_banking_tools(user_ctx)
+    def __init__(self):
+        self.tools = build_banking_tools()
         self.llm = ChatOllama(
             model=os.getenv("MODEL_NAME"),
             temperature=0
         ).bind_tools(self.tools)
+        self.graph = self.build()
 
 
+    @staticmethod
+    def _with_system_prompt(messages: list) -> list:
+        # The system prompt is added per call and never written to the state,
+        # so tool-call loops do not accumulate copies of it.
+        return [{"role": "system", "content": banking_prompt()}] + list(messages)
+
+    @staticmethod
+    def _log_usage(ai_msg):
+        usage = getattr(ai_msg, "usage_metadata", None)
+        if usage:
+            logger.info(
+                f"Banking LLM call: {usage.get('input_tokens')} prompt tokens, "
+                f"{usage.get('output_tokens')} completion tokens"
+            )
+
     def llm_node(self, state: MessagesState):
         """
-        LLM NODE: Processes messages and adds system prompt if missing.
+        LLM NODE: Processes messages with the system prompt prepended.
         Args:
             state (MessagesState): The current state containing messages.
         Returns:
-            MessagesState: Updated state with LLM response.
+            MessagesState: The LLM response, appended to the state by the reducer.
+        """
+        messages = state["messages"]
+        logger.debug(f"LLM Node received messages: {messages}")
+
+        ai_msg = self.llm.invoke(self._with_system_prompt(messages))
+        logger.debug(f"LLM response: {ai_msg}")
+        self._log_usage(ai_msg)
+        return {"messages": [ai_msg]}
+
+    async def allm_node(self, state: MessagesState):
+        """
+        Async variant of llm_node.
         """
         messages = state["messages"]
         logger.debug(f"LLM Node received messages: {messages}")
-        if not any(m.get("role") == "system" for m in messages if isinstance(m, dict)):
-            system_msg = {"role": "system", "content": banking_prompt()}
-            messages = [system_msg] + messages
 
-        ai_msg = self.llm.invoke(messages)
+        ai_msg = await self.llm.ainvoke(self._with_system_prompt(messages))
         logger.debug(f"LLM response: {ai_msg}")
-        return {"messages": messages + [ai_msg]}
+        self._log_usage(ai_msg)
+        return {"messages": [ai_msg]}
 
 
     def should_continue(self, state: MessagesState) -> str:
@@ -69,7 +100,7 @@ class BankingAgent:
         """
         builder = StateGraph(MessagesState)
 
-        builder.add_node("llm", self.llm_node)
+        builder.add_node("llm", RunnableLambda(self.llm_node, afunc=self.allm_node))
         builder.add_node("tools", ToolNode(self.tools))
 
         builder.add_edge(START, "llm")
@@ -80,15 +111,33 @@ class BankingAgent:
         )
         builder.add_edge("tools", "llm")
 
-        return builder.compile()
+        return builder.compile(checkpointer=False)
 
-    def invoke(self, state: MessagesState):
+    @staticmethod
+    def _run_config(user_ctx: Any, config: RunnableConfig | None) -> RunnableConfig:
+        config = config or {}
+        return {**config, "configurable": {**config.get("configurable", {}), "user_ctx": user_ctx}}
+
+    def invoke(self, state: MessagesState, user_ctx: Any = None, config: RunnableConfig | None = None):
         """
         Run the banking agent graph with the given state.
         Args:
             state (MessagesState): The initial state for the banking agent.
+            user_ctx (UserDataContext): The current user's data context, resolved by the tools.
+            config (RunnableConfig | None): Parent run config to attach to, if any.
+        Returns:
+            MessagesState: The final state after processing.
+        """
+        return self.graph.invoke(state, config=self._run_config(user_ctx, config))
+
+    async def ainvoke(self, state: MessagesState, user_ctx: Any = None, config: RunnableConfig | None = None):
+        """
+        Run the banking agent graph asynchronously with the given state.
+        Args:
+            state (MessagesState): The initial state for the banking agent.
+            user_ctx (AsyncUserDataContext): The current user's async data context, resolved by the tools.
+            config (RunnableConfig | None): Parent run config to attach to, if any.
         Returns:
             MessagesState: The final state after processing.
         """
-        graph = self.build()
-        return graph.invoke(state)
\ No newline at end of file
+        return await self.graph.ainvoke(state, config=self._run_config(user_ctx, config))
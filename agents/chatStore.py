@@ -0,0 +1,130 @@
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+from pymongo.errors import OperationFailure
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+MESSAGES = "chat_messages"
+SESSIONS = "chat_sessions"
+_INDEX_OPTIONS_CONFLICT = 85
+
+
+def checkpoint_ttl_seconds() -> int:
+    return int(float(os.getenv("CHECKPOINT_TTL_MINUTES", "1440")) * 60)
+
+
+def _message_doc(thread_id: str, seq: int, message: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "_id": f"{thread_id}:{seq}",
+        "thread_id": thread_id,
+        "seq": seq,
+        "role": message["role"],
+        "content": message["content"],
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def _public(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"role": d["role"], "content": d["content"], "seq": d["seq"]} for d in docs]
+
+
+class MessageStore:
+    """
+    Append-only conversation messages, one document per message in the
+    chat_messages collection: {_id: "<thread_id>:<seq>", thread_id, seq, role, content, created_at}.
+    1. A turn appends only its new messages; nothing already stored is rewritten.
+    2. Reads return messages in seq order, optionally from a given seq on, so
+       callers can skip the part of the history that is already summarized.
+    3. Messages expire CHECKPOINT_TTL_MINUTES after they are written (see aensure_indexes).
+    Returned messages carry their "seq"; strip it with without_seq() before showing them.
+    """
+    def __init__(self, collection, async_collection: Callable[[], Any]):
+        self.collection = collection
+        self._async_collection = async_collection
+
+    @staticmethod
+    def _ops(thread_id: str, start: int, messages: List[Dict[str, str]]) -> list:
+        # Keyed by (thread, seq): a retried turn overwrites its own messages.
+        return [
+            ReplaceOne({"_id": f"{thread_id}:{seq}"}, _message_doc(thread_id, seq, m), upsert=True)
+            for seq, m in enumerate(messages, start)
+        ]
+
+    @staticmethod
+    def _query(thread_id: str, since: int) -> Dict[str, Any]:
+        query: Dict[str, Any] = {"thread_id": thread_id}
+        if since:
+            query["seq"] = {"$gte": since}
+        return query
+
+    def append(self, thread_id: str, start: int, messages: List[Dict[str, str]]):
+        """
+        Store new messages of a thread.
+        Args:
+            thread_id (str): The conversation key.
+            start (int): The seq of the first message (the thread's message count before the turn).
+            messages (list[dict]): {"role", "content"} messages, in order.
+        """
+        if messages:
+            self.collection.bulk_write(self._ops(thread_id, start, messages), ordered=False)
+
+    async def aappend(self, thread_id: str, start: int, messages: List[Dict[str, str]]):
+        """
+        Async variant of append.
+        """
+        if messages:
+            await self._async_collection().bulk_write(self._ops(thread_id, start, messages), ordered=False)
+
+    def history(self, thread_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        """
+        Return a thread's messages with seq >= since, oldest first.
+        """
+        return _public(list(self.collection.find(self._query(thread_id, since)).sort("seq", ASCENDING)))
+
+    async def ahistory(self, thread_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        """
+        Async variant of history.
+        """
+        cursor = self._async_collection().find(self._query(thread_id, since)).sort("seq", ASCENDING)
+        return _public(await cursor.to_list())
+
+    async def adelete(self, thread_id: str):
+        """
+        Delete all messages of a thread.
+        """
+        await self._async_collection().delete_many({"thread_id": thread_id})
+
+
+def without_seq(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+
+async def _create_ttl_index(db, collection: str, field: str, seconds: int):
+    try:
+        await db[collection].create_index(field, name=f"{field}_ttl", expireAfterSeconds=seconds)
+    except OperationFailure as e:
+        if e.code != _INDEX_OPTIONS_CONFLICT:
+            raise
+        # CHECKPOINT_TTL_MINUTES changed since the index was created.
+        await db.command("collMod", collection, index={"name": f"{field}_ttl", "expireAfterSeconds": seconds})
+
+
+async def aensure_indexes(db):
+    """
+    Create the chat collections' indexes. The TTL indexes expire messages and
+    session entries after CHECKPOINT_TTL_MINUTES, like the checkpoints.
+    Args:
+        db: The async database.
+    """
+    ttl = checkpoint_ttl_seconds()
+    await db[MESSAGES].create_index([("thread_id", ASCENDING), ("seq", ASCENDING)], name="thread_seq")
+    await _create_ttl_index(db, MESSAGES, "created_at", ttl)
+    await db[SESSIONS].create_index([("clientId", ASCENDING), ("updated_at", DESCENDING)], name="client_updated")
+    # Also serves the unfiltered listing, sorted on updated_at alone.
+    await _create_ttl_index(db, SESSIONS, "updated_at", ttl)
+    logger.debug(f"Chat indexes ready (ttl={ttl}s)")
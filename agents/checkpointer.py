@@ -0,0 +1,43 @@
+import os
+import logging
+from dotenv import load_dotenv
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+async def open_checkpointer() -> BaseCheckpointSaver:
+    """
+    Create the checkpointer that persists conversation state per thread_id.
+    With REDIS_URL set, state lives in Redis (Redis 8 / Redis Stack) and expires
+    after CHECKPOINT_TTL_MINUTES of inactivity, so any worker can resume any
+    session. Without it, state is kept in process memory.
+    Returns:
+        BaseCheckpointSaver: A ready-to-use async checkpointer.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        logger.warning("REDIS_URL is not set; conversation state is kept in memory.")
+        return InMemorySaver()
+
+    from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+
+    ttl_minutes = float(os.getenv("CHECKPOINT_TTL_MINUTES", "1440"))
+    saver = AsyncRedisSaver(
+        redis_url=redis_url,
+        ttl={"default_ttl": ttl_minutes, "refresh_on_read": True},
+    )
+    await saver.asetup()
+    logger.debug(f"Redis checkpointer ready (ttl={ttl_minutes} min)")
+    return saver
+
+
+async def close_checkpointer(saver: BaseCheckpointSaver | None):
+    """
+    Release the checkpointer's connections, if it owns any.
+    """
+    aclose = getattr(saver, "__aexit__", None)
+    if aclose is not None:
+        await aclose(None, None, None)
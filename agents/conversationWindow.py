@@ -0,0 +1,143 @@
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Rough per-message overhead of the chat template (role markers, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without loading a tokenizer.
+    Args:
+        text (str): The text to measure.
+    Returns:
+        int: Approximate number of tokens (TOKEN_CHARS_PER_TOKEN characters per token).
+    """
+    chars_per_token = float(os.getenv("TOKEN_CHARS_PER_TOKEN", "4"))
+    return int(len(text) / chars_per_token) + 1
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationWindow:
+    """
+    Fits a conversation history into a per-agent token budget.
+    1. Keeps the most recent messages verbatim, newest first, while they fit.
+    2. Replaces everything older with the rolling summary, if one exists.
+    3. Reports which messages fell out of the window so they can be folded
+       into the summary off the hot path.
+    4. Counts estimated tokens before and after windowing.
+    Configuration: <AGENT>_HISTORY_TOKEN_BUDGET (e.g. BANKING_HISTORY_TOKEN_BUDGET).
+    """
+    def __init__(self, budget_tokens: int, name: str = "default"):
+        if budget_tokens <= 0:
+            raise ValueError("budget_tokens must be positive")
+        self.budget_tokens = budget_tokens
+        self.name = name
+        self._lock = threading.Lock()
+        self._counts = {"turns": 0, "history_tokens": 0, "window_tokens": 0, "summaries": 0}
+
+    @classmethod
+    def from_env(cls, agent: str, default_budget: int = 1500) -> "ConversationWindow":
+        budget = int(os.getenv(f"{agent.upper()}_HISTORY_TOKEN_BUDGET", str(default_budget)))
+        return cls(budget, name=agent.lower())
+
+    def window_start(self, history: List[Dict[str, str]], summary: str | None = None) -> int:
+        """
+        Index of the oldest message that still fits in the budget.
+        Args:
+            history (list[dict]): The full conversation history.
+            summary (str | None): The rolling summary, which uses part of the budget.
+        Returns:
+            int: Messages history[start:] fit in the budget.
+        """
+        remaining = self.budget_tokens - (estimate_tokens(summary) if summary else 0)
+        start = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            cost = message_tokens(history[i])
+            if cost > remaining:
+                break
+            remaining -= cost
+            start = i
+        return start
+
+    def select(
+        self,
+        history: List[Dict[str, str]],
+        summary: str | None = None,
+        summarized_upto: int = 0,
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Build the history part of a prompt.
+        Args:
+            history (list[dict]): The full conversation history.
+            summary (str | None): Rolling summary of history[:summarized_upto].
+            summarized_upto (int): Number of leading messages covered by the summary.
+        Returns:
+            tuple[list[dict], dict]: The messages to send and token statistics.
+        """
+        start = max(self.window_start(history, summary), summarized_upto if summary else 0)
+        window = history[start:]
+
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        messages.extend(window)
+
+        full_tokens = sum(message_tokens(m) for m in history)
+        sent_tokens = sum(message_tokens(m) for m in messages)
+        with self._lock:
+            self._counts["turns"] += 1
+            self._counts["history_tokens"] += full_tokens
+            self._counts["window_tokens"] += sent_tokens
+
+        stats = {
+            "history_messages": len(history),
+            "window_messages": len(window),
+            "history_tokens": full_tokens,
+            "window_tokens": sent_tokens,
+        }
+        logger.info(
+            f"[{self.name}] history window: {sent_tokens}/{full_tokens} estimated tokens "
+            f"({len(window)}/{len(history)} messages, summary={'yes' if summary else 'no'})"
+        )
+        return messages, stats
+
+    def pending_summary(
+        self,
+        history: List[Dict[str, str]],
+        summary: str | None = None,
+        summarized_upto: int = 0,
+    ) -> Tuple[int, int]:
+        """
+        Range of messages that fell out of the window but are not summarized yet.
+        Args:
+            history (list[dict]): The full conversation history.
+            summary (str | None): The current rolling summary.
+            summarized_upto (int): Number of leading messages already summarized.
+        Returns:
+            tuple[int, int]: (start, end) indices; start == end when nothing is pending.
+        """
+        end = self.window_start(history, summary)
+        return summarized_upto, max(end, summarized_upto)
+
+    def record_summary(self):
+        with self._lock:
+            self._counts["summaries"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["budget_tokens"] = self.budget_tokens
+        counts["saved_ratio"] = (
+            1 - counts["window_tokens"] / counts["history_tokens"] if counts["history_tokens"] else 0.0
+        )
+        return counts
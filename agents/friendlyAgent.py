@@ -39,6 +39,18 @@ class FriendlyAgent:
         response = self.llm.invoke(prompt)
         return response.content.strip()
 
+    async def arespond(self, user_input: str) -> str:
+        """
+        Async variant of respond.
+        Args:
+            user_input (str): The input from the user.
+        Returns:
+            str: The friendly response generated by the LLM.
+        """
+        prompt = friendly_prompt(user_input)
+        response = await self.llm.ainvoke(prompt)
+        return response.content.strip()
+
     def invoke(self, state: dict) -> dict:
         """
         Processes the input state and generates a friendly response.
@@ -60,3 +72,23 @@ class FriendlyAgent:
             ]
         }
 
+    async def ainvoke(self, state: dict) -> dict:
+        """
+        Async variant of invoke.
+        Args:
+            state (dict): A dictionary containing 'user_input'.
+        Returns:
+            dict: A dictionary with the generated response under 'messages'.
+        """
+        user_input = state.get("user_input")
+        if not user_input:
+            logger.error("State missing 'user_input'")
+            raise ValueError("state missing 'user_input'")
+
+        answer = await self.arespond(user_input)
+        logger.debug(f"FriendlyAgent response: {answer}")
+        return {
+            "messages": [
+                {"content": answer}
+            ]
+        }
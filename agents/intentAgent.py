@@ -1,12 +1,25 @@
 import os
+import random
+import asyncio
 import logging
-import pymongo
+import metrics
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from langchain_ollama import ChatOllama
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from typing import TypedDict, Dict, Any, List
+from database import get_db, get_async_db
+from agents.bankingAgent import BankingAgent
 from agents.friendlyAgent import FriendlyAgent
+from agents.intentCache import IntentCache
+from agents.chatStore import MessageStore, checkpoint_ttl_seconds, without_seq
+from agents.conversationWindow import ConversationWindow
+from agents.intentClassifier import IntentClassifier, INTENT_LABELS
 from prompts.intent_prompt import intent_prompt
+from prompts.summary_prompt import summary_prompt
 from langgraph.graph import StateGraph, START, END
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -16,31 +29,46 @@ class IntentState(TypedDict):
     user_input: str
     intent: str | None
     result: Dict[str, Any] | None
-    conversation_history: List[Dict[str, str]]
+    # Number of messages in the thread; the messages themselves live in the MessageStore.
+    message_count: int
     clientId: str | None
     slack_user_id: str | None
     context: str | None
-    user_ctx: Any | None
+    # Rolling summary of the messages with seq < summarized_upto, maintained in the background.
+    summary: str | None
+    summarized_upto: int
 
 
 class IntentAgent:
     """
     An agent to detect user intent and route to appropriate sub-agents.
-    1. Initializes with user context and connects to MongoDB for user data.
+    1. Uses the shared MongoDB pool for user data and builds the LLM clients and sub-agents once.
     2. Defines intent detection, banking, friendly chat, and fallback nodes.
     3. Routes based on detected intent to the corresponding node.
     4. Constructs a state graph connecting these nodes.
+    The compiled graph is shared across requests (see agents.registry), so
+    identity travels through IntentState and the per-request user context
+    through config["configurable"]["user_ctx"], which is never checkpointed.
+    Every node has a sync and an async implementation: `invoke` serves the CLI
+    with a UserDataContext, `ainvoke` serves the API with an AsyncUserDataContext.
+    With a checkpointer, conversation state is persisted per thread_id and
+    nodes only return the keys they change. The messages are not part of the
+    checkpointed state: they are loaded from the chat_messages collection into
+    config["configurable"]["history"] and each finished turn appends only its
+    own pair. The turn also updates the thread's entry in the chat_sessions
+    collection, which lists sessions per user without scanning checkpoints.
+    Without a checkpointer (CLI) the caller passes "conversation_history" in
+    and gets the extended list back, as before.
+    The banking prompt carries only the turns that fit BANKING_HISTORY_TOKEN_BUDGET;
+    older turns are folded into a rolling summary after the turn completes.
     """
-    def __init__(self, user_ctx):
-        self.user_ctx = user_ctx
+    UNSTREAMED_NODES = {"intent"}
 
-        mongo_uri = os.getenv("MONGO_URI")
-        if not mongo_uri:
-            logger.error("MONGO_URI environment variable is not set.")
-            raise RuntimeError("Missing MONGO_URI")
-
-        self.mongo = pymongo.MongoClient(mongo_uri)["fransa_demo"]
-        self.users = self.mongo["users"]
+    def __init__(self, checkpointer: BaseCheckpointSaver | None = None):
+        self.checkpointer = checkpointer
+        self.users = get_db()["users"]
+        self.sessions = get_db()["chat_sessions"]
+        self.messages = MessageStore(get_db()["chat_messages"], lambda: get_async_db()["chat_messages"])
 
         model_name = os.getenv("MODEL_NAME")
         if not model_name:
@@ -48,6 +76,19 @@ class IntentAgent:
             raise RuntimeError("Missing MODEL_NAME")
 
         self.llm = ChatOllama(model=model_name, temperature=0)
+        self.classifier = IntentClassifier() if os.getenv("INTENT_FASTPATH", "1") == "1" else None
+        self.audit_rate = float(os.getenv("INTENT_FASTPATH_AUDIT_RATE", "0"))
+        self._audits = set()
+        if self.classifier is not None:
+            metrics.register("intent_fastpath", self.classifier.stats)
+        self.intent_cache = IntentCache(namespace=model_name) if os.getenv("INTENT_CACHE", "1") == "1" else None
+        if self.intent_cache is not None:
+            metrics.register("intent_cache", self.intent_cache.stats)
+        self.banking_window = ConversationWindow.from_env("banking")
+        metrics.register("banking_history_window", self.banking_window.stats)
+        self._summaries = {}
+        self.banking = BankingAgent()
+        self.friendly = FriendlyAgent(model_name=model_name)
         self.graph = self._build_graph()
 
     def _get_client_id(self, slack_user_id: str | None) -> str | None:
@@ -64,68 +105,230 @@ class IntentAgent:
         logger.debug(f"Lookup for Slack ID {slack_user_id}: found doc {doc}")
         return doc.get("clientId") if doc else None
 
-    def _intent_detector(self, state: IntentState) -> IntentState:
+    async def _aget_client_id(self, slack_user_id: str | None) -> str | None:
         """
-        Detect intent from user input.
+        Async variant of _get_client_id using the shared async pool.
+        """
+        if not slack_user_id:
+            return None
+        doc = await get_async_db()["users"].find_one({"slack_id": slack_user_id})
+        logger.debug(f"Lookup for Slack ID {slack_user_id}: found doc {doc}")
+        return doc.get("clientId") if doc else None
+
+    def _intent_update(self, state: IntentState, intent: str, client_id: str | None) -> IntentState:
+        """
+        Build the state update returned by the intent detector.
         Args:
-            state (IntentState): The current state containing user input.
+            state (IntentState): The incoming state.
+            intent (str): The detected intent.
+            client_id (str | None): The resolved clientId.
         Returns:
-            IntentState: Updated state with detected intent.
+            IntentState: The changed keys.
         """
-        user_input = state["user_input"]
-        slack = state.get("slack_user_id")
-        client_id = state.get("clientId") or self._get_client_id(slack)
-
-        prompt = intent_prompt(user_input)
-        response = self.llm.invoke(prompt)
-        intent = response.content.strip().lower()
-
         return {
-            "user_input": user_input,
             "intent": intent,
             "result": None,
-            "conversation_history": state.get("conversation_history", []),
             "clientId": client_id,
-            "slack_user_id": slack,
             "context": None,
-            "user_ctx": self.user_ctx
         }
 
-    def _banking_node(self, state: IntentState) -> IntentState:
+    def _response_update(self, state: IntentState, result_type: str, content: str) -> IntentState:
         """
-        Execute banking-related flow.
+        Build the state update returned by a responding node. The new turn's
+        messages are stored by the caller once the graph has finished.
         Args:
-            state (IntentState): The current state containing user input.
+            state (IntentState): The incoming state.
+            result_type (str): The kind of response (e.g. "banking_response").
+            content (str): The assistant's answer.
         Returns:
-            IntentState: Updated state with banking response.
+            IntentState: The changed keys.
         """
-        from agents.bankingAgent import BankingAgent
-        
-        banking = BankingAgent(self.user_ctx)
+        return {
+            "result": {"type": result_type, "content": content},
+            "message_count": (state.get("message_count") or 0) + 2,
+            "context": None,
+        }
+
+    @staticmethod
+    def _user_ctx(config: RunnableConfig | None) -> Any:
+        return (config or {}).get("configurable", {}).get("user_ctx")
 
-        history = state.get("conversation_history", [])
-        user_msg = {"role": "user", "content": state["user_input"]}
-        messages = history + [user_msg]
+    @staticmethod
+    def _history(config: RunnableConfig | None) -> List[Dict[str, Any]]:
+        return (config or {}).get("configurable", {}).get("history") or []
 
-        result = banking.invoke({"messages": messages})
+    def _banking_messages(self, state: IntentState, config: RunnableConfig | None) -> List[Dict[str, str]]:
+        """
+        Build the banking prompt: rolling summary, recent turns within the
+        token budget, then the new user message.
+        """
+        summarized_upto = state.get("summarized_upto") or 0
+        unsummarized = [m for m in self._history(config) if m["seq"] >= summarized_upto]
+        window, _ = self.banking_window.select(without_seq(unsummarized), state.get("summary"))
+        return window + [{"role": "user", "content": state["user_input"]}]
+
+    @staticmethod
+    def _final_content(result: Dict[str, Any]) -> str:
         final_msg = result["messages"][-1]
-        content = getattr(final_msg, "content", str(final_msg))
+        return getattr(final_msg, "content", str(final_msg))
 
-        updated_history = history + [
-            user_msg,
-            {"role": "assistant", "content": content}
-        ]
+    def _fast_intent(self, user_input: str) -> str | None:
+        """
+        Try the embedding classifier before the LLM.
+        Args:
+            user_input (str): The user message.
+        Returns:
+            str | None: The intent when the classifier is confident, else None.
+        """
+        if self.classifier is None:
+            return None
+        try:
+            return self.classifier.classify(user_input)
+        except Exception as e:
+            self.disable_fast_path(e)
+            return None
 
-        return {
-            "user_input": state["user_input"],
-            "intent": state["intent"],
-            "result": {"type": "banking_response", "content": content},
-            "conversation_history": updated_history,
-            "clientId": state.get("clientId"),
-            "slack_user_id": state.get("slack_user_id"),
-            "context": None,
-            "user_ctx": self.user_ctx
-        }
+    def disable_fast_path(self, reason):
+        """
+        Turn the embedding classifier off (e.g. the model failed to load)
+        and stop reporting its counters.
+        """
+        logger.warning(f"Disabling intent fast path: {reason}")
+        self.classifier = None
+        metrics.unregister("intent_fastpath")
+
+    async def _audit_intent(self, user_input: str, predicted: str):
+        """
+        Ask the LLM for the intent of a fast-path answered message and record
+        whether both agree. Runs in the background, off the request path.
+        """
+        try:
+            response = await self.llm.ainvoke(intent_prompt(user_input))
+            self.classifier.record_audit(predicted, response.content.strip().lower())
+        except Exception as e:
+            logger.warning(f"Intent audit failed: {e}")
+
+    def _detect_intent(self, user_input: str) -> str:
+        """
+        Resolve the intent of a message: cache, then embedding fast path, then LLM.
+        Args:
+            user_input (str): The user message.
+        Returns:
+            str: The detected intent.
+        """
+        if self.intent_cache is not None:
+            intent = self.intent_cache.get(user_input)
+            if intent is not None:
+                return intent
+
+        intent = self._fast_intent(user_input)
+        if intent is None:
+            response = self.llm.invoke(intent_prompt(user_input))
+            intent = response.content.strip().lower()
+
+        if self.intent_cache is not None and intent in INTENT_LABELS:
+            self.intent_cache.set(user_input, intent)
+        return intent
+
+    async def _adetect_intent(self, user_input: str) -> str:
+        """
+        Async variant of _detect_intent.
+        """
+        if self.intent_cache is not None:
+            intent = await self.intent_cache.aget(user_input)
+            if intent is not None:
+                return intent
+
+        intent = await asyncio.to_thread(self._fast_intent, user_input)
+        if intent is None:
+            response = await self.llm.ainvoke(intent_prompt(user_input))
+            intent = response.content.strip().lower()
+        elif random.random() < self.audit_rate:
+            task = asyncio.create_task(self._audit_intent(user_input, intent))
+            self._audits.add(task)
+            task.add_done_callback(self._audits.discard)
+
+        if self.intent_cache is not None and intent in INTENT_LABELS:
+            await self.intent_cache.aset(user_input, intent)
+        return intent
+
+    async def _asummarize(self, thread_id: str):
+        """
+        Fold the turns that fell out of the banking window into the thread's
+        rolling summary and write it back through the checkpointer. Only the
+        newly evicted turns are read and sent, together with the previous summary.
+        Args:
+            thread_id (str): The conversation key.
+        """
+        config = self._thread_config(thread_id)
+        try:
+            values = (await self.graph.aget_state(config)).values
+            summary = values.get("summary")
+            unsummarized = await self.messages.ahistory(thread_id, since=values.get("summarized_upto") or 0)
+            _, end = self.banking_window.pending_summary(without_seq(unsummarized), summary)
+            if end == 0:
+                return
+
+            evicted = unsummarized[:end]
+            response = await self.llm.ainvoke(summary_prompt(summary, without_seq(evicted)))
+            upto = evicted[-1]["seq"] + 1
+            await self.graph.aupdate_state(config, {"summary": response.content.strip(), "summarized_upto": upto})
+            self.banking_window.record_summary()
+            logger.debug(f"Summarized messages {evicted[0]['seq']}-{upto} of thread {thread_id}")
+        except Exception as e:
+            logger.warning(f"Conversation summary failed for {thread_id}: {e}")
+
+    def _schedule_summary(self, thread_id: str | None):
+        """
+        Update the rolling summary in the background, at most once at a time per thread.
+        """
+        if not thread_id or self.checkpointer is None or thread_id in self._summaries:
+            return
+        task = asyncio.create_task(self._asummarize(thread_id))
+        self._summaries[thread_id] = task
+        task.add_done_callback(lambda _: self._summaries.pop(thread_id, None))
+
+    def _intent_detector(self, state: IntentState) -> IntentState:
+        """
+        Detect intent from user input.
+        Args:
+            state (IntentState): The current state containing user input.
+        Returns:
+            IntentState: Updated state with detected intent.
+        """
+        client_id = state.get("clientId") or self._get_client_id(state.get("slack_user_id"))
+        intent = self._detect_intent(state["user_input"])
+        return self._intent_update(state, intent, client_id)
+
+    async def _aintent_detector(self, state: IntentState) -> IntentState:
+        """
+        Async variant of _intent_detector.
+        """
+        client_id = state.get("clientId") or await self._aget_client_id(state.get("slack_user_id"))
+        intent = await self._adetect_intent(state["user_input"])
+        return self._intent_update(state, intent, client_id)
+
+    def _banking_node(self, state: IntentState, config: RunnableConfig = None) -> IntentState:
+        """
+        Execute banking-related flow.
+        Args:
+            state (IntentState): The current state containing user input.
+            config (RunnableConfig): The parent run config, forwarded to the banking graph.
+        Returns:
+            IntentState: Updated state with banking response.
+        """
+        messages = self._banking_messages(state, config)
+        result = self.banking.invoke({"messages": messages}, self._user_ctx(config), config)
+        return self._response_update(state, "banking_response", self._final_content(result))
+
+    async def _abanking_node(self, state: IntentState, config: RunnableConfig = None) -> IntentState:
+        """
+        Async variant of _banking_node. Forwarding the config keeps the banking
+        graph attached to the parent run, so its LLM tokens reach astream.
+        """
+        messages = self._banking_messages(state, config)
+        result = await self.banking.ainvoke({"messages": messages}, self._user_ctx(config), config)
+        return self._response_update(state, "banking_response", self._final_content(result))
 
     def _friendly_node(self, state: IntentState) -> IntentState:
         """
@@ -135,27 +338,17 @@ class IntentAgent:
         Returns:
             IntentState: Updated state with friendly response.
         """
-
-        agent = FriendlyAgent()
-        result = agent.invoke(state)
+        result = self.friendly.invoke(state)
         content = result["messages"][-1]["content"]
+        return self._response_update(state, "friendly_response", content)
 
-        history = state.get("conversation_history", [])
-        updated = history + [
-            {"role": "user", "content": state["user_input"]},
-            {"role": "assistant", "content": content}
-        ]
-
-        return {
-            "user_input": state["user_input"],
-            "intent": state["intent"],
-            "result": {"type": "friendly_response", "content": content},
-            "conversation_history": updated,
-            "clientId": state.get("clientId"),
-            "slack_user_id": state.get("slack_user_id"),
-            "context": None,
-            "user_ctx": self.user_ctx
-        }
+    async def _afriendly_node(self, state: IntentState) -> IntentState:
+        """
+        Async variant of _friendly_node.
+        """
+        result = await self.friendly.ainvoke(state)
+        content = result["messages"][-1]["content"]
+        return self._response_update(state, "friendly_response", content)
 
     def _fallback_node(self, state: IntentState) -> IntentState:
         """
@@ -166,23 +359,10 @@ class IntentAgent:
             IntentState: Updated state with fallback response.
         """
         msg = "I'm sorry, I can only assist with banking-related queries."
+        return self._response_update(state, "fallback_response", msg)
 
-        history = state.get("conversation_history", [])
-        updated = history + [
-            {"role": "user", "content": state["user_input"]},
-            {"role": "assistant", "content": msg}
-        ]
-
-        return {
-            "user_input": state["user_input"],
-            "intent": state["intent"],
-            "result": {"type": "fallback_response", "content": msg},
-            "conversation_history": updated,
-            "clientId": state.get("clientId"),
-            "slack_user_id": state.get("slack_user_id"),
-            "context": None,
-            "user_ctx": self.user_ctx
-        }
+    async def _afallback_node(self, state: IntentState) -> IntentState:
+        return self._fallback_node(state)
 
     def _route_by_intent(self, state: IntentState) -> str:
         """
@@ -209,10 +389,10 @@ class IntentAgent:
         """
         g = StateGraph(IntentState)
 
-        g.add_node("intent", self._intent_detector)
-        g.add_node("banking", self._banking_node)
-        g.add_node("friendly", self._friendly_node)
-        g.add_node("fallback", self._fallback_node)
+        g.add_node("intent", RunnableLambda(self._intent_detector, afunc=self._aintent_detector))
+        g.add_node("banking", RunnableLambda(self._banking_node, afunc=self._abanking_node))
+        g.add_node("friendly", RunnableLambda(self._friendly_node, afunc=self._afriendly_node))
+        g.add_node("fallback", RunnableLambda(self._fallback_node, afunc=self._afallback_node))
 
         def route_entry(state: IntentState):
             if state.get("context") == "banking_in_progress":
@@ -225,14 +405,206 @@ class IntentAgent:
         g.add_edge("friendly", END)
         g.add_edge("fallback", END)
 
-        return g.compile()
+        return g.compile(checkpointer=self.checkpointer)
+
+    @staticmethod
+    def _thread_config(thread_id: str | None) -> RunnableConfig:
+        return {"configurable": {"thread_id": thread_id}} if thread_id else {}
+
+    def _run_args(self, state: Dict[str, Any], thread_id: str | None, history: List[Dict[str, Any]]):
+        """
+        Split a request into the graph input and the run config. The user
+        context is a live data-access handle and the history can be long,
+        so both go into the config rather than the (checkpointed) state.
+        Args:
+            state (dict): The request, optionally holding "user_ctx" and "conversation_history".
+            thread_id (str | None): Conversation key when a checkpointer is configured.
+            history (list[dict]): The thread's messages, with their "seq".
+        Returns:
+            tuple[IntentState, RunnableConfig]: The graph input and config.
+        """
+        state = dict(state)
+        user_ctx = state.pop("user_ctx", None)
+        state.pop("conversation_history", None)
+        if not self._indexed(thread_id):
+            state["message_count"] = len(history)
+        config = self._thread_config(thread_id)
+        config.setdefault("configurable", {}).update(user_ctx=user_ctx, history=history)
+        return state, config
+
+    def _indexed(self, thread_id: str | None) -> bool:
+        return bool(thread_id) and self.checkpointer is not None
+
+    @staticmethod
+    def _passed_history(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [{**m, "seq": seq} for seq, m in enumerate(state.get("conversation_history") or [])]
+
+    def _load_history(self, state: Dict[str, Any], thread_id: str | None) -> List[Dict[str, Any]]:
+        """
+        Return the thread's stored messages, or the history passed in by a
+        caller without a checkpointer.
+        """
+        if self._indexed(thread_id):
+            return self.messages.history(thread_id)
+        return self._passed_history(state)
 
-    def invoke(self, state: IntentState):
+    async def _aload_history(self, state: Dict[str, Any], thread_id: str | None) -> List[Dict[str, Any]]:
+        """
+        Async variant of _load_history.
+        """
+        if self._indexed(thread_id):
+            return await self.messages.ahistory(thread_id)
+        return self._passed_history(state)
+
+    @staticmethod
+    def _turn(state: Dict[str, Any]) -> List[Dict[str, str]]:
+        return [
+            {"role": "user", "content": state["user_input"]},
+            {"role": "assistant", "content": state["result"]["content"]},
+        ]
+
+    @staticmethod
+    def _with_history(state: Dict[str, Any], history: List[Dict[str, Any]], turn: List[Dict[str, str]]) -> Dict[str, Any]:
+        return {**state, "conversation_history": without_seq(history) + turn}
+
+    @staticmethod
+    def _session_update(thread_id: str, state: Dict[str, Any]) -> tuple:
+        return {"_id": thread_id}, {"$set": {
+            "clientId": state.get("clientId"),
+            "message_count": state.get("message_count", 0),
+            "updated_at": datetime.now(timezone.utc),
+        }}
+
+    async def _aindex_session(self, thread_id: str, state: Dict[str, Any]):
+        """
+        Record a finished turn in the per-user session index.
+        """
+        try:
+            await get_async_db()["chat_sessions"].update_one(*self._session_update(thread_id, state), upsert=True)
+        except Exception as e:
+            logger.warning(f"Could not index session {thread_id}: {e}")
+
+    async def _afinish_turn(self, thread_id: str | None, state: Dict[str, Any], history: List[Dict[str, Any]]):
+        """
+        Store the messages of a finished turn and index the session.
+        Args:
+            thread_id (str | None): Conversation key when a checkpointer is configured.
+            state (IntentState): The final graph state.
+            history (list[dict]): The messages loaded before the turn.
+        Returns:
+            dict: The final state plus the full "conversation_history".
+        """
+        turn = self._turn(state)
+        if self._indexed(thread_id):
+            await self.messages.aappend(thread_id, state["message_count"] - len(turn), turn)
+            await self._aindex_session(thread_id, state)
+            self._schedule_summary(thread_id)
+        return self._with_history(state, history, turn)
+
+    def invoke(self, state: IntentState, thread_id: str | None = None):
         """
         Run the graph for the given state.
         Args:
-            state (IntentState): The initial state for the Intent agent.
+            state (IntentState): The initial state for the Intent agent, plus an optional "user_ctx".
+            thread_id (str | None): Conversation key when a checkpointer is configured.
+        Returns:
+            IntentState: The final state after processing.
+        """
+        history = self._load_history(state, thread_id)
+        result = self.graph.invoke(*self._run_args(state, thread_id, history))
+        turn = self._turn(result)
+        if self._indexed(thread_id):
+            self.messages.append(thread_id, result["message_count"] - len(turn), turn)
+            self.sessions.update_one(*self._session_update(thread_id, result), upsert=True)
+        return self._with_history(result, history, turn)
+
+    async def ainvoke(self, state: IntentState, thread_id: str | None = None):
+        """
+        Run the graph asynchronously for the given state.
+        Args:
+            state (IntentState): The initial state for the Intent agent, plus an optional "user_ctx".
+            thread_id (str | None): Conversation key when a checkpointer is configured.
         Returns:
             IntentState: The final state after processing.
         """
-        return self.graph.invoke(state)
+        history = await self._aload_history(state, thread_id)
+        result = await self.graph.ainvoke(*self._run_args(state, thread_id, history))
+        return await self._afinish_turn(thread_id, result, history)
+
+    async def aget_history(self, thread_id: str) -> List[Dict[str, str]]:
+        """
+        Return the stored conversation history of a thread.
+        Args:
+            thread_id (str): The conversation key.
+        Returns:
+            list[dict]: The conversation history, empty for unknown threads
+            or without a checkpointer.
+        """
+        if self.checkpointer is None:
+            return []
+        return without_seq(await self.messages.ahistory(thread_id))
+
+    async def aclear_history(self, thread_id: str):
+        """
+        Delete every checkpoint and stored message of a thread.
+        Args:
+            thread_id (str): The conversation key.
+        """
+        if self.checkpointer is None:
+            return
+        await self.checkpointer.adelete_thread(thread_id)
+        await self.messages.adelete(thread_id)
+        await get_async_db()["chat_sessions"].delete_one({"_id": thread_id})
+
+    async def alist_threads(self, client_id: str | None = None) -> List[Dict[str, Any]]:
+        """
+        List persisted conversations with their message counts from the
+        session index. Sessions idle for longer than CHECKPOINT_TTL_MINUTES
+        have expired from the checkpointer; the TTL index removes their
+        entries, and the query skips those the TTL monitor has not reached yet.
+        Args:
+            client_id (str | None): Only list this user's sessions.
+        Returns:
+            list[dict]: One {"session_id", "message_count"} entry per thread, most recent first.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=checkpoint_ttl_seconds())
+        query: Dict[str, Any] = {"updated_at": {"$gte": cutoff}}
+        if client_id:
+            query["clientId"] = client_id
+        cursor = get_async_db()["chat_sessions"].find(query, {"message_count": 1}).sort("updated_at", -1)
+        return [{"session_id": doc["_id"], "message_count": doc.get("message_count", 0)} async for doc in cursor]
+
+    async def astream(self, state: IntentState, thread_id: str | None = None):
+        """
+        Run the graph asynchronously and yield events as they are produced.
+        Args:
+            state (IntentState): The initial state for the Intent agent, plus an optional "user_ctx".
+            thread_id (str | None): Conversation key when a checkpointer is configured.
+        Yields:
+            dict: {"type": "node", "node": ...} when a node finishes,
+                  {"type": "token", "node": ..., "content": ...} for each answer token,
+                  and a last {"type": "final", "state": IntentState}.
+        """
+        final_state = None
+        history = await self._aload_history(state, thread_id)
+        state, config = self._run_args(state, thread_id, history)
+        async for namespace, mode, payload in self.graph.astream(
+            state, config,
+            stream_mode=["messages", "updates", "values"], subgraphs=True
+        ):
+            if mode == "messages":
+                chunk, metadata = payload
+                node = metadata.get("langgraph_node")
+                # The intent label is routing data, not part of the answer.
+                if node in self.UNSTREAMED_NODES or not isinstance(chunk, AIMessageChunk):
+                    continue
+                if chunk.content:
+                    yield {"type": "token", "node": node, "content": chunk.content}
+            elif mode == "updates":
+                for node in payload:
+                    graph = "/".join(ns.split(":")[0] for ns in namespace)
+                    yield {"type": "node", "node": node, "graph": graph or None}
+            elif mode == "values" and not namespace:
+                final_state = payload
+
+        yield {"type": "final", "state": await self._afinish_turn(thread_id, final_state, history)}
@@ -0,0 +1,158 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from typing import Any, Dict
+from dotenv import load_dotenv
+from caching import LRUCache
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[\s!?.,;:]+$")
+
+
+def normalize_input(user_input: str) -> str:
+    """
+    Normalize a message so trivially different phrasings share a cache entry.
+    Args:
+        user_input (str): The raw user message.
+    Returns:
+        str: Lower-cased, whitespace-collapsed text without trailing punctuation.
+    """
+    text = " ".join(user_input.lower().split())
+    return _PUNCTUATION.sub("", text)
+
+
+class IntentCache:
+    """
+    A bounded cache of intent classifications keyed by normalized user input.
+    1. Serves hits from an in-process LRU with a TTL.
+    2. Optionally shares entries across workers through Redis
+       (INTENT_CACHE_REDIS_URL), populating the local LRU on a shared hit.
+    3. Counts local and shared hits, misses and evictions.
+    Configuration: INTENT_CACHE_SIZE, INTENT_CACHE_TTL, INTENT_CACHE_REDIS_URL.
+    """
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int | None = None,
+        ttl: float | None = None,
+        redis_url: str | None = None,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl if ttl is not None else float(os.getenv("INTENT_CACHE_TTL", "3600"))
+        self.local = LRUCache(
+            maxsize=maxsize or int(os.getenv("INTENT_CACHE_SIZE", "10000")),
+            ttl=self.ttl,
+        )
+        self.redis_url = redis_url if redis_url is not None else os.getenv("INTENT_CACHE_REDIS_URL")
+        self._redis = None
+        self._aredis = None
+        self._lock = threading.Lock()
+        self._shared = {"shared_hits": 0, "shared_misses": 0, "shared_errors": 0}
+
+    def key(self, user_input: str) -> str:
+        digest = hashlib.sha1(normalize_input(user_input).encode()).hexdigest()
+        return f"intent:{self.namespace}:{digest}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self._shared[name] += 1
+
+    def _sync_redis(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    def _async_redis(self):
+        if self._aredis is None:
+            import redis.asyncio as aioredis
+            self._aredis = aioredis.Redis.from_url(self.redis_url, decode_responses=True)
+        return self._aredis
+
+    def get(self, user_input: str) -> str | None:
+        """
+        Look up the cached intent of a message.
+        Args:
+            user_input (str): The raw user message.
+        Returns:
+            str | None: The cached intent, or None on a miss.
+        """
+        key = self.key(user_input)
+        intent = self.local.get(key)
+        if intent is not None or not self.redis_url:
+            return intent
+
+        try:
+            intent = self._sync_redis().get(key)
+        except Exception as e:
+            logger.warning(f"Shared intent cache unavailable: {e}")
+            self._count("shared_errors")
+            return None
+        return self._shared_result(key, intent)
+
+    async def aget(self, user_input: str) -> str | None:
+        """
+        Async variant of get.
+        """
+        key = self.key(user_input)
+        intent = self.local.get(key)
+        if intent is not None or not self.redis_url:
+            return intent
+
+        try:
+            intent = await self._async_redis().get(key)
+        except Exception as e:
+            logger.warning(f"Shared intent cache unavailable: {e}")
+            self._count("shared_errors")
+            return None
+        return self._shared_result(key, intent)
+
+    def _shared_result(self, key: str, intent: str | None) -> str | None:
+        if intent is None:
+            self._count("shared_misses")
+            return None
+        self._count("shared_hits")
+        self.local.set(key, intent)
+        return intent
+
+    def set(self, user_input: str, intent: str):
+        """
+        Cache the intent of a message locally and, if configured, in Redis.
+        Args:
+            user_input (str): The raw user message.
+            intent (str): The detected intent.
+        """
+        key = self.key(user_input)
+        self.local.set(key, intent)
+        if not self.redis_url:
+            return
+        try:
+            self._sync_redis().set(key, intent, ex=int(self.ttl) or None)
+        except Exception as e:
+            logger.warning(f"Shared intent cache unavailable: {e}")
+            self._count("shared_errors")
+
+    async def aset(self, user_input: str, intent: str):
+        """
+        Async variant of set.
+        """
+        key = self.key(user_input)
+        self.local.set(key, intent)
+        if not self.redis_url:
+            return
+        try:
+            await self._async_redis().set(key, intent, ex=int(self.ttl) or None)
+        except Exception as e:
+            logger.warning(f"Shared intent cache unavailable: {e}")
+            self._count("shared_errors")
+
+    def stats(self) -> Dict[str, Any]:
+        counts = self.local.stats()
+        with self._lock:
+            counts.update(self._shared)
+        counts["shared_backend"] = "redis" if self.redis_url else None
+        return counts
@@ -0,0 +1,243 @@
+import os
+import logging
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Labelled seed examples. Each label's centroid is the mean of its example embeddings.
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "customer_request": [
+        "show my cards",
+        "check balance",
+        "what is my card balance",
+        "list my last 5 transactions",
+        "show me the recent transactions on my card",
+        "transactions from 23/10/2025 to 24/10/2025",
+        "change my card pin",
+        "I want to reset my PIN",
+        "what is the expiry date of my card",
+        "how much money do I have available",
+        "view my card details",
+        "did my last payment go through",
+    ],
+    "friendly_chat": [
+        "hello",
+        "hi",
+        "hey there",
+        "good morning",
+        "how are you",
+        "how's your day going",
+        "thank you",
+        "thanks a lot",
+        "nice to meet you",
+        "bye",
+        "you are very helpful",
+        "what's up",
+    ],
+    "general_query": [
+        "what is the capital of France",
+        "who won the world cup",
+        "tell me a joke",
+        "what's the weather tomorrow",
+        "explain quantum physics",
+        "recommend a good movie",
+        "how do I cook pasta",
+        "random nonsense",
+        "write me a poem",
+        "what time is it in Tokyo",
+    ],
+    "sql_query": [
+        "select * from transactions where amount > 100",
+        "write a sql query to sum transactions by month",
+        "give me the average transaction amount grouped by card",
+        "count the rows in the cards table",
+        "run a query joining users and cards",
+        "export all transactions as a table sorted by date",
+        "group my spending by merchant and order by total",
+        "show the top 10 customers by balance using sql",
+    ],
+}
+
+INTENT_LABELS = tuple(INTENT_EXAMPLES)
+
+EmbedFn = Callable[[Sequence[str]], np.ndarray]
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _load_embedder() -> EmbedFn:
+    from tools.ragtools import get_embedder
+    model = get_embedder()
+    return lambda texts: model.encode(list(texts), convert_to_numpy=True)
+
+
+class IntentClassifier:
+    """
+    A nearest-centroid intent classifier over sentence embeddings.
+    1. Embeds the labelled examples once and keeps one unit-norm centroid per intent.
+    2. Scores a message by cosine similarity to every centroid.
+    3. Answers only when the best score clears the threshold and beats the
+       runner-up by the margin; otherwise the caller falls back to the LLM.
+    4. Counts hits and fallbacks, and compares audited hits against the LLM
+       label so accuracy can be reported.
+    Configuration: INTENT_FASTPATH_THRESHOLD, INTENT_FASTPATH_MARGIN.
+    """
+    def __init__(
+        self,
+        examples: Dict[str, List[str]] | None = None,
+        threshold: float | None = None,
+        margin: float | None = None,
+        embed: EmbedFn | None = None,
+    ):
+        self.examples = examples or INTENT_EXAMPLES
+        self.threshold = threshold if threshold is not None else float(os.getenv("INTENT_FASTPATH_THRESHOLD", "0.6"))
+        self.margin = margin if margin is not None else float(os.getenv("INTENT_FASTPATH_MARGIN", "0.05"))
+        self._embed = embed
+        self._labels: List[str] = []
+        self._centroids: np.ndarray | None = None
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "fallbacks": 0, "audited": 0, "audit_agreements": 0}
+
+    @staticmethod
+    def _unit(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def warmup(self):
+        """
+        Load the embedder and compute the centroids if not done yet.
+        """
+        if self._centroids is not None:
+            return
+        with self._lock:
+            if self._centroids is not None:
+                return
+            if self._embed is None:
+                self._embed = _load_embedder()
+            labels, centroids = [], []
+            for label, texts in self.examples.items():
+                vectors = self._unit(self._embed([normalize_text(t) for t in texts]))
+                labels.append(label)
+                centroids.append(vectors.mean(axis=0))
+            self._labels = labels
+            self._centroids = self._unit(np.stack(centroids))
+            logger.debug(f"Intent classifier ready with {len(labels)} centroids")
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        """
+        Cosine similarity of the message to every intent centroid.
+        Args:
+            text (str): The user message.
+        Returns:
+            list[tuple[str, float]]: (intent, score) sorted best first.
+        """
+        self.warmup()
+        vector = self._unit(self._embed([normalize_text(text)]))[0]
+        sims = self._centroids @ vector
+        order = np.argsort(-sims)
+        return [(self._labels[i], float(sims[i])) for i in order]
+
+    def predict(self, text: str) -> Tuple[str, float, bool]:
+        """
+        Predict the intent of a message.
+        Args:
+            text (str): The user message.
+        Returns:
+            tuple[str, float, bool]: Best intent, its score, and whether it is confident.
+        """
+        ranked = self.scores(text)
+        label, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        confident = best >= self.threshold and (best - runner_up) >= self.margin
+        return label, best, confident
+
+    def classify(self, text: str) -> str | None:
+        """
+        Return the intent when confident, else None so the caller uses the LLM.
+        Args:
+            text (str): The user message.
+        Returns:
+            str | None: The intent, or None on low confidence.
+        """
+        label, score, confident = self.predict(text)
+        with self._lock:
+            self._counts["hits" if confident else "fallbacks"] += 1
+        logger.debug(f"Fast-path intent {label} ({score:.3f}) confident={confident}")
+        return label if confident else None
+
+    def record_audit(self, predicted: str, llm_intent: str):
+        """
+        Record the LLM's label for a message the fast path answered.
+        Args:
+            predicted (str): The fast-path intent.
+            llm_intent (str): The LLM intent for the same message.
+        """
+        with self._lock:
+            self._counts["audited"] += 1
+            if predicted == llm_intent:
+                self._counts["audit_agreements"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = counts["hits"] + counts["fallbacks"]
+        counts["hit_rate"] = counts["hits"] / total if total else 0.0
+        counts["audited_accuracy"] = (
+            counts["audit_agreements"] / counts["audited"] if counts["audited"] else None
+        )
+        counts["threshold"] = self.threshold
+        return counts
+
+    def evaluate(self, examples: Dict[str, List[str]] | None = None) -> Dict[str, float]:
+        """
+        Leave-one-out evaluation over labelled examples at the current threshold.
+        Args:
+            examples (dict | None): Labelled messages; defaults to the training examples.
+        Returns:
+            dict: Coverage (share answered by the fast path), accuracy on those
+                  answers, and accuracy over all examples ignoring the threshold.
+        """
+        examples = examples or self.examples
+        if self._embed is None:
+            self._embed = _load_embedder()
+
+        rows = [(label, text) for label, texts in examples.items() for text in texts]
+        vectors = self._unit(self._embed([normalize_text(t) for _, t in rows]))
+        labels = sorted(examples)
+
+        answered = correct_answered = correct_all = 0
+        for i, (label, _) in enumerate(rows):
+            centroids = []
+            for candidate in labels:
+                idx = [j for j, (l, _) in enumerate(rows) if l == candidate and j != i]
+                centroids.append(vectors[idx].mean(axis=0))
+            sims = self._unit(np.stack(centroids)) @ vectors[i]
+            order = np.argsort(-sims)
+            predicted = labels[order[0]]
+            margin = sims[order[0]] - sims[order[1]]
+            correct_all += predicted == label
+            if sims[order[0]] >= self.threshold and margin >= self.margin:
+                answered += 1
+                correct_answered += predicted == label
+
+        total = len(rows)
+        return {
+            "examples": total,
+            "coverage": answered / total if total else 0.0,
+            "fastpath_accuracy": correct_answered / answered if answered else None,
+            "nearest_centroid_accuracy": correct_all / total if total else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    classifier = IntentClassifier()
+    for threshold in (0.4, 0.5, 0.6, 0.7):
+        classifier.threshold = threshold
+        print(threshold, classifier.evaluate())
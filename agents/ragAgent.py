@@ -1,8 +1,10 @@
 import os
 import logging
 from dotenv import load_dotenv
+import numpy as np
 from langchain_ollama import ChatOllama
-from tools.ragtools import build_rag_tools
+from tools.ragtools import build_rag_tools, embed_query
+from tools.vectorstore import get_vector_store
 from typing import TypedDict, Dict, Any, List
 from prompts.ragging_prompt import ragging_prompt
 from langgraph.graph import StateGraph, START, END
@@ -16,18 +18,23 @@ class RagState(TypedDict):
     result: Dict[str, Any] | None
     intent: str | None
     bank_name: str
-    embedding: list | None
+    embedding: np.ndarray | None
+    retrieved_docs: List[Dict[str, Any]] | None
 
 
 class RagAgent:
     """
     An agent for Retrieval-Augmented Generation (RAG) using LLMs and vector search.
-    1. Initializes with bank name and builds RAG tools.
-    2. Defines steps for embedding generation, similarity search, and answer generation.
+    1. Initializes with bank name and builds RAG tools (bound to the LLM only).
+    2. Defines steps for embedding generation, similarity search, and answer generation;
+       the embedding and search steps call the embedder and vector store directly,
+       passing the float32 array through the state without tool serialization.
     3. Constructs a state graph connecting these steps.
+    Configuration: RAG_TOP_K.
     """
     def __init__(self, bank_name: str):
         self.bank_name = bank_name
+        self.top_k = int(os.getenv("RAG_TOP_K", "5"))
         self.tools = build_rag_tools()
         self.model = ChatOllama(
             model=os.getenv("MODEL_NAME"), temperature=0.3
@@ -42,8 +49,8 @@ class RagAgent:
         Returns:
             RagState: Updated state with generated embedding.
         """
-        emb = self.tools[0].invoke({"query": state["user_input"]})
-        logger.debug(f"Generated embedding: {emb}")
+        emb = embed_query(state["user_input"])
+        logger.debug(f"Generated embedding of shape {emb.shape}")
         return {**state, "embedding": emb}
 
     def _similarity_step(self, state: RagState) -> RagState:
@@ -56,10 +63,7 @@ class RagAgent:
         """
 
         emb = state.get("embedding")
-        results = self.tools[1].invoke({
-            "embedding": emb,
-            "collection_name": self.bank_name
-        })
+        results = get_vector_store().search(self.bank_name, emb, self.top_k)[0]
         context_text = "\n".join([r["text"] for r in results])
         logger.debug(f"Retrieved context: {context_text}")
         return {**state, "context": context_text, "retrieved_docs": results}
@@ -0,0 +1,88 @@
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_agents: Dict[str, Any] = {}
+_checkpointer = None
+
+
+def set_checkpointer(checkpointer):
+    """
+    Set the checkpointer the shared graphs are compiled with. Must be called
+    before the agents are first built (the API does it in its lifespan).
+    Args:
+        checkpointer (BaseCheckpointSaver | None): The conversation state store.
+    """
+    global _checkpointer
+    if "intent" in _agents:
+        raise RuntimeError("Checkpointer must be set before the agents are built")
+    _checkpointer = checkpointer
+
+
+def _get_or_create(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Return the shared agent registered under name, creating it on first use.
+    Args:
+        name (str): Registry key of the agent.
+        factory (Callable[[], Any]): Builds the agent when it does not exist yet.
+    Returns:
+        Any: The process-wide agent instance.
+    """
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+
+    with _lock:
+        agent = _agents.get(name)
+        if agent is None:
+            logger.debug(f"Building shared agent '{name}'")
+            agent = factory()
+            _agents[name] = agent
+    return agent
+
+
+def get_intent_agent():
+    """
+    Return the process-wide IntentAgent. Its graph is compiled once and is
+    safe to invoke concurrently: identity travels through IntentState and the
+    per-request user context through config["configurable"]["user_ctx"].
+    Returns:
+        IntentAgent: The shared intent agent.
+    """
+    from agents.intentAgent import IntentAgent
+    return _get_or_create("intent", lambda: IntentAgent(checkpointer=_checkpointer))
+
+
+def warmup():
+    """
+    Build every shared agent up front so the first request does not pay for it.
+    The intent classifier's embedding model loads on first use unless
+    INTENT_FASTPATH_WARMUP=1 asks for it here.
+    """
+    agent = get_intent_agent()
+    if agent.classifier is not None and os.getenv("INTENT_FASTPATH_WARMUP", "0") == "1":
+        try:
+            agent.classifier.warmup()
+        except Exception as e:
+            agent.disable_fast_path(e)
+
+    if os.getenv("RAG_WARMUP", "0") == "1":
+        from tools import ragtools
+        try:
+            ragtools.warmup()
+        except Exception as e:
+            logger.warning(f"RAG warmup failed: {e}")
+
+
+def reset():
+    """
+    Drop all shared agents and the checkpointer. Mostly useful in tests.
+    """
+    global _checkpointer
+    with _lock:
+        _agents.clear()
+        _checkpointer = None
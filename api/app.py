@@ -1,9 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+import database
+import metrics
+from agents import registry
+from agents.checkpointer import open_checkpointer, close_checkpointer
+from agents.chatStore import aensure_indexes
+from tools.bcryptpool import shutdown_bcrypt_pool
+from tools.ragtools import close_embedding_batcher, close_embedding_cache
+from api.services.http_client import close_slack_client
 from fastapi.middleware.cors import CORSMiddleware
 from api.controllers.slack_controller import SlackController
 from api.controllers.chat_controller import ChatController
 
-app = FastAPI(title="Banking Assistant API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.open_pools()
+    await aensure_indexes(database.get_async_db())
+    checkpointer = await open_checkpointer()
+    registry.set_checkpointer(checkpointer)
+    registry.warmup()
+    await slack.service.start()
+    yield
+    await slack.service.stop()
+    await close_slack_client()
+    await close_checkpointer(checkpointer)
+    shutdown_bcrypt_pool()
+    close_embedding_batcher()
+    close_embedding_cache()
+    await database.close_pools()
+
+
+app = FastAPI(title="Banking Assistant API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +57,11 @@ async def root():
 async def health():
     return {"status": "ok"}
 
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
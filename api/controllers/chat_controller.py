@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from api.services.chat_service import ChatService
 from api.models.pydantic_models import ChatMessage, ChatResponse, SessionResponse
 
@@ -8,6 +9,7 @@ class ChatController:
         self.service = ChatService()
 
         self.router.post("")(self.chat)
+        self.router.post("/stream")(self.stream)
         self.router.post("/new")(self.new)
         self.router.get("/session/{session_id}")(self.get_session)
         self.router.delete("/session/{session_id}")(self.clear_session)
@@ -19,14 +21,21 @@ class ChatController:
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    async def stream(self, chat_message: ChatMessage):
+        return StreamingResponse(
+            self.service.stream_chat(chat_message),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     async def new(self):
         return self.service.new_session()
 
     async def get_session(self, session_id: str):
-        return self.service.get_session(session_id)
+        return await self.service.get_session(session_id)
 
     async def clear_session(self, session_id: str):
-        return self.service.clear_session(session_id)
+        return await self.service.clear_session(session_id)
 
-    async def list_sessions(self):
-        return self.service.list_sessions()
+    async def list_sessions(self, clientId: str | None = None):
+        return await self.service.list_sessions(clientId)
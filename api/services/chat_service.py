@@ -1,35 +1,37 @@
 import os
-from pymongo import MongoClient
-from user_context import UserDataContext
+import json
+import logging
+from database import get_async_db
+from user_context import AsyncUserDataContext
 from api.services.intent_service import IntentService
 from api.services.session_service import SessionService
 from api.models.pydantic_models import ChatMessage, ChatResponse, SessionResponse
 
+logger = logging.getLogger(__name__)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 class ChatService:
     def __init__(self):
         self.intent = IntentService()
         self.sessions = SessionService()
 
-        mongo = MongoClient(os.getenv("MONGO_URI"))
-        db = mongo["fransa_demo"]
-        self.cards = db["cards"]
-        self.transactions = db["transactions"]
-
     async def handle_chat(self, msg: ChatMessage) -> ChatResponse:
-        user_ctx = UserDataContext(msg.clientId, self.cards, self.transactions)
+        db = get_async_db()
+        user_ctx = AsyncUserDataContext(msg.clientId, db["cards"], db["transactions"])
 
         session_id = msg.session_id or f"session_{os.urandom(8).hex()}"
-        history = self.sessions.get(session_id)
 
-        result = self.intent.run(
+        result = await self.intent.arun(
+            thread_id=session_id,
             user_input=msg.message,
-            conversation_history=history,
             clientId=msg.clientId,
             user_ctx=user_ctx,
         )
 
-        self.sessions.set(session_id, result["conversation_history"])
-
         return ChatResponse(
             response=result["result"]["content"],
             intent=result["intent"],
@@ -37,15 +39,56 @@ class ChatService:
             conversation_history=result["conversation_history"],
         )
 
+    async def stream_chat(self, msg: ChatMessage):
+        """
+        Run one chat turn and yield Server-Sent Events as the graph progresses:
+        `node` when a graph node finishes, `token` for each answer token and a
+        final `done` carrying the ChatResponse. The checkpointer only records
+        the new turn in the session once the graph has completed.
+        """
+        db = get_async_db()
+        user_ctx = AsyncUserDataContext(msg.clientId, db["cards"], db["transactions"])
+
+        session_id = msg.session_id or f"session_{os.urandom(8).hex()}"
+
+        yield _sse("session", {"session_id": session_id})
+
+        try:
+            final_state = None
+            async for event in self.intent.astream(
+                thread_id=session_id,
+                user_input=msg.message,
+                clientId=msg.clientId,
+                user_ctx=user_ctx,
+            ):
+                if event["type"] == "token":
+                    yield _sse("token", {"node": event["node"], "content": event["content"]})
+                elif event["type"] == "node":
+                    yield _sse("node", {"node": event["node"], "graph": event["graph"]})
+                else:
+                    final_state = event["state"]
+        except Exception as e:
+            logger.exception("Chat stream failed")
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        response = ChatResponse(
+            response=final_state["result"]["content"],
+            intent=final_state["intent"],
+            session_id=session_id,
+            conversation_history=final_state["conversation_history"],
+        )
+        yield _sse("done", response.model_dump())
+
     def new_session(self):
         return SessionResponse(session_id=f"session_{os.urandom(8).hex()}", conversation_history=[])
 
-    def get_session(self, session_id: str):
-        return SessionResponse(session_id=session_id, conversation_history=self.sessions.get(session_id))
+    async def get_session(self, session_id: str):
+        return SessionResponse(session_id=session_id, conversation_history=await self.sessions.get(session_id))
 
-    def clear_session(self, session_id: str):
-        self.sessions.set(session_id, [])
+    async def clear_session(self, session_id: str):
+        await self.sessions.clear(session_id)
         return {"message": "Session cleared", "session_id": session_id}
 
-    def list_sessions(self):
-        return self.sessions.list()
+    async def list_sessions(self, client_id: str | None = None):
+        return await self.sessions.list(client_id)
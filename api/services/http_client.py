@@ -0,0 +1,246 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Tuple
+import httpx
+import metrics
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+SLACK_API_URL = "https://slack.com/api/"
+
+# Requests per second and burst per Web API method (Slack's published tiers).
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "chat.postMessage": (1.0, 5),   # "special" tier: ~1 message per second
+    "files.info": (1.5, 10),        # tier 4: 100+ per minute
+}
+DEFAULT_RATE = (0.8, 10)            # tier 3: 50+ per minute
+
+
+class TokenBucket:
+    """
+    An async token bucket: acquire() waits until a token is available.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """
+        Take one token, sleeping until one is available.
+        Returns:
+            float: Seconds spent waiting.
+        """
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait:
+                await asyncio.sleep(wait)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            self._tokens -= 1
+            return wait
+
+    def pause(self, seconds: float):
+        """Hold the next token back for `seconds`, e.g. after a 429 with Retry-After."""
+        self._tokens = 1 - seconds * self.rate
+        self._updated = time.monotonic()
+
+
+class SlackHttpClient:
+    """
+    A shared keep-alive client for all Slack traffic.
+    1. Reuses one httpx.AsyncClient (connection pool, HTTP keep-alive, timeouts).
+    2. Paces every Web API method through its own token bucket.
+    3. Retries 429 responses after Retry-After, and 5xx / transport errors
+       with exponential backoff and jitter.
+    4. Counts requests, retries, rate-limit hits and time spent throttled.
+    Configuration: SLACK_BOT_TOKEN, SLACK_HTTP_MAX_CONNECTIONS, SLACK_HTTP_TIMEOUT,
+    SLACK_HTTP_MAX_RETRIES, SLACK_HTTP_BACKOFF.
+    """
+    def __init__(
+        self,
+        token: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        max_retries: int | None = None,
+        backoff: float | None = None,
+        rate_limits: Dict[str, Tuple[float, int]] | None = None,
+    ):
+        max_connections = int(os.getenv("SLACK_HTTP_MAX_CONNECTIONS", "20"))
+        timeout = float(os.getenv("SLACK_HTTP_TIMEOUT", "10"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("SLACK_HTTP_MAX_RETRIES", "3"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("SLACK_HTTP_BACKOFF", "0.5"))
+        self.rate_limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+        self.client = httpx.AsyncClient(
+            base_url=SLACK_API_URL,
+            headers={"Authorization": f"Bearer {token or os.getenv('SLACK_BOT_TOKEN', '')}"},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+            transport=transport,
+        )
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "retries": 0, "rate_limited": 0, "errors": 0, "throttled_seconds": 0.0}
+
+    def _count(self, name: str, value: float = 1):
+        with self._lock:
+            self._counts[name] += value
+
+    def _bucket(self, method: str) -> TokenBucket:
+        bucket = self._buckets.get(method)
+        if bucket is None:
+            bucket = self._buckets[method] = TokenBucket(*self.rate_limits.get(method, DEFAULT_RATE))
+        return bucket
+
+    def _retry_delay(self, attempt: int, response: httpx.Response | None) -> float:
+        if response is not None and response.status_code == 429:
+            try:
+                return float(response.headers.get("Retry-After", "1"))
+            except ValueError:
+                return 1.0
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    async def request(self, method: str, url: str, bucket: str | None = None, **kwargs) -> httpx.Response:
+        """
+        Send a request with pacing and retries.
+        Args:
+            method (str): HTTP method.
+            url (str): Absolute URL, or a path relative to the Slack Web API.
+            bucket (str | None): Rate-limit bucket to pace the request through.
+            **kwargs: Passed to httpx.AsyncClient.request.
+        Returns:
+            httpx.Response: The last response (raise_for_status is left to the caller).
+        """
+        attempt = 0
+        while True:
+            if bucket:
+                self._count("throttled_seconds", await self._bucket(bucket).acquire())
+            self._count("requests")
+            response = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                retryable = response.status_code == 429 or response.status_code >= 500
+            except httpx.TransportError as e:
+                logger.warning(f"Slack request {method} {url} failed: {e}")
+                retryable = True
+                if attempt >= self.max_retries:
+                    self._count("errors")
+                    raise
+
+            if not retryable or attempt >= self.max_retries:
+                if response.status_code >= 400:
+                    self._count("errors")
+                return response
+
+            delay = self._retry_delay(attempt, response)
+            self._count("retries")
+            logger.debug(f"Retrying {method} {url} in {delay:.2f}s (attempt {attempt + 1})")
+            if response is not None and response.status_code == 429:
+                self._count("rate_limited")
+                if bucket:
+                    # Every caller of this method waits out Retry-After in the bucket.
+                    self._bucket(bucket).pause(delay)
+                    delay = 0.0
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def api_call(self, api_method: str, **payload) -> Dict[str, Any]:
+        """
+        Call a Slack Web API method with a JSON body.
+        Args:
+            api_method (str): e.g. "chat.postMessage".
+            **payload: The method arguments.
+        Returns:
+            dict: The decoded response; {"ok": False, ...} on Slack-level errors.
+        """
+        response = await self.request("POST", api_method, bucket=api_method, json=payload)
+        response.raise_for_status()
+        body = response.json()
+        if not body.get("ok"):
+            logger.warning(f"Slack {api_method} failed: {body.get('error')}")
+        return body
+
+    async def download_to(self, url: str, path: str, max_bytes: int | None = None, chunk_size: int = 64 * 1024) -> int:
+        """
+        Stream a private Slack file to disk in chunks, never holding it in memory.
+        Retries 429/5xx and transport errors like request(), restarting the file.
+        Args:
+            url (str): The file's url_private_download.
+            path (str): Destination file, truncated on every attempt.
+            max_bytes (int | None): Abort when the file is larger than this.
+            chunk_size (int): Bytes read per chunk.
+        Returns:
+            int: Number of bytes written.
+        Raises:
+            ValueError: If the file exceeds max_bytes.
+            httpx.HTTPError: If the download ultimately fails.
+        """
+        attempt = 0
+        while True:
+            self._count("requests")
+            try:
+                async with self.client.stream("GET", url, follow_redirects=True) as response:
+                    retryable = response.status_code == 429 or response.status_code >= 500
+                    if not retryable or attempt >= self.max_retries:
+                        response.raise_for_status()
+                        return await self._write_stream(response, path, max_bytes, chunk_size)
+                    delay = self._retry_delay(attempt, response)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    self._count("errors")
+                    raise
+                logger.warning(f"Slack download failed: {e}")
+                delay = self._retry_delay(attempt, None)
+            self._count("retries")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    async def _write_stream(response: httpx.Response, path: str, max_bytes: int | None, chunk_size: int) -> int:
+        written = 0
+        with open(path, "wb") as f:
+            async for chunk in response.aiter_bytes(chunk_size):
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise ValueError(f"File is larger than {max_bytes} bytes")
+                f.write(chunk)
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counts)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_client: SlackHttpClient | None = None
+
+
+def get_slack_client() -> SlackHttpClient:
+    """
+    Return the process-wide Slack client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        _client = SlackHttpClient()
+        metrics.register("slack_http", _client.stats)
+    return _client
+
+
+async def close_slack_client():
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+        metrics.unregister("slack_http")
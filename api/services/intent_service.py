@@ -1,6 +1,12 @@
-from agents.intentAgent import IntentAgent
+from agents.registry import get_intent_agent
 
 class IntentService:
-    def run(self, **kwargs):
-        agent = IntentAgent(kwargs["user_ctx"])
-        return agent.invoke(kwargs)
+    def run(self, thread_id: str | None = None, **kwargs):
+        return get_intent_agent().invoke(kwargs, thread_id=thread_id)
+
+    async def arun(self, thread_id: str | None = None, **kwargs):
+        return await get_intent_agent().ainvoke(kwargs, thread_id=thread_id)
+
+    async def astream(self, thread_id: str | None = None, **kwargs):
+        async for event in get_intent_agent().astream(kwargs, thread_id=thread_id):
+            yield event
@@ -1,12 +1,12 @@
-class SessionService:
-    def __init__(self):
-        self.sessions = {}
+from agents.registry import get_intent_agent
 
-    def get(self, session_id: str):
-        return self.sessions.setdefault(session_id, [])
+class SessionService:
+    """Conversation sessions, persisted per thread_id by the intent graph's checkpointer."""
+    async def get(self, session_id: str):
+        return await get_intent_agent().aget_history(session_id)
 
-    def set(self, session_id: str, history):
-        self.sessions[session_id] = history
+    async def clear(self, session_id: str):
+        await get_intent_agent().aclear_history(session_id)
 
-    def list(self):
-        return [{"session_id": sid, "message_count": len(hist)} for sid, hist in self.sessions.items()]
+    async def list(self, client_id: str | None = None):
+        return await get_intent_agent().alist_threads(client_id)
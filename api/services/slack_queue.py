@@ -0,0 +1,181 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+from dotenv import load_dotenv
+from caching import LRUCache
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+QUEUED, DUPLICATE, FULL = "queued", "duplicate", "full"
+
+
+class _Timing:
+    """Running count / mean / max of a duration."""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "max_ms": 1000 * self.max,
+        }
+
+
+class SlackEventQueue:
+    """
+    Background processing of Slack events after the HTTP request is acknowledged.
+    1. Drops events whose event_id was already accepted (Slack retries) using
+       an LRU with a TTL.
+    2. Keeps one lane per key (one Slack user): a lane handles its events one
+       at a time and in order, while different lanes run independently.
+    3. Runs an optional prepare step (e.g. audio transcription) in the lane
+       before taking one of the SLACK_WORKERS handler slots, so slow
+       preparation never holds up other users' events.
+    4. Bounds the number of pending events; when full, rejects so Slack retries.
+    5. Reports queue depth, wait, preparation and processing latency, and failures.
+    Configuration: SLACK_WORKERS, SLACK_QUEUE_SIZE, SLACK_DEDUPE_SIZE, SLACK_DEDUPE_TTL.
+    """
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        workers: int | None = None,
+        maxsize: int | None = None,
+        dedupe_ttl: float | None = None,
+        prepare: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]] | None = None,
+    ):
+        self.handler = handler
+        self.prepare = prepare
+        self.workers = workers or int(os.getenv("SLACK_WORKERS", "4"))
+        self.maxsize = maxsize or int(os.getenv("SLACK_QUEUE_SIZE", "100"))
+        self.seen = LRUCache(
+            maxsize=int(os.getenv("SLACK_DEDUPE_SIZE", "10000")),
+            ttl=dedupe_ttl if dedupe_ttl is not None else float(os.getenv("SLACK_DEDUPE_TTL", "3600")),
+        )
+        self._lanes: Dict[str, Deque[Tuple[float, Dict[str, Any]]]] = {}
+        self._lane_tasks: Dict[str, asyncio.Task] = {}
+        self._slots: asyncio.Semaphore | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._counts = {"accepted": 0, "duplicates": 0, "rejected": 0, "processed": 0, "failed": 0}
+        self._wait = _Timing()
+        self._prepare = _Timing()
+        self._run = _Timing()
+
+    @property
+    def running(self) -> bool:
+        return self._slots is not None
+
+    async def start(self):
+        """
+        Start accepting events on the running event loop.
+        """
+        if self.running:
+            return
+        self._slots = asyncio.Semaphore(self.workers)
+        logger.debug(f"Slack event queue started with {self.workers} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Stop accepting events, let the lanes drain for up to timeout seconds, then cancel them.
+        """
+        if not self.running:
+            return
+        self._slots, slots = None, self._slots
+        tasks = list(self._lane_tasks.values())
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            if pending:
+                logger.warning("Slack event queue did not drain before shutdown")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def submit(self, event_id: str | None, key: str, event: Dict[str, Any]) -> str:
+        """
+        Enqueue an event without waiting for it to be processed.
+        Args:
+            event_id (str | None): Slack's event_id, used for dedupe.
+            key (str): Ordering key; events with the same key run one at a time, in order.
+            event (dict): The event payload handed to the handler.
+        Returns:
+            str: "queued", "duplicate" (already accepted) or "full" (rejected, retry later).
+        """
+        if not self.running:
+            raise RuntimeError("Slack event queue is not started")
+        if event_id and not self.seen.add(event_id):
+            self._count("duplicates")
+            return DUPLICATE
+
+        if self._pending >= self.maxsize:
+            # Forget the id so Slack's retry of this event is accepted.
+            if event_id:
+                self.seen.pop(event_id)
+            self._count("rejected")
+            logger.warning(f"Slack event queue full; rejecting event {event_id}")
+            return FULL
+
+        self._pending += 1
+        self._lanes.setdefault(key, deque()).append((time.perf_counter(), event))
+        if key not in self._lane_tasks:
+            self._lane_tasks[key] = asyncio.create_task(self._drain(key, self._slots), name=f"slack-lane-{key}")
+        self._count("accepted")
+        return QUEUED
+
+    async def _drain(self, key: str, slots: asyncio.Semaphore):
+        lane = self._lanes[key]
+        try:
+            while lane:
+                enqueued_at, event = lane.popleft()
+                dequeued = prepared = started = time.perf_counter()
+                try:
+                    if self.prepare is not None:
+                        event = await self.prepare(event)
+                        prepared = time.perf_counter()
+                        with self._lock:
+                            self._prepare.add(prepared - dequeued)
+                    async with slots:
+                        started = time.perf_counter()
+                        with self._lock:
+                            # Time spent behind the lane's earlier events plus waiting for a slot.
+                            self._wait.add((dequeued - enqueued_at) + (started - prepared))
+                        await self.handler(event)
+                    self._count("processed")
+                except Exception:
+                    logger.exception("Slack event processing failed")
+                    self._count("failed")
+                finally:
+                    self._pending -= 1
+                    with self._lock:
+                        self._run.add(time.perf_counter() - started)
+        finally:
+            self._lanes.pop(key, None)
+            self._lane_tasks.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["queue_wait"] = self._wait.snapshot()
+            counts["prepare"] = self._prepare.snapshot()
+            counts["processing"] = self._run.snapshot()
+        counts["queue_depth"] = self._pending
+        counts["active_lanes"] = len(self._lane_tasks)
+        counts["workers"] = self.workers
+        counts["maxsize"] = self.maxsize
+        return counts
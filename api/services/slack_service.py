@@ -1,36 +1,43 @@
-import os
-import requests
-import tempfile
+import logging
+import metrics
 from fastapi import Request
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
-from pymongo import MongoClient
-#from user_context import UserDataContext
+from database import get_async_db
+from user_context import AsyncUserDataContext
 from api.services.slack_utils import SlackUtils
 from api.services.stt_service import STTService
 from api.services.intent_service import IntentService
-from api.services.session_service import SessionService
+from api.services.slack_queue import SlackEventQueue, FULL
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 class SlackService:
+    """
+    Acknowledges Slack events immediately and processes them on a background
+    SlackEventQueue: retries are dropped by event_id, and each user's events
+    run in order because they share the user's conversation thread. Audio is
+    transcribed in the queue's prepare step, so a long voice note only holds
+    up its own user's lane, not the handler slots.
+    """
     def __init__(self):
         self.intent = IntentService()
-        self.sessions = SessionService()
         self.stt = STTService()
         self.slack = SlackUtils()
+        self.queue = SlackEventQueue(self.handle_event, prepare=self.prepare_event)
+        metrics.register("slack_queue", self.queue.stats)
 
-        mongo = MongoClient(os.getenv("MONGO_URI"))
-        db = mongo["fransa_demo"]
-        self.users = db["users"]
-        self.cards = db["cards"]
-        self.transactions = db["transactions"]
+    async def start(self):
+        await self.queue.start()
+
+    async def stop(self):
+        await self.queue.stop()
+        await self.stt.stop()
 
     async def process_event(self, request: Request):
         data = await request.json()
 
-        if request.headers.get("X-Slack-Retry-Num"):
-            return {"ok": True}
-
         if data.get("type") == "url_verification":
             return {"challenge": data["challenge"]}
 
@@ -39,50 +46,65 @@ class SlackService:
 
         event = data["event"]
 
-        if event.get("subtype") == "bot_message":
+        if event.get("subtype") == "bot_message" or event.get("bot_id"):
             return {"ok": True}
 
+        key = event.get("user") or event.get("channel") or ""
+        if self.queue.submit(data.get("event_id"), key, event) == FULL:
+            # A non-2xx answer makes Slack retry the event later.
+            return JSONResponse({"ok": False, "error": "busy"}, status_code=503)
+
+        return {"ok": True}
+
+    async def prepare_event(self, event: dict) -> dict:
+        """
+        Transcribe an audio attachment, if any, into the event's text.
+        Returns:
+            dict: A copy of the event with "text" set, or "error" if transcription failed.
+        """
+        audio = next((f for f in event.get("files", []) if self.stt.is_audio_file(f)), None)
+        if not audio:
+            return event
+        try:
+            return {**event, "text": await self.stt.transcribe_remote_file(audio)}
+        except Exception as e:
+            logger.warning(f"Audio transcription failed: {e}")
+            return {**event, "error": f"Audio processing failed: {e}"}
+
+    async def handle_event(self, event: dict):
+        """
+        Run one (already transcribed) Slack message through intent routing
+        and the agents, then post the answer back to the channel.
+        """
         user_id = event["user"]
         channel = event["channel"]
         text = (event.get("text") or "").strip()
 
-        # audio attachment handling
-        files = event.get("files", [])
-        if files:
-            audio = next((f for f in files if self.stt.is_audio_file(f)), None)
-            if audio:
-                try:
-                    text = self.stt.transcribe_remote_file(audio)
-                except Exception as e:
-                    self.slack.send_message(channel, f"Audio processing failed: {e}")
-                    return {"ok": True}
+        if event.get("error"):
+            await self.slack.send_message(channel, event["error"])
+            return
 
         if not text:
-            return {"ok": True}
+            return
 
-        user_doc = self.users.find_one({"slack_id": user_id})
+        db = get_async_db()
+        user_doc = await db["users"].find_one({"slack_id": user_id})
         if not user_doc:
-            return {"ok": True}
+            return
 
         client_id = user_doc.get("clientId")
         if not client_id:
-            self.slack.send_message(channel, "Missing client ID.")
-            return {"ok": True}
+            await self.slack.send_message(channel, "Missing client ID.")
+            return
 
-        ##user_ctx = UserDataContext(client_id, self.cards, self.transactions)
+        user_ctx = AsyncUserDataContext(client_id, db["cards"], db["transactions"])
 
-        session_id = f"slack_{user_id}"
-        history = self.sessions.get(session_id)
-
-        result = self.intent.run(
+        result = await self.intent.arun(
+            thread_id=f"slack_{user_id}",
             user_input=text,
-            conversation_history=history,
             slack_user_id=user_id,
             clientId=client_id,
-            user_ctx=None,
+            user_ctx=user_ctx,
         )
 
-        self.sessions.set(session_id, result["conversation_history"])
-        self.slack.send_message(channel, result["result"]["content"])
-
-        return {"ok": True}
+        await self.slack.send_message(channel, result["result"]["content"])
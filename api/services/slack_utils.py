@@ -1,8 +1,5 @@
-import os
-import requests
+from api.services.http_client import get_slack_client
 
 class SlackUtils:
-    def send_message(self, channel, text):
-        token = os.getenv("SLACK_BOT_TOKEN")
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-        requests.post("https://slack.com/api/chat.postMessage", headers=headers, json={"channel": channel, "text": text})
+    async def send_message(self, channel, text):
+        return await get_slack_client().api_call("chat.postMessage", channel=channel, text=text)
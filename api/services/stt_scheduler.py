@@ -0,0 +1,173 @@
+import os
+import bisect
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+SAMPLING_RATE = 16000
+WINDOW_SAMPLES = 30 * SAMPLING_RATE  # Whisper's 30 s input window
+
+
+def layout_windows(lengths: Sequence[int], window: int = WINDOW_SAMPLES) -> Tuple[List[int], List[Dict[str, int]]]:
+    """
+    Place several clips back to back on one timeline and cut each into
+    windows of at most `window` samples that never cross into the next clip.
+    Args:
+        lengths (Sequence[int]): Clip lengths in samples.
+        window (int): Maximum window length in samples.
+    Returns:
+        tuple: (offsets, windows) - each clip's first sample on the timeline,
+        and every window as {"start": sample, "end": sample}.
+    """
+    offsets, windows = [], []
+    position = 0
+    for length in lengths:
+        offsets.append(position)
+        for start in range(position, position + length, window):
+            windows.append({"start": start, "end": min(start + window, position + length)})
+        position += length
+    return offsets, windows
+
+
+def assign_segments(offsets: Sequence[int], segments, sampling_rate: int = SAMPLING_RATE) -> List[str]:
+    """
+    Split segments transcribed from a layout_windows() timeline back into per-clip texts.
+    Args:
+        offsets (Sequence[int]): Clip offsets (in samples) returned by layout_windows().
+        segments: Iterable of objects with .start, .end (seconds) and .text.
+    Returns:
+        list[str]: One transcript per clip, in order.
+    """
+    parts: List[List[str]] = [[] for _ in offsets]
+    for segment in segments:
+        # Segment times are rounded; the midpoint is safely inside its clip.
+        middle = (segment.start + segment.end) / 2 * sampling_rate
+        index = max(0, bisect.bisect_right(offsets, middle) - 1)
+        text = segment.text.strip()
+        if text:
+            parts[index].append(text)
+    return [" ".join(p) for p in parts]
+
+
+class STTScheduler:
+    """
+    Micro-batches concurrent transcription requests.
+    1. Collects requests for up to STT_BATCH_WAIT_MS after the first one, or
+       until STT_BATCH_SIZE are waiting, and hands them to transcribe_batch
+       as one call on the STT executor.
+    2. Starts at most `workers` batches at a time; while they run, new
+       requests queue up and form the next (larger) batch.
+    3. Reports batch sizes and the time requests spent waiting and running.
+    Configuration: STT_BATCH_SIZE, STT_BATCH_WAIT_MS.
+    """
+    def __init__(
+        self,
+        transcribe_batch: Callable[[List[str]], List[str]],
+        executor: Executor,
+        workers: int = 1,
+        batch_size: int | None = None,
+        max_wait: float | None = None,
+    ):
+        self.transcribe_batch = transcribe_batch
+        self.executor = executor
+        self.workers = workers
+        self.batch_size = batch_size or int(os.getenv("STT_BATCH_SIZE", "8"))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("STT_BATCH_WAIT_MS", "200")) / 1000
+        self._queue: asyncio.Queue | None = None
+        self._collector: asyncio.Task | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._batches: set = set()
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "batches": 0, "max_batch": 0, "failed": 0, "wait_seconds": 0.0, "run_seconds": 0.0}
+
+    def _start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._collector = asyncio.create_task(self._collect(), name="stt-batcher")
+
+    async def transcribe(self, path: str) -> str:
+        """
+        Transcribe an audio file as part of the next batch.
+        Args:
+            path (str): Local audio file.
+        Returns:
+            str: The transcript.
+        """
+        if self._collector is None or self._collector.done():
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((time.perf_counter(), path, future))
+        return await future
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                await self._slots.acquire()
+                deadline = time.perf_counter() + self.max_wait
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.perf_counter()
+                    try:
+                        batch.append(self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout))
+                    except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                        break
+            except asyncio.CancelledError:
+                for _, _, future in batch:
+                    future.cancel()
+                raise
+            task = asyncio.create_task(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        try:
+            paths = [path for _, path, _ in batch]
+            loop = asyncio.get_running_loop()
+            try:
+                texts = await loop.run_in_executor(self.executor, self.transcribe_batch, paths)
+            except Exception as e:
+                logger.exception(f"STT batch of {len(batch)} failed")
+                with self._lock:
+                    self._counts["failed"] += len(batch)
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (_, _, future), text in zip(batch, texts):
+                if not future.done():
+                    future.set_result(text)
+        finally:
+            self._slots.release()
+            finished = time.perf_counter()
+            with self._lock:
+                self._counts["requests"] += len(batch)
+                self._counts["batches"] += 1
+                self._counts["max_batch"] = max(self._counts["max_batch"], len(batch))
+                self._counts["wait_seconds"] += sum(started - queued for queued, _, _ in batch)
+                self._counts["run_seconds"] += finished - started
+
+    async def stop(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, *self._batches, return_exceptions=True)
+            self._collector = None
+            while not self._queue.empty():
+                _, _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("STT scheduler stopped"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["avg_batch"] = counts["requests"] / counts["batches"] if counts["batches"] else 0.0
+        counts["batch_size"] = self.batch_size
+        counts["max_wait_ms"] = 1000 * self.max_wait
+        return counts
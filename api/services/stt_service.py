@@ -1,32 +1,127 @@
 import os
-import requests
+import asyncio
+import logging
 import tempfile
-from faster_whisper import WhisperModel
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+import metrics
+from api.services.http_client import get_slack_client
+from api.services.stt_scheduler import SAMPLING_RATE, STTScheduler, assign_segments, layout_windows
+from api.services.transcript_cache import TranscriptCache, file_sha256
+
+logger = logging.getLogger(__name__)
 
 class STTService:
+    """
+    Speech-to-text for Slack audio attachments.
+    1. Streams the download to a temporary file in chunks (capped by STT_MAX_DOWNLOAD_MB).
+    2. Transcribes on a dedicated pool of STT_WORKERS threads, so Whisper never
+       occupies the event loop or the default executor used by other requests.
+    3. Consumes Whisper's segment generator lazily on the worker thread.
+    4. Caches transcripts by Slack file id and audio hash (TranscriptCache),
+       and shares one transcription between concurrent requests for a file.
+    5. Micro-batches concurrent requests (STTScheduler) into one batched
+       Whisper pass; a batch of one uses the regular sequential decoder.
+    Configuration: STT_MODEL, STT_WORKERS, STT_CPU_THREADS, STT_MAX_DOWNLOAD_MB,
+    STT_LANGUAGE (fixes the language of batched passes; detected when unset).
+    """
     def __init__(self):
-        self.model = WhisperModel("small", device="cpu", compute_type="int8")
+        self.workers = int(os.getenv("STT_WORKERS", "1"))
+        self.max_bytes = int(float(os.getenv("STT_MAX_DOWNLOAD_MB", "25")) * 1024 * 1024)
+        self.model = WhisperModel(
+            os.getenv("STT_MODEL", "small"),
+            device="cpu",
+            compute_type="int8",
+            cpu_threads=int(os.getenv("STT_CPU_THREADS", "0")),
+            num_workers=self.workers,
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stt")
+        self.pipeline = BatchedInferencePipeline(model=self.model)
+        self.language = os.getenv("STT_LANGUAGE") or None
+        self.scheduler = STTScheduler(self.transcribe_batch, self.executor, workers=self.workers)
         self.audio_types = {"mp3", "wav", "m4a", "ogg", "webm", "mp4"}
+        self.cache = TranscriptCache()
+        self._inflight = {}
+        metrics.register("stt_cache", self.cache.stats)
+        metrics.register("stt_batching", self.scheduler.stats)
 
     def is_audio_file(self, file_obj):
         mime = (file_obj.get("mimetype") or "").lower()
         ext = (file_obj.get("filetype") or "").lower()
         return mime.startswith("audio/") or ext in self.audio_types
 
-    def transcribe_remote_file(self, file_obj):
-        url = file_obj["url_private_download"]
-        token = os.getenv("SLACK_BOT_TOKEN")
+    def transcribe_file(self, path):
+        segments, _ = self.model.transcribe(path)
+        # segments is a generator: decoding happens while it is consumed, here on the worker.
+        parts = []
+        for segment in segments:
+            parts.append(segment.text.strip())
+        return " ".join(p for p in parts if p)
+
+    def transcribe_batch(self, paths):
+        """
+        Transcribe several files in one batched Whisper pass.
+        The clips are laid back to back and cut into <=30 s windows that the
+        pipeline decodes batch_size at a time; segments are mapped back to
+        their clip by timestamp.
+        Args:
+            paths (list[str]): Local audio files.
+        Returns:
+            list[str]: One transcript per file, in order.
+        """
+        if len(paths) == 1:
+            return [self.transcribe_file(paths[0])]
 
-        resp = requests.get(url, headers={"Authorization": f"Bearer {token}"})
-        resp.raise_for_status()
+        clips = [decode_audio(path, sampling_rate=SAMPLING_RATE) for path in paths]
+        offsets, windows = layout_windows([len(clip) for clip in clips])
+        if not windows:
+            return ["" for _ in paths]
+        segments, _ = self.pipeline.transcribe(
+            np.concatenate(clips),
+            language=self.language,
+            clip_timestamps=windows,
+            batch_size=self.scheduler.batch_size,
+        )
+        return assign_segments(offsets, segments)
 
+    async def transcribe_remote_file(self, file_obj):
+        file_id = file_obj.get("id")
+        sha = self.cache.hash_for(file_id)
+        if sha:
+            text = await self.cache.aget(sha)
+            if text is not None:
+                return text
+
+        if not file_id:
+            return await self._transcribe_download(file_obj)
+        task = self._inflight.get(file_id)
+        if task is None:
+            task = self._inflight[file_id] = asyncio.ensure_future(self._transcribe_download(file_obj))
+            task.add_done_callback(lambda _: self._inflight.pop(file_id, None))
+        return await asyncio.shield(task)
+
+    async def _transcribe_download(self, file_obj):
+        url = file_obj["url_private_download"]
         ext = file_obj.get("filetype") or "wav"
         fd, path = tempfile.mkstemp(suffix=f".{ext}")
+        os.close(fd)
 
-        with os.fdopen(fd, "wb") as f:
-            f.write(resp.content)
+        try:
+            size = await get_slack_client().download_to(url, path, max_bytes=self.max_bytes)
+            logger.debug(f"Downloaded {size} bytes of audio to {path}")
+            sha = await asyncio.to_thread(file_sha256, path)
+            text = await self.cache.aget(sha)
+            if text is not None:
+                self.cache.remember(file_obj.get("id"), sha)
+                return text
 
-        segments, _ = self.model.transcribe(path)
-        os.remove(path)
+            text = await self.scheduler.transcribe(path)
+            await self.cache.aset(sha, text, file_id=file_obj.get("id"))
+            return text
+        finally:
+            os.remove(path)
 
-        return " ".join([s.text for s in segments]).strip()
+    async def stop(self):
+        await self.scheduler.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,180 @@
+import os
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Dict
+from dotenv import load_dotenv
+from caching import LRUCache
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Hash a file in chunks.
+    Returns:
+        str: The hex SHA-256 of the file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """
+    Transcripts of Slack audio, so repeated voice notes skip Whisper.
+    1. Maps Slack file ids to content hashes in memory, so a retried or
+       edited message skips the download as well.
+    2. Keeps transcripts by content hash in a memory LRU. Setting
+       STT_CACHE_DIR adds a directory of <sha256>.txt files so they survive
+       restarts; transcripts are stored as plain text, readable only by the
+       service's user.
+    3. Bounds the directory to STT_CACHE_DISK_MB, evicting the least
+       recently used files (by mtime, refreshed on every hit).
+    4. Counts memory hits, disk hits, misses and disk evictions.
+    aget/aset run the disk IO on a worker thread for callers on the event loop.
+    Configuration: STT_CACHE_SIZE, STT_CACHE_DIR (empty, the default, keeps transcripts in memory only),
+    STT_CACHE_DISK_MB.
+    """
+    def __init__(self, maxsize: int | None = None, directory: str | None = None, max_disk_bytes: int | None = None):
+        maxsize = maxsize or int(os.getenv("STT_CACHE_SIZE", "512"))
+        self.files = LRUCache(maxsize=maxsize * 4)
+        self.memory = LRUCache(maxsize=maxsize)
+        self.directory = directory if directory is not None else os.getenv("STT_CACHE_DIR", "")
+        self.max_disk_bytes = max_disk_bytes or int(float(os.getenv("STT_CACHE_DISK_MB", "50")) * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_evictions": 0}
+        self._disk_bytes = 0
+        if self.directory:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _path(self, sha: str) -> str:
+        return os.path.join(self.directory, f"{sha}.txt")
+
+    def _disk_entries(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".txt"):
+                stat = entry.stat()
+                yield stat.st_mtime, entry.path, stat.st_size
+
+    def hash_for(self, file_id: str | None) -> str | None:
+        """
+        Return the content hash recorded for a Slack file id, if any.
+        """
+        return self.files.get(file_id) if file_id else None
+
+    def remember(self, file_id: str | None, sha: str):
+        if file_id:
+            self.files.set(file_id, sha)
+
+    def _get_memory(self, sha: str) -> str | None:
+        text = self.memory.get(sha)
+        if text is not None:
+            self._count("memory_hits")
+        return text
+
+    def _get_disk(self, sha: str) -> str | None:
+        if self.directory:
+            path = self._path(sha)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+                os.utime(path)
+            except FileNotFoundError:
+                text = None
+            if text is not None:
+                self.memory.set(sha, text)
+                self._count("disk_hits")
+                return text
+
+        self._count("misses")
+        return None
+
+    def get(self, sha: str) -> str | None:
+        """
+        Look up a transcript by content hash, promoting disk hits into memory.
+        Args:
+            sha (str): The audio's SHA-256.
+        Returns:
+            str | None: The transcript, or None on a miss.
+        """
+        text = self._get_memory(sha)
+        return text if text is not None else self._get_disk(sha)
+
+    async def aget(self, sha: str) -> str | None:
+        """
+        Async variant of get; memory hits are served inline, disk reads on a worker thread.
+        """
+        text = self._get_memory(sha)
+        if text is not None:
+            return text
+        if not self.directory:
+            return self._get_disk(sha)
+        return await asyncio.to_thread(self._get_disk, sha)
+
+    def set(self, sha: str, text: str, file_id: str | None = None):
+        """
+        Store a transcript under its content hash (and remember the file id).
+        """
+        self.remember(file_id, sha)
+        self.memory.set(sha, text)
+        if self.directory:
+            self._write_disk(sha, text)
+
+    async def aset(self, sha: str, text: str, file_id: str | None = None):
+        """
+        Async variant of set; the disk write runs on a worker thread.
+        """
+        self.remember(file_id, sha)
+        self.memory.set(sha, text)
+        if self.directory:
+            await asyncio.to_thread(self._write_disk, sha, text)
+
+    def _write_disk(self, sha: str, text: str):
+        data = text.encode("utf-8")
+        path = self._path(sha)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                f.write(data)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write transcript cache entry {sha}: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(data) - previous
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        with self._lock:
+            for _, path, size in sorted(self._disk_entries()):
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                self._disk_bytes -= size
+                self._counts["disk_evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["disk_bytes"] = self._disk_bytes
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        counts["hit_ratio"] = (counts["memory_hits"] + counts["disk_hits"]) / lookups if lookups else 0.0
+        counts["memory_size"] = len(self.memory)
+        counts["max_disk_bytes"] = self.max_disk_bytes
+        return counts
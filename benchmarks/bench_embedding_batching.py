@@ -0,0 +1,74 @@
+"""
+Throughput of batched vs. unbatched query embedding on the CPU.
+
+For 1, 8 and 32 concurrent callers, each caller embeds --queries distinct
+texts in a loop, once calling SentenceTransformer.encode directly (one text
+per call) and once through EmbeddingBatcher. Prints queries per second and
+the average batch size. The embedding cache is bypassed.
+
+    python benchmarks/bench_embedding_batching.py --queries 50 --max-wait-ms 5
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.ragtools import get_embedder  # noqa: E402
+from tools.embeddingbatcher import EmbeddingBatcher  # noqa: E402
+
+TEMPLATES = [
+    "what is the annual fee for the {} card",
+    "how do I raise the limit on my {} account",
+    "is there a charge for withdrawing cash abroad with {}",
+    "what documents do I need to open a {} account",
+]
+
+
+def queries(caller: int, count: int):
+    return [TEMPLATES[i % len(TEMPLATES)].format(f"plan {caller}-{i}") for i in range(count)]
+
+
+def run(embed, callers: int, count: int) -> float:
+    def work(caller):
+        for text in queries(caller, count):
+            embed(text)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(work, range(callers)))
+    return callers * count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=50, help="Queries per caller.")
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Maximum batch size.")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="Batching window.")
+    args = parser.parse_args()
+
+    model = get_embedder()
+    model.encode(["warmup"])
+
+    def unbatched(text):
+        return model.encode(text, convert_to_numpy=True)
+
+    print(f"{'callers':>7} {'unbatched q/s':>14} {'batched q/s':>12} {'speedup':>8} {'avg batch':>10}")
+    for callers in args.callers:
+        batcher = EmbeddingBatcher(
+            lambda texts: model.encode(texts, batch_size=len(texts), convert_to_numpy=True),
+            batch_size=args.batch_size,
+            max_wait=args.max_wait_ms / 1000,
+        )
+        plain = run(unbatched, callers, args.queries)
+        batched = run(batcher.embed, callers, args.queries)
+        avg_batch = batcher.stats()["avg_batch"]
+        batcher.close()
+        print(f"{callers:>7} {plain:>14.1f} {batched:>12.1f} {batched / plain:>7.2f}x {avg_batch:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
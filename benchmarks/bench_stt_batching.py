@@ -0,0 +1,60 @@
+"""
+Throughput of batched vs. unbatched Whisper transcription on the CPU int8 model.
+
+Fires --requests concurrent transcriptions (cycling through the given audio
+files) through STTScheduler, once with batch size 1 (every request decoded
+on its own, as before batching) and once per --batch-size value, and prints
+requests per second and seconds of audio per second.
+
+    python benchmarks/bench_stt_batching.py voice1.ogg voice2.m4a --requests 16 --batch-size 4 8
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faster_whisper import decode_audio  # noqa: E402
+from api.services.stt_service import STTService  # noqa: E402
+from api.services.stt_scheduler import SAMPLING_RATE, STTScheduler  # noqa: E402
+
+
+async def run(service: STTService, paths, batch_size: int, max_wait: float):
+    with ThreadPoolExecutor(max_workers=service.workers, thread_name_prefix="bench-stt") as executor:
+        scheduler = STTScheduler(service.transcribe_batch, executor, workers=service.workers,
+                                 batch_size=batch_size, max_wait=max_wait)
+        started = time.perf_counter()
+        await asyncio.gather(*(scheduler.transcribe(path) for path in paths))
+        elapsed = time.perf_counter() - started
+        await scheduler.stop()
+    return elapsed, scheduler.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio", nargs="+", help="Audio files to transcribe.")
+    parser.add_argument("--requests", type=int, default=16, help="Concurrent requests per run.")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[4, 8], help="Batch sizes to compare against 1.")
+    parser.add_argument("--max-wait-ms", type=float, default=200, help="Batching window.")
+    args = parser.parse_args()
+
+    service = STTService()
+    paths = [args.audio[i % len(args.audio)] for i in range(args.requests)]
+    audio_seconds = sum(len(decode_audio(p, sampling_rate=SAMPLING_RATE)) for p in paths) / SAMPLING_RATE
+
+    # Warm up the model so the first run doesn't pay for loading.
+    service.transcribe_file(args.audio[0])
+
+    print(f"{args.requests} requests, {audio_seconds:.1f} s of audio, {service.workers} STT worker(s)")
+    print(f"{'batch':>5} {'seconds':>9} {'req/s':>7} {'audio s/s':>10} {'avg batch':>10}")
+    for batch_size in [1, *args.batch_size]:
+        elapsed, stats = asyncio.run(run(service, paths, batch_size, args.max_wait_ms / 1000))
+        print(f"{batch_size:>5} {elapsed:>9.2f} {args.requests / elapsed:>7.2f} "
+              f"{audio_seconds / elapsed:>10.2f} {stats['avg_batch']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Small in-process caches shared by the agents and services.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded LRU cache with an optional per-entry TTL.
+    1. get() moves hits to the most-recently-used end and drops expired entries.
+    2. set() evicts the least-recently-used entry once maxsize is exceeded.
+    3. Counts hits, misses, evictions and expirations for reporting.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[Any, float | None]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for key, or default on a miss.
+        Args:
+            key (Hashable): The cache key.
+            default (Any): Value returned when the key is absent or expired.
+        Returns:
+            Any: The cached value or default.
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self._counts["misses"] += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._counts["expirations"] += 1
+                self._counts["misses"] += 1
+                return default
+
+            self._data.move_to_end(key)
+            self._counts["hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """
+        Store value under key.
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to cache.
+            ttl (float | None): Seconds to keep the entry; defaults to the cache TTL.
+        """
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: Hashable, value: Any, ttl: float | None):
+        # Caller holds self._lock.
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._counts["evictions"] += 1
+
+    def add(self, key: Hashable, value: Any = True, ttl: float | None = None) -> bool:
+        """
+        Store value only if key is absent (or expired).
+        Returns:
+            bool: True if the value was stored, False if key was already cached.
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at = entry[1]
+                if expires_at is None or expires_at > time.monotonic():
+                    return False
+            self._store(key, value, ttl)
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["size"] = len(self._data)
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = counts["hits"] / lookups if lookups else 0.0
+        counts["maxsize"] = self.maxsize
+        return counts
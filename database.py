@@ -0,0 +1,125 @@
+"""
+Shared MongoDB connection pools.
+
+Every component talks to `fransa_demo` through the clients created here, so a
+process holds one sync and one async pool instead of a MongoClient per service.
+Pool size and timeouts are configured through the environment:
+    MONGO_URI, MONGO_DB, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS, MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS
+"""
+import os
+import logging
+import threading
+from dotenv import load_dotenv
+from pymongo import MongoClient, AsyncMongoClient
+from pymongo.database import Database
+from pymongo.asynchronous.database import AsyncDatabase
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_client: MongoClient | None = None
+_async_client: AsyncMongoClient | None = None
+
+
+def _mongo_uri(uri: str | None = None) -> str:
+    uri = uri or os.getenv("MONGO_URI")
+    if not uri:
+        logger.error("MONGO_URI environment variable is not set.")
+        raise RuntimeError("Missing MONGO_URI")
+    return uri
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def pool_options() -> dict:
+    """
+    Build the pool settings shared by the sync and async clients.
+    Returns:
+        dict: Keyword arguments for MongoClient / AsyncMongoClient.
+    """
+    return {
+        "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS", 60000),
+        "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS", 10000),
+        "waitQueueTimeoutMS": _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000),
+    }
+
+
+def db_name() -> str:
+    return os.getenv("MONGO_DB", "fransa_demo")
+
+
+def get_client(uri: str | None = None) -> MongoClient:
+    """
+    Return the process-wide pooled MongoClient, creating it on first use.
+    Args:
+        uri (str | None): Overrides MONGO_URI when the pool is first created.
+    Returns:
+        MongoClient: The shared client.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                options = pool_options()
+                logger.debug(f"Opening MongoDB pool with {options}")
+                _client = MongoClient(_mongo_uri(uri), **options)
+    return _client
+
+
+def get_async_client(uri: str | None = None) -> AsyncMongoClient:
+    """
+    Return the process-wide pooled AsyncMongoClient, creating it on first use.
+    Args:
+        uri (str | None): Overrides MONGO_URI when the pool is first created.
+    Returns:
+        AsyncMongoClient: The shared async client.
+    """
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                options = pool_options()
+                logger.debug(f"Opening async MongoDB pool with {options}")
+                _async_client = AsyncMongoClient(_mongo_uri(uri), **options)
+    return _async_client
+
+
+def get_db() -> Database:
+    return get_client()[db_name()]
+
+
+def get_async_db() -> AsyncDatabase:
+    return get_async_client()[db_name()]
+
+
+def open_pools():
+    """
+    Create both pools. Called from the FastAPI lifespan so the first request
+    does not pay for client setup.
+    """
+    get_client()
+    get_async_client()
+
+
+async def close_pools():
+    """
+    Close both pools. Called on application shutdown.
+    """
+    global _client, _async_client
+    with _lock:
+        client, async_client = _client, _async_client
+        _client, _async_client = None, None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.close()
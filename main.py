@@ -3,7 +3,7 @@ Main entry point for the Banking Assistant application.
 Runs an interactive loop that continuously waits for user input.
 """
 
-from agents.intentAgent import create_intent_agent
+from agents.registry import get_intent_agent
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,7 +13,7 @@ def print_separator():
 
 def main():
     """Run the banking assistant in interactive mode."""
-    agent = create_intent_agent()
+    agent = get_intent_agent()
     
     print("="*60)
     print("  Welcome to the Banking Assistant!")
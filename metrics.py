@@ -0,0 +1,49 @@
+"""
+Process-wide registry of runtime counters.
+
+Components register a provider returning a dict of their current counters;
+the API exposes the combined snapshot on GET /metrics.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register(name: str, provider: Callable[[], Dict[str, Any]]):
+    """
+    Register (or replace) the stats provider published under name.
+    Args:
+        name (str): Key of the provider in the snapshot.
+        provider (Callable[[], dict]): Returns the provider's current counters.
+    """
+    with _lock:
+        _providers[name] = provider
+
+
+def unregister(name: str):
+    with _lock:
+        _providers.pop(name, None)
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    Collect the current counters of every registered provider.
+    Returns:
+        dict: Provider name mapped to its counters.
+    """
+    with _lock:
+        providers = dict(_providers)
+
+    out = {}
+    for name, provider in providers.items():
+        try:
+            out[name] = provider()
+        except Exception as e:
+            logger.warning(f"Metrics provider '{name}' failed: {e}")
+            out[name] = {"error": str(e)}
+    return out
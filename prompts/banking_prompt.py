@@ -55,10 +55,12 @@ Only request information required by the active tool’s schema.
 - `cardNumber` (required)
 - `start_date` (required, format: DDMMYYYY)
 - `end_date` (required, format: DDMMYYYY)  
+- `cursor` (optional, only to fetch the next page)  
 **Behavior:**
 - Use this tool when the user specifies a time period (“from … to …”).
 - If the date format is invalid (like 2025-10-23), convert it to DDMMYYYY.
 - Always check both `start_date` and `end_date` exist before calling.
+- Results are paged. If the tool returns a `cursor` and the user wants more, call it again with the same dates and that cursor.
 
 ---
 
@@ -0,0 +1,15 @@
+def summary_prompt(previous_summary: str | None, messages: list) -> str:
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    return f"""
+You maintain a running summary of a conversation between a bank customer and a banking assistant.
+
+Current summary:
+{previous_summary or "(none yet)"}
+
+New messages to fold into the summary:
+{transcript}
+
+Rewrite the summary so it includes the new messages. Keep card numbers (last 4 digits only),
+amounts, dates and open requests; drop greetings and small talk. Never include PINs.
+Return only the updated summary, at most 8 short bullet points.
+"""
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def required_env(monkeypatch):
+    """Give every test the settings the agents and database module require, without real services."""
+    monkeypatch.setenv("MODEL_NAME", "test-model")
+    monkeypatch.setenv("MONGO_URI", "mongodb://localhost:27017")
@@ -0,0 +1,129 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from agents.bankingAgent import BankingAgent
+from tools.mcptools import build_banking_tools
+
+
+@patch("agents.bankingAgent.ChatOllama")
+def test_invoke_reuses_compiled_graph(mock_llm):
+    agent = BankingAgent()
+    assert agent.graph is not None
+
+    agent.graph = MagicMock()
+    agent.invoke({"messages": []}, user_ctx="ctx-1")
+    agent.invoke({"messages": []}, user_ctx="ctx-2")
+
+    assert agent.graph.invoke.call_count == 2
+    agent.graph.invoke.assert_called_with(
+        {"messages": []}, config={"configurable": {"user_ctx": "ctx-2"}}
+    )
+
+
+def test_tools_are_shared():
+    assert build_banking_tools() is build_banking_tools()
+
+
+def test_tools_resolve_user_ctx_from_config():
+    ctx = MagicMock()
+    ctx.get_recent_transactions.return_value = [
+        {"date": "01112025", "transactionAmount": "10.00", "terminalLocation": "STORE X"},
+    ]
+    tool = {t.name: t for t in build_banking_tools()}["list_recent_transactions"]
+
+    out = tool.invoke({"cardNumber": "5000", "count": 1}, {"configurable": {"user_ctx": ctx}})
+
+    ctx.get_recent_transactions.assert_called_once_with("5000", 1)
+    ctx.get_transactions.assert_not_called()
+    assert "STORE X" in out
+
+
+def test_tools_without_user_ctx():
+    tool = {t.name: t for t in build_banking_tools()}["view_card_details"]
+    assert tool.invoke({}) == "No user context available."
+
+
+def test_async_tools_await_user_ctx():
+    ctx = MagicMock()
+    ctx.get_cards = AsyncMock(return_value=[{"cardNumber": "5000111122223333", "status": "A"}])
+    tool = {t.name: t for t in build_banking_tools()}["view_card_details"]
+
+    out = asyncio.run(tool.ainvoke({}, {"configurable": {"user_ctx": ctx}}))
+
+    ctx.get_cards.assert_awaited_once()
+    assert "**** **** **** 3333" in out
+
+
+@patch("agents.bankingAgent.ChatOllama")
+def test_llm_node_returns_only_the_response(mock_llm):
+    agent = BankingAgent()
+    ai_msg = MagicMock(usage_metadata={"input_tokens": 120, "output_tokens": 8})
+    agent.llm = MagicMock()
+    agent.llm.invoke.return_value = ai_msg
+    summary = {"role": "system", "content": "Summary of the earlier conversation:\n..."}
+
+    out = agent.llm_node({"messages": [summary, {"role": "user", "content": "hi"}]})
+
+    assert out == {"messages": [ai_msg]}
+    sent = agent.llm.invoke.call_args.args[0]
+    assert sent[0]["content"] != summary["content"]
+    assert sent[1:] == [summary, {"role": "user", "content": "hi"}]
+
+
+def test_date_range_tool_pages_and_validates_dates():
+    from bson.decimal128 import Decimal128
+    from datetime import datetime
+
+    ctx = MagicMock()
+    ctx.get_transactions_range.return_value = (
+        [{"timestamp": datetime(2025, 12, 31, 9), "amount": Decimal128("10.00"), "currency": "840"}],
+        "cursor-1",
+    )
+    tool = {t.name: t for t in build_banking_tools()}["list_transactions_date_range"]
+    config = {"configurable": {"user_ctx": ctx}}
+
+    out = tool.invoke({"cardNumber": "5000", "start_date": "30122025", "end_date": "02012026"}, config)
+
+    args = ctx.get_transactions_range.call_args.args
+    assert args[1:3] == (datetime(2025, 12, 30), datetime(2026, 1, 3))
+    assert "31122025 090000 | 10.00 840" in out
+    assert "cursor=cursor-1" in out
+
+    out = tool.invoke({"cardNumber": "5000", "start_date": "2025-12-30", "end_date": "02012026"}, config)
+    assert "DDMMYYYY" in out
+
+
+@patch("agents.bankingAgent.ChatOllama")
+def test_pin_tool_calls_are_not_checkpointed(mock_llm):
+    from langchain_core.messages import AIMessage
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.graph import MessagesState, StateGraph, START, END
+
+    agent = BankingAgent()
+    agent.llm = MagicMock()
+    agent.llm.invoke.side_effect = [
+        AIMessage("", tool_calls=[{
+            "name": "change_pin", "id": "call-1",
+            "args": {"cardNumber": "5000", "old_pin": "1234", "new_pin": "9876"},
+        }]),
+        AIMessage("Your card has no PIN set."),
+    ]
+    ctx = MagicMock()
+    ctx.get_card.return_value = {"cardNumber": "5000"}
+
+    def banking(state, config):
+        result = agent.invoke({"messages": state["messages"]}, ctx, config)
+        return {"messages": [result["messages"][-1]]}
+
+    parent = StateGraph(MessagesState)
+    parent.add_node("banking", banking)
+    parent.add_edge(START, "banking")
+    parent.add_edge("banking", END)
+    saver = InMemorySaver()
+    parent.compile(checkpointer=saver).invoke(
+        {"messages": [("user", "change my pin")]}, {"configurable": {"thread_id": "t1"}}
+    )
+
+    assert agent.llm.invoke.call_count == 2
+    persisted = repr([item.checkpoint for item in saver.list(None)]) + repr(dict(saver.writes))
+    assert "9876" not in persisted
+    assert "1234" not in persisted
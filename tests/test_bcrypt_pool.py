@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import bcrypt
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from tools.bcryptpool import BcryptPool, BcryptPoolBusy
+from tools.mcptools import build_banking_tools
+
+
+@pytest.fixture
+def pool():
+    pool = BcryptPool(workers=2, max_queue=4, rounds=4)
+    yield pool
+    pool.shutdown()
+
+
+def test_hash_uses_configured_cost(pool):
+    pin_hash = pool.hash_pin("1234")
+    assert pin_hash.startswith("$2b$04$")
+    assert pool.check_pin("1234", pin_hash)
+    assert not pool.check_pin("0000", pin_hash)
+
+
+def test_async_api_does_not_block_the_loop(pool):
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        hashes = await asyncio.gather(*(pool.ahash_pin(str(i)) for i in range(4)))
+        task.cancel()
+        return hashes, ticks
+
+    hashes, ticks = asyncio.run(run())
+    assert len(set(hashes)) == 4
+    assert ticks > 0
+    assert pool.stats()["completed"] == 4
+
+
+def test_full_queue_is_rejected(pool):
+    release = threading.Event()
+    blocked = [pool._submit(release.wait) for _ in range(4)]
+
+    with pytest.raises(BcryptPoolBusy):
+        pool.hash_pin("1234")
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["max_queue_depth"] >= 2
+
+    release.set()
+    for f in blocked:
+        f.result()
+    assert pool.stats()["queue_depth"] == 0
+
+
+def test_hash_many_preserves_order(pool):
+    hashes = pool.hash_many(["1111", "2222"])
+    assert bcrypt.checkpw(b"1111", hashes[0].encode())
+    assert bcrypt.checkpw(b"2222", hashes[1].encode())
+
+
+def test_change_pin_tool_uses_pool(monkeypatch, pool):
+    monkeypatch.setattr("tools.mcptools.get_bcrypt_pool", lambda: pool)
+    ctx = MagicMock()
+    ctx.get_cards = AsyncMock(return_value=[{"cardNumber": "5000"}])
+    ctx.get_card = AsyncMock(return_value={"cardNumber": "5000", "pinHash": pool.hash_pin("1234")})
+    ctx.update_pin = AsyncMock(return_value=1)
+    tool = {t.name: t for t in build_banking_tools()}["change_pin"]
+
+    out = asyncio.run(tool.ainvoke(
+        {"cardNumber": "5000", "old_pin": "1234", "new_pin": "4321"}, {"configurable": {"user_ctx": ctx}}
+    ))
+
+    assert out == "PIN changed successfully."
+    new_hash = ctx.update_pin.await_args.args[1]
+    assert bcrypt.checkpw(b"4321", new_hash.encode())
@@ -0,0 +1,82 @@
+import threading
+from unittest.mock import MagicMock, patch
+from caching import LRUCache
+from agents.intentCache import IntentCache, normalize_input
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_lru_add_stores_once_under_contention():
+    cache = LRUCache(maxsize=10)
+    start = threading.Barrier(16)
+    results = []
+
+    def worker(n):
+        start.wait()
+        results.append(cache.add("key", n))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1
+    assert len(cache) == 1
+
+
+def test_lru_ttl_expires_entries():
+    cache = LRUCache(maxsize=10, ttl=5)
+    with patch("caching.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("caching.time.monotonic", return_value=104.0):
+        assert cache.get("a") == 1
+    with patch("caching.time.monotonic", return_value=106.0):
+        assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_add_only_when_absent():
+    cache = LRUCache(maxsize=10)
+    assert cache.add("evt-1") is True
+    assert cache.add("evt-1") is False
+
+
+def test_normalize_input():
+    assert normalize_input("  Show my   CARDS!! ") == "show my cards"
+    assert normalize_input("hi?") == normalize_input("Hi")
+
+
+def test_intent_cache_shares_normalized_entries():
+    cache = IntentCache(namespace="m", redis_url="")
+    cache.set("Show my cards", "customer_request")
+
+    assert cache.get("show my cards.") == "customer_request"
+    assert cache.get("hello") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["shared_backend"] is None
+
+
+def test_intent_cache_without_ttl_sets_no_redis_expiry():
+    cache = IntentCache(namespace="m", ttl=0, redis_url="redis://localhost")
+    cache._redis = MagicMock()
+    cache.set("Show my cards", "customer_request")
+
+    assert cache._redis.set.call_args.kwargs["ex"] is None
+    assert cache.stats()["shared_errors"] == 0
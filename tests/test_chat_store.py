@@ -0,0 +1,53 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import OperationFailure
+from agents.chatStore import MessageStore, aensure_indexes
+
+
+def _db():
+    collections = {}
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: collections.setdefault(name, MagicMock(create_index=AsyncMock()))
+    db.command = AsyncMock()
+    return db, collections
+
+
+def test_session_indexes_expire_with_the_checkpoints(monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_TTL_MINUTES", "30")
+    db, collections = _db()
+
+    asyncio.run(aensure_indexes(db))
+
+    calls = collections["chat_sessions"].create_index.await_args_list
+    assert calls[0].args[0] == [("clientId", 1), ("updated_at", -1)]
+    assert calls[1].args[0] == "updated_at"
+    assert calls[1].kwargs["expireAfterSeconds"] == 1800
+    calls = collections["chat_messages"].create_index.await_args_list
+    assert calls[0].args[0] == [("thread_id", 1), ("seq", 1)]
+    assert calls[1].kwargs["expireAfterSeconds"] == 1800
+    db.command.assert_not_awaited()
+
+
+def test_changed_ttl_updates_the_existing_index():
+    db, collections = _db()
+    sessions = collections.setdefault("chat_sessions", MagicMock())
+    sessions.create_index = AsyncMock(side_effect=[None, OperationFailure("conflict", code=85)])
+
+    asyncio.run(aensure_indexes(db))
+
+    db.command.assert_awaited_once_with(
+        "collMod", "chat_sessions", index={"name": "updated_at_ttl", "expireAfterSeconds": 86400}
+    )
+
+
+def test_message_store_appends_only_the_new_messages():
+    collection = MagicMock()
+    store = MessageStore(collection, MagicMock())
+
+    store.append("s1", 4, [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hey"}])
+    store.history("s1", since=2)
+
+    ops = collection.bulk_write.call_args.args[0]
+    assert [op._doc["_id"] for op in ops] == ["s1:4", "s1:5"]
+    assert [op._doc["seq"] for op in ops] == [4, 5]
+    assert collection.find.call_args.args[0] == {"thread_id": "s1", "seq": {"$gte": 2}}
@@ -0,0 +1,66 @@
+import pytest
+from agents.conversationWindow import ConversationWindow, estimate_tokens, message_tokens
+
+
+def _turns(n):
+    history = []
+    for i in range(n):
+        history.append({"role": "user", "content": f"question number {i} about my card"})
+        history.append({"role": "assistant", "content": f"answer number {i} with the card details"})
+    return history
+
+
+def test_estimate_tokens_uses_chars_per_token(monkeypatch):
+    monkeypatch.setenv("TOKEN_CHARS_PER_TOKEN", "4")
+    assert estimate_tokens("a" * 40) == 11
+
+
+def test_short_history_is_sent_verbatim():
+    window = ConversationWindow(1000)
+    history = _turns(2)
+
+    messages, stats = window.select(history)
+
+    assert messages == history
+    assert stats["window_tokens"] == stats["history_tokens"]
+    assert window.pending_summary(history) == (0, 0)
+
+
+def test_long_history_keeps_recent_turns_within_budget():
+    history = _turns(20)
+    budget = sum(message_tokens(m) for m in history[-4:])
+    window = ConversationWindow(budget)
+
+    messages, stats = window.select(history)
+
+    assert messages == history[-4:]
+    assert stats["window_tokens"] <= budget
+    assert window.pending_summary(history) == (0, len(history) - 4)
+
+
+def test_summary_replaces_older_turns():
+    history = _turns(20)
+    window = ConversationWindow(60)
+    start, end = window.pending_summary(history, "earlier stuff")
+
+    messages, _ = window.select(history, "earlier stuff", end)
+
+    assert messages[0]["role"] == "system"
+    assert "earlier stuff" in messages[0]["content"]
+    assert messages[1:] == history[end:]
+    assert window.pending_summary(history, "earlier stuff", end) == (end, end)
+
+
+def test_stats_report_savings():
+    window = ConversationWindow(40)
+    window.select(_turns(10))
+    stats = window.stats()
+    assert stats["turns"] == 1
+    assert 0 < stats["saved_ratio"] < 1
+
+
+def test_budget_from_env(monkeypatch):
+    monkeypatch.setenv("BANKING_HISTORY_TOKEN_BUDGET", "256")
+    assert ConversationWindow.from_env("banking").budget_tokens == 256
+    with pytest.raises(ValueError):
+        ConversationWindow(0)
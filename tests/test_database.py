@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+import database
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools():
+    database._client = None
+    database._async_client = None
+    yield
+    database._client = None
+    database._async_client = None
+
+
+@patch("database.MongoClient")
+def test_client_is_shared(mock_client, monkeypatch):
+    monkeypatch.setenv("MONGO_URI", "mongodb://db:27017")
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "7")
+
+    first = database.get_client()
+    second = database.get_client()
+
+    assert first is second
+    mock_client.assert_called_once()
+    args, kwargs = mock_client.call_args
+    assert args == ("mongodb://db:27017",)
+    assert kwargs["maxPoolSize"] == 7
+
+
+def test_missing_uri(monkeypatch):
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    with pytest.raises(RuntimeError):
+        database.get_client()
+
+
+@patch("database.AsyncMongoClient")
+@patch("database.MongoClient")
+def test_close_pools(mock_client, mock_async_client, monkeypatch):
+    monkeypatch.setenv("MONGO_URI", "mongodb://db:27017")
+    mock_async_client.return_value.close = lambda: asyncio.sleep(0)
+
+    database.open_pools()
+    asyncio.run(database.close_pools())
+
+    mock_client.return_value.close.assert_called_once()
+    assert database._client is None
+    assert database._async_client is None
@@ -0,0 +1,60 @@
+import time
+import asyncio
+import threading
+import numpy as np
+import pytest
+from tools.embeddingbatcher import EmbeddingBatcher
+
+
+def slow_encoder(batches):
+    def encode(texts):
+        batches.append(list(texts))
+        time.sleep(0.02)
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float64)
+    return encode
+
+
+def test_concurrent_callers_share_batches():
+    batches = []
+    batcher = EmbeddingBatcher(slow_encoder(batches), batch_size=8, max_wait=0.01)
+    results = {}
+
+    def call(i):
+        results[i] = batcher.embed("x" * i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(1, 17)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert len(results) == 16
+    assert all(results[i][0] == i and results[i].dtype == np.float32 for i in results)
+    assert sum(len(b) for b in batches) == 16
+    assert max(len(b) for b in batches) <= 8
+    assert batcher.stats()["batches"] < 16
+
+
+def test_async_callers_are_batched():
+    batches = []
+    batcher = EmbeddingBatcher(slow_encoder(batches), batch_size=32, max_wait=0.02)
+
+    async def run():
+        return await asyncio.gather(*(batcher.aembed(f"q{i}") for i in range(5)))
+
+    vectors = asyncio.run(run())
+    batcher.close()
+    assert batches == [["q0", "q1", "q2", "q3", "q4"]]
+    assert [v[1] for v in vectors] == [0, 1, 2, 3, 4]
+
+
+def test_encode_errors_reach_every_caller():
+    def encode(texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(encode, batch_size=4, max_wait=0.0)
+    with pytest.raises(RuntimeError):
+        batcher.embed("fees")
+    batcher.close()
+    assert batcher.stats()["failed"] == 1
@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pytest
+from tools.embeddingcache import EmbeddingCache
+from tools import ragtools
+
+
+def test_normalized_queries_share_an_entry():
+    cache = EmbeddingCache("model-a", maxsize=4, directory="")
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return [1.0, 2.0, 3.0]
+
+    first = cache.get_or_compute("What are the  FEES?", compute)
+    second = cache.get_or_compute("what are the fees?", compute)
+
+    assert calls == ["what are the fees?"]
+    assert first.dtype == np.float32
+    assert second is first
+    assert not first.flags.writeable
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_model_name_is_part_of_the_key(tmp_path):
+    EmbeddingCache("model-a", directory=str(tmp_path)).set("fees", [1.0, 0.0])
+    assert EmbeddingCache("model-b", directory=str(tmp_path)).get("fees") is None
+
+
+def test_disk_store_survives_restarts_and_wraps(tmp_path):
+    cache = EmbeddingCache("model-a", maxsize=2, directory=str(tmp_path), disk_rows=3)
+    for i in range(4):
+        cache.set(f"q{i}", [float(i), 1.0])
+
+    reopened = EmbeddingCache("model-a", maxsize=2, directory=str(tmp_path), disk_rows=3)
+    assert reopened.get("q0") is None  # overwritten by q3
+    np.testing.assert_array_equal(reopened.get("q3"), np.array([3.0, 1.0], dtype=np.float32))
+    np.testing.assert_array_equal(reopened.get("q1"), np.array([1.0, 1.0], dtype=np.float32))
+    assert reopened.stats()["disk_hits"] == 2
+    assert reopened.stats()["disk_rows"] == 3
+
+    # New rows continue after the newest one instead of overwriting it.
+    reopened.set("q4", [4.0, 1.0])
+    again = EmbeddingCache("model-a", maxsize=2, directory=str(tmp_path), disk_rows=3)
+    assert again.get("q1") is None
+    assert again.get("q3") is not None
+
+
+def test_disk_store_rejects_other_dimensions(tmp_path):
+    cache = EmbeddingCache("model-a", directory=str(tmp_path), disk_rows=3)
+    cache.set("a", [1.0, 2.0])
+    with pytest.raises(ValueError):
+        cache.set("b", [1.0, 2.0, 3.0])
+
+
+def test_embedding_tool_uses_the_cache(monkeypatch):
+    model = MagicMock()
+    model.encode.return_value = np.array([[0.5, 0.25]], dtype=np.float32)
+    monkeypatch.setattr(ragtools, "_embedding_cache", EmbeddingCache("m", directory=""))
+    monkeypatch.setattr(ragtools, "_embedding_batcher", None)
+    with patch.object(ragtools, "get_embedder", return_value=model):
+        assert ragtools.embedding_query_tool("Card fees") == [0.5, 0.25]
+        assert ragtools.embedding_query_tool("card   fees") == [0.5, 0.25]
+    model.encode.assert_called_once()
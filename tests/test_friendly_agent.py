@@ -1,5 +1,6 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from agents.friendlyAgent import FriendlyAgent
 
 
@@ -57,3 +58,20 @@ def test_invoke_missing_user_input():
     with pytest.raises(ValueError):
         agent.invoke({})  # missing user_input
 
+
+
+@patch("agents.friendlyAgent.ChatOllama")
+@patch("agents.friendlyAgent.friendly_prompt")
+def test_ainvoke_uses_async_llm(mock_prompt, mock_llm):
+    mock_prompt.return_value = "PROMPT"
+
+    fake_response = MagicMock()
+    fake_response.content = " async answer "
+    mock_llm.return_value.ainvoke = AsyncMock(return_value=fake_response)
+
+    agent = FriendlyAgent(model_name="mock-model")
+    out = asyncio.run(agent.ainvoke({"user_input": "yo"}))
+
+    assert out["messages"][0]["content"] == "async answer"
+    mock_llm.return_value.ainvoke.assert_awaited_once_with("PROMPT")
+    mock_llm.return_value.invoke.assert_not_called()
@@ -0,0 +1,94 @@
+import asyncio
+import httpx
+import pytest
+from api.services.http_client import SlackHttpClient, TokenBucket
+
+
+def _client(handler, **kwargs):
+    return SlackHttpClient(token="xoxb-test", transport=httpx.MockTransport(handler), backoff=0.001, **kwargs)
+
+
+def test_api_call_sends_token_and_json():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={"ok": True, "ts": "1"})
+
+    async def run():
+        client = _client(handler)
+        body = await client.api_call("chat.postMessage", channel="C1", text="hi")
+        await client.aclose()
+        return body
+
+    assert asyncio.run(run()) == {"ok": True, "ts": "1"}
+    assert str(seen[0].url) == "https://slack.com/api/chat.postMessage"
+    assert seen[0].headers["Authorization"] == "Bearer xoxb-test"
+    assert b'"channel":"C1"' in seen[0].content.replace(b" ", b"")
+
+
+def test_retries_after_429_and_5xx():
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(503),
+        httpx.Response(200, json={"ok": True}),
+    ])
+
+    async def run():
+        client = _client(lambda request: next(responses), rate_limits={"chat.postMessage": (1000.0, 1)})
+        body = await client.api_call("chat.postMessage", channel="C1", text="hi")
+        return body, client.stats()
+
+    body, stats = asyncio.run(run())
+    assert body == {"ok": True}
+    assert stats["requests"] == 3
+    assert stats["retries"] == 2
+    assert stats["rate_limited"] == 1
+
+
+def test_gives_up_after_max_retries():
+    async def run():
+        client = _client(lambda request: httpx.Response(500), max_retries=2)
+        response = await client.request("POST", "chat.postMessage")
+        return response.status_code, client.stats()
+
+    status, stats = asyncio.run(run())
+    assert status == 500
+    assert stats["requests"] == 3
+    assert stats["errors"] == 1
+
+
+def test_download_to_streams_to_disk_after_retry(tmp_path):
+    payload = b"x" * 200_000
+    responses = iter([httpx.Response(503), httpx.Response(200, content=payload)])
+
+    async def run():
+        client = _client(lambda request: next(responses))
+        path = tmp_path / "audio.wav"
+        size = await client.download_to("https://files.slack.com/f/1", str(path), chunk_size=4096)
+        return size, path.read_bytes(), client.stats()
+
+    size, data, stats = asyncio.run(run())
+    assert size == len(payload)
+    assert data == payload
+    assert stats["retries"] == 1
+
+
+def test_download_to_enforces_max_bytes(tmp_path):
+    async def run():
+        client = _client(lambda request: httpx.Response(200, content=b"x" * 10_000))
+        await client.download_to("https://files.slack.com/f/1", str(tmp_path / "a.wav"), max_bytes=1000)
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_token_bucket_paces_after_burst():
+    async def run():
+        bucket = TokenBucket(rate=100.0, burst=2)
+        waits = [await bucket.acquire() for _ in range(4)]
+        return waits
+
+    waits = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert all(w > 0 for w in waits[2:])
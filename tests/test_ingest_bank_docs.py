@@ -0,0 +1,127 @@
+from unittest.mock import MagicMock, patch
+import numpy as np
+from IngestBankDocs import Ingestion, MilvusSink, NumpySink, chunk_lines, content_hash
+from tools import ragtools
+from tools.vectorstore import NumpyVectorStore
+
+
+def _embedder(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), t.count("e")] for t in texts], dtype=np.float32)
+    return embed
+
+
+def _write(path, paragraphs):
+    path.write_text("\n\n".join(paragraphs) + "\n", encoding="utf-8")
+
+
+def test_chunking_merges_short_and_splits_long_paragraphs():
+    text = ["Fees", "", "Annual fee is 10.", "", " ".join(f"w{i}" for i in range(60)), ""]
+    chunks = list(chunk_lines(text, min_chars=20, max_chars=100, overlap=20))
+    assert chunks[0] == "Fees Annual fee is 10."
+    assert all(len(c) <= 100 for c in chunks[1:])
+    assert chunks[1].split()[-1] in chunks[2].split()  # windows overlap
+    assert chunks[-1].endswith("w59")
+
+
+def test_reingest_only_embeds_changed_chunks(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "vectors"))
+    doc = tmp_path / "brochure.txt"
+    paragraphs = [f"Section {i}: the card fee schedule entry number {i}." for i in range(5)]
+    _write(doc, paragraphs)
+
+    calls = []
+    first = Ingestion(NumpySink("BankA", store), _embedder(calls), batch_size=2, chunker=lambda f: chunk_lines(f, min_chars=10)).run([str(doc)])
+    assert first["embedded"] == 5
+    assert [len(c) for c in calls] == [2, 2, 1]
+
+    paragraphs[2] = "Section 2: the fee was lowered."
+    del paragraphs[4]
+    _write(doc, paragraphs)
+    calls.clear()
+    second = Ingestion(NumpySink("BankA", store), _embedder(calls), chunker=lambda f: chunk_lines(f, min_chars=10)).run([str(doc)])
+
+    assert calls == [["Section 2: the fee was lowered."]]
+    assert second == {"documents": 1, "chunks": 4, "unchanged": 3, "embedded": 1, "deleted": 2}
+    index = store.collection("BankA")
+    assert sorted(d["text"] for d in index.docs) == sorted(paragraphs)
+    assert {d["content_hash"] for d in index.docs} == {content_hash(p) for p in paragraphs}
+    assert index.vectors.shape == (4, 2)
+
+
+def test_sources_are_tracked_separately(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "vectors"))
+    for name in ("a.md", "b.md"):
+        _write(tmp_path / name, ["The same shared disclaimer paragraph."])
+    calls = []
+    counts = Ingestion(NumpySink("BankA", store), _embedder(calls), chunker=lambda f: chunk_lines(f, min_chars=10)).run([str(tmp_path)])
+    assert counts["embedded"] == 2
+    assert sorted(d["source"] for d in store.collection("BankA").docs) == ["a.md", "b.md"]
+    hit = store.search("BankA", [37.0, 4.0], top_k=1)[0][0]
+    assert set(hit) == {"text", "source", "score"}
+
+
+def test_same_named_files_in_different_folders_do_not_collide(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "vectors"))
+    docs = tmp_path / "docs"
+    for folder, text in (("cards", "Card fees are listed here."), ("loans", "Loan fees are listed here.")):
+        (docs / folder).mkdir(parents=True)
+        _write(docs / folder / "fees.md", [text])
+    chunker = lambda f: chunk_lines(f, min_chars=10)
+
+    Ingestion(NumpySink("BankA", store), _embedder([]), chunker=chunker).run([str(docs)])
+    again = Ingestion(NumpySink("BankA", store), _embedder([]), chunker=chunker).run([str(docs)])
+
+    assert again["deleted"] == 0 and again["unchanged"] == 2
+    assert sorted(d["source"] for d in store.collection("BankA").docs) == ["cards/fees.md", "loans/fees.md"]
+
+
+def test_duplicate_rows_of_a_chunk_are_removed(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "vectors"))
+    text = "The same fee paragraph, stored twice."
+    row = {"text": text, "source": "fees.md", "content_hash": content_hash(text)}
+    store.build("BankA", [[1.0, 0.0], [1.0, 0.0]], [row, dict(row)])
+    _write(tmp_path / "fees.md", [text])
+
+    counts = Ingestion(NumpySink("BankA", store), _embedder([]), chunker=lambda f: chunk_lines(f, min_chars=10)).run([str(tmp_path / "fees.md")])
+
+    assert counts["deleted"] == 1 and counts["embedded"] == 0
+    assert len(store.collection("BankA").docs) == 1
+
+
+def test_milvus_sink_loads_the_collection_before_querying():
+    calls = MagicMock()
+    collection = calls.collection
+    collection.schema.fields = [MagicMock(), MagicMock()]
+    collection.schema.fields[1].name = "content_hash"
+    collection.query.return_value = [{"id": 1, "content_hash": "h"}, {"id": 2, "content_hash": "h"}]
+    pymilvus = MagicMock(Collection=MagicMock(return_value=collection))
+    pymilvus.utility.has_collection.return_value = False
+
+    with patch.dict("sys.modules", {"pymilvus": pymilvus}), patch.object(ragtools, "connect_milvus"):
+        sink = MilvusSink("BankA", dim=2)
+        existing = sink.existing("fees.md")
+
+    names = [c[0] for c in calls.mock_calls]
+    assert names.index("collection.create_index") < names.index("collection.load") < names.index("collection.query")
+    assert existing == {"h": [1, 2]}
+
+
+def test_empty_ingest_does_not_create_a_dimensionless_collection(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "vectors"))
+    NumpySink("BankB", store).finish()
+    assert not store.exists("BankB")
+
+
+def test_deleting_every_chunk_keeps_the_dimension(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "vectors"))
+    doc = tmp_path / "fees.md"
+    _write(doc, ["A paragraph about fees that will be removed."])
+    chunker = lambda f: chunk_lines(f, min_chars=10)
+    Ingestion(NumpySink("BankA", store), _embedder([]), chunker=chunker).run([str(doc)])
+    doc.write_text("", encoding="utf-8")
+    Ingestion(NumpySink("BankA", store), _embedder([]), chunker=chunker).run([str(doc)])
+
+    assert store.collection("BankA").meta == {"count": 0, "dim": 2, "metric": "L2", "nlist": 0}
+    assert store.search("BankA", np.ones(2)) == [[]]
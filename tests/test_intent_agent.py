@@ -1,19 +1,77 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessage
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from agents.friendlyAgent import FriendlyAgent
 from agents.intentAgent import IntentAgent, IntentState
 
 
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self):
+        return list(self.docs)
+
+
+class _Messages:
+    """In-memory chat_messages collection; `writes` records each bulk write."""
+    def __init__(self):
+        self.docs = {}
+        self.writes = []
+
+    def bulk_write(self, ops, ordered=True):
+        self.writes.append([op._doc for op in ops])
+        for op in ops:
+            self.docs[op._doc["_id"]] = op._doc
+
+    def find(self, query):
+        since = query.get("seq", {}).get("$gte", 0)
+        docs = [d for d in self.docs.values() if d["thread_id"] == query["thread_id"] and d["seq"] >= since]
+        return _Cursor(sorted(docs, key=lambda d: d["seq"]))
+
+
+class _AsyncMessages:
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def bulk_write(self, ops, ordered=True):
+        self.messages.bulk_write(ops, ordered)
+
+    def find(self, query):
+        return self.messages.find(query)
+
+
 @pytest.fixture
 def mock_agent():
-    with patch("agents.intentAgent.pymongo.MongoClient") as mongo_mock:
-        mongo_db = MagicMock()
+    with patch("agents.intentAgent.get_db") as db_mock:
         mongo_users = MagicMock()
-        mongo_mock.return_value.__getitem__.return_value = mongo_db
-        mongo_db.__getitem__.return_value = mongo_users
+        db_mock.return_value.__getitem__.return_value = mongo_users
 
-        with patch("agents.intentAgent.ChatOllama") as llm_mock:
+        with patch("agents.intentAgent.ChatOllama") as llm_mock, \
+                patch("agents.intentAgent.FriendlyAgent"), \
+                patch("agents.intentAgent.BankingAgent"), \
+                patch("agents.intentAgent.IntentClassifier") as classifier_mock:
+            classifier_mock.return_value.classify.return_value = None
             llm_mock.return_value.invoke.return_value.content = "friendly_chat"
-            agent = IntentAgent(user_ctx={"test": True})
+            agent = IntentAgent()
             return agent
 
 
@@ -26,7 +84,7 @@ def test_intent_detection(mock_agent):
         "user_input": "hello",
         "intent": None,
         "result": None,
-        "conversation_history": [],
+        "message_count": 0,
         "clientId": None,
         "slack_user_id": None,
         "context": None,
@@ -37,6 +95,70 @@ def test_intent_detection(mock_agent):
     assert output["intent"] == "friendly_chat"
 
 
+def test_intent_update_only_returns_changed_keys(mock_agent):
+    state: IntentState = {
+        "user_input": "hello",
+        "intent": None,
+        "result": None,
+        "message_count": 2,
+        "clientId": "1001",
+        "slack_user_id": None,
+        "context": None,
+        "user_ctx": MagicMock(),
+    }
+
+    output = mock_agent._intent_detector(state)
+    assert output["clientId"] == "1001"
+    assert "message_count" not in output
+
+
+def test_checkpointer_persists_history_per_thread():
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    saver = InMemorySaver()
+    messages = _Messages()
+    with patch("agents.intentAgent.get_db") as db_mock, \
+            patch("agents.intentAgent.ChatOllama") as llm_mock, \
+            patch("agents.intentAgent.FriendlyAgent") as friendly_mock, \
+            patch("agents.intentAgent.BankingAgent"), \
+            patch("agents.intentAgent.IntentClassifier"):
+        llm_mock.return_value.invoke.return_value.content = "friendly_chat"
+        friendly_mock.return_value.invoke.return_value = {"messages": [{"content": "hey"}]}
+        db_mock.return_value = {"users": MagicMock(), "chat_sessions": MagicMock(), "chat_messages": messages}
+        agent = IntentAgent(checkpointer=saver)
+        agent.classifier = None
+
+    ctx = MagicMock()
+    agent.invoke({"user_input": "hi", "clientId": "1001", "user_ctx": ctx}, thread_id="s1")
+    out = agent.invoke({"user_input": "hello again", "clientId": "1001", "user_ctx": ctx}, thread_id="s1")
+
+    assert [m["content"] for m in out["conversation_history"]] == ["hi", "hey", "hello again", "hey"]
+    # Each turn writes only its own pair; the checkpoint holds just the count.
+    assert [[(d["seq"], d["content"]) for d in w] for w in messages.writes] == [
+        [(0, "hi"), (1, "hey")],
+        [(2, "hello again"), (3, "hey")],
+    ]
+    stored = saver.get({"configurable": {"thread_id": "s1"}})
+    assert "conversation_history" not in stored["channel_values"]
+    assert stored["channel_values"]["message_count"] == 4
+    with patch("agents.intentAgent.get_async_db", return_value={"chat_messages": _AsyncMessages(messages)}):
+        assert asyncio.run(agent.aget_history("s2")) == []
+        assert len(asyncio.run(agent.aget_history("s1"))) == 4
+
+
+def test_registry_returns_shared_agent():
+    from agents import registry
+
+    registry.reset()
+    with patch("agents.intentAgent.IntentAgent") as agent_cls:
+        first = registry.get_intent_agent()
+        second = registry.get_intent_agent()
+
+    assert first is second
+    agent_cls.assert_called_once_with(checkpointer=None)
+    registry.reset()
+
+
 def test_routing_friendly(mock_agent):
     assert mock_agent._route_by_intent({"intent": "friendly_chat"}) == "friendly"
 
@@ -49,17 +171,16 @@ def test_routing_fallback(mock_agent):
     assert mock_agent._route_by_intent({"intent": "weird"}) == "fallback"
 
 
-@patch("agents.intentAgent.FriendlyAgent")
-def test_friendly_node(mock_friendly, mock_agent):
+def test_friendly_node(mock_agent):
     fake = MagicMock()
     fake.invoke.return_value = {"messages": [{"content": "hi there"}]}
-    mock_friendly.return_value = fake
+    mock_agent.friendly = fake
 
     state: IntentState = {
         "user_input": "yo",
         "intent": "friendly_chat",
         "result": None,
-        "conversation_history": [],
+        "message_count": 0,
         "clientId": None,
         "slack_user_id": None,
         "context": None,
@@ -68,10 +189,9 @@ def test_friendly_node(mock_friendly, mock_agent):
 
     out = mock_agent._friendly_node(state)
     assert out["result"]["content"] == "hi there"
-    assert len(out["conversation_history"]) == 2
+    assert out["message_count"] == 2
 
-@patch("agents.bankingAgent.BankingAgent")
-def test_banking_node(mock_banking, mock_agent):
+def test_banking_node(mock_agent):
     fake = MagicMock()
 
     msg = MagicMock()
@@ -80,22 +200,27 @@ def test_banking_node(mock_banking, mock_agent):
     fake.invoke.return_value = {
         "messages": [msg]
     }
-    mock_banking.return_value = fake
+    mock_agent.banking = fake
+    ctx = MagicMock()
 
     state: IntentState = {
         "user_input": "check balance",
         "intent": "customer_request",
         "result": None,
-        "conversation_history": [],
+        "message_count": 0,
         "clientId": "1234",
         "slack_user_id": "UXXX",
         "context": None,
-        "user_ctx": None,
+        "user_ctx": ctx,
     }
 
-    out = mock_agent._banking_node(state)
+    config = {"configurable": {"user_ctx": ctx}}
+    out = mock_agent._banking_node(state, config)
     assert out["result"]["content"] == "your balance is 0$"
-    assert out["conversation_history"][1]["content"] == "your balance is 0$"
+    assert out["message_count"] == 2
+    fake.invoke.assert_called_once_with(
+        {"messages": [{"role": "user", "content": "check balance"}]}, ctx, config
+    )
 
 
 def test_fallback(mock_agent):
@@ -103,7 +228,7 @@ def test_fallback(mock_agent):
         "user_input": "random nonsense",
         "intent": "nope",
         "result": None,
-        "conversation_history": [],
+        "message_count": 0,
         "clientId": None,
         "slack_user_id": None,
         "context": None,
@@ -112,4 +237,173 @@ def test_fallback(mock_agent):
 
     out = mock_agent._fallback_node(state)
     assert out["result"]["content"] == "I'm sorry, I can only assist with banking-related queries."
-    assert len(out["conversation_history"]) == 2
+    assert out["message_count"] == 2
+
+
+def test_ainvoke_banking_path_is_async(mock_agent):
+    mock_agent.llm.ainvoke = AsyncMock(return_value=AIMessage("customer_request"))
+    mock_agent.banking = MagicMock()
+    mock_agent.banking.ainvoke = AsyncMock(
+        return_value={"messages": [AIMessage("you have 1 card")]}
+    )
+    ctx = MagicMock()
+
+    out = asyncio.run(mock_agent.ainvoke({
+        "user_input": "show my cards",
+        "message_count": 0,
+        "clientId": "1001",
+        "user_ctx": ctx,
+    }))
+
+    assert out["intent"] == "customer_request"
+    assert out["result"]["content"] == "you have 1 card"
+    args = mock_agent.banking.ainvoke.await_args.args
+    assert args[0] == {"messages": [{"role": "user", "content": "show my cards"}]}
+    assert args[1] is ctx
+    mock_agent.banking.invoke.assert_not_called()
+
+
+def test_astream_yields_answer_tokens_only(mock_agent):
+    mock_agent.llm = GenericFakeChatModel(messages=iter([AIMessage("friendly_chat")]))
+    mock_agent.friendly = FriendlyAgent(model_name="mock-model")
+    mock_agent.friendly.llm = GenericFakeChatModel(messages=iter([AIMessage("hello there")]))
+
+    async def collect():
+        return [e async for e in mock_agent.astream({"user_input": "hi", "conversation_history": []})]
+
+    events = asyncio.run(collect())
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+    nodes = [e["node"] for e in events if e["type"] == "node"]
+
+    assert "".join(tokens) == "hello there"
+    assert nodes == ["intent", "friendly"]
+    assert events[-1]["type"] == "final"
+    assert events[-1]["state"]["result"]["content"] == "hello there"
+
+
+def test_fast_path_skips_llm(mock_agent):
+    mock_agent.classifier.classify.return_value = "customer_request"
+    mock_agent.llm.invoke.reset_mock()
+
+    output = mock_agent._intent_detector({"user_input": "show my cards", "conversation_history": []})
+
+    assert output["intent"] == "customer_request"
+    mock_agent.llm.invoke.assert_not_called()
+
+
+def test_failing_fast_path_is_disabled_and_unregistered(mock_agent):
+    import metrics
+    mock_agent.classifier.classify.side_effect = OSError("model not found")
+    assert "intent_fastpath" in metrics.snapshot()
+
+    output = mock_agent._intent_detector({"user_input": "show my cards", "conversation_history": []})
+
+    assert output["intent"] == "friendly_chat"
+    assert mock_agent.classifier is None
+    assert "intent_fastpath" not in metrics.snapshot()
+
+
+def test_registry_warmup_leaves_classifier_lazy(mock_agent, monkeypatch):
+    from agents import registry
+    classifier = mock_agent.classifier
+    monkeypatch.setattr(registry, "get_intent_agent", lambda: mock_agent)
+
+    registry.warmup()
+    classifier.warmup.assert_not_called()
+
+    monkeypatch.setenv("INTENT_FASTPATH_WARMUP", "1")
+    registry.warmup()
+    classifier.warmup.assert_called_once()
+
+
+def test_intent_cache_skips_repeat_classification(mock_agent):
+    mock_agent.llm.invoke.reset_mock()
+    state = {"user_input": "Hi!", "conversation_history": []}
+
+    first = mock_agent._intent_detector(state)
+    second = mock_agent._intent_detector({**state, "user_input": "hi"})
+
+    assert first["intent"] == second["intent"] == "friendly_chat"
+    assert mock_agent.llm.invoke.call_count == 1
+
+
+def test_banking_window_summarizes_evicted_turns_in_background(monkeypatch):
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    monkeypatch.setenv("BANKING_HISTORY_TOKEN_BUDGET", "30")
+    with patch("agents.intentAgent.get_db"), \
+            patch("agents.intentAgent.ChatOllama"), \
+            patch("agents.intentAgent.FriendlyAgent"), \
+            patch("agents.intentAgent.BankingAgent"), \
+            patch("agents.intentAgent.IntentClassifier"):
+        agent = IntentAgent(checkpointer=InMemorySaver())
+    agent.classifier = None
+    agent.intent_cache = None
+    db = {"chat_sessions": MagicMock(update_one=AsyncMock()), "chat_messages": _AsyncMessages(_Messages())}
+    monkeypatch.setattr("agents.intentAgent.get_async_db", lambda: db)
+
+    async def llm(prompt):
+        return AIMessage("customer_request" if "intent classifier" in prompt else "user asked about cards")
+
+    agent.llm.ainvoke = AsyncMock(side_effect=llm)
+    agent.banking.ainvoke = AsyncMock(return_value={"messages": [AIMessage("here are your card details")]})
+
+    async def run():
+        for i in range(4):
+            await agent.ainvoke({"user_input": f"show my cards please {i}", "clientId": "1001"}, thread_id="s1")
+            await asyncio.gather(*agent._summaries.values())
+        return (await agent.graph.aget_state({"configurable": {"thread_id": "s1"}})).values
+
+    values = asyncio.run(run())
+    last_prompt = agent.banking.ainvoke.await_args.args[0]["messages"]
+
+    assert values["summary"] == "user asked about cards"
+    assert 0 < values["summarized_upto"] < values["message_count"] == 8
+    assert last_prompt[0]["role"] == "system"
+    assert "user asked about cards" in last_prompt[0]["content"]
+    assert last_prompt[-1] == {"role": "user", "content": "show my cards please 3"}
+    assert len(last_prompt) < values["message_count"]
+
+
+def test_sessions_are_indexed_per_user_without_scanning_checkpoints():
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    with patch("agents.intentAgent.get_db"), \
+            patch("agents.intentAgent.ChatOllama"), \
+            patch("agents.intentAgent.FriendlyAgent") as friendly_mock, \
+            patch("agents.intentAgent.BankingAgent"), \
+            patch("agents.intentAgent.IntentClassifier"):
+        friendly_mock.return_value.ainvoke = AsyncMock(return_value={"messages": [{"content": "hey"}]})
+        agent = IntentAgent(checkpointer=InMemorySaver())
+    agent.classifier = None
+    agent.llm.ainvoke = AsyncMock(return_value=AIMessage("friendly_chat"))
+    agent.checkpointer.alist = MagicMock(side_effect=AssertionError("full checkpoint scan"))
+    sessions = MagicMock()
+    sessions.update_one = AsyncMock()
+    sessions.find.return_value = _Cursor([{"_id": "s1", "message_count": 2}])
+
+    async def run():
+        await agent.ainvoke({"user_input": "hi", "clientId": "1001"}, thread_id="s1")
+        return await agent.alist_threads("1001")
+
+    db = {"chat_sessions": sessions, "chat_messages": _AsyncMessages(_Messages())}
+    with patch("agents.intentAgent.get_async_db", return_value=db):
+        listed = asyncio.run(run())
+
+    key, update = sessions.update_one.await_args.args
+    assert key == {"_id": "s1"}
+    assert update["$set"]["clientId"] == "1001"
+    assert update["$set"]["message_count"] == 2
+    assert sessions.update_one.await_args.kwargs == {"upsert": True}
+    assert sessions.find.call_args.args[0]["clientId"] == "1001"
+    assert listed == [{"session_id": "s1", "message_count": 2}]
+
+
+def test_history_calls_without_a_checkpointer_are_no_ops(mock_agent):
+    assert mock_agent.checkpointer is None
+
+    async def run():
+        await mock_agent.aclear_history("s1")
+        return await mock_agent.aget_history("s1")
+
+    assert asyncio.run(run()) == []
@@ -0,0 +1,58 @@
+import numpy as np
+from agents.intentClassifier import IntentClassifier
+
+VOCAB = ["show", "my", "cards", "card", "balance", "hello", "hi", "there", "weather"]
+
+EXAMPLES = {
+    "customer_request": ["show my cards", "my card balance", "show balance"],
+    "friendly_chat": ["hello", "hi there", "hello there"],
+}
+
+
+def bag_of_words(texts):
+    out = np.zeros((len(texts), len(VOCAB)), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in text.split():
+            if word in VOCAB:
+                out[i, VOCAB.index(word)] += 1.0
+    return out
+
+
+def make_classifier(threshold=0.5, margin=0.05):
+    return IntentClassifier(EXAMPLES, threshold=threshold, margin=margin, embed=bag_of_words)
+
+
+def test_confident_prediction():
+    clf = make_classifier()
+    assert clf.classify("Show my  CARDS") == "customer_request"
+    assert clf.classify("hello") == "friendly_chat"
+    assert clf.stats()["hits"] == 2
+
+
+def test_low_confidence_falls_back():
+    clf = make_classifier()
+    assert clf.classify("weather") is None
+    stats = clf.stats()
+    assert stats["fallbacks"] == 1
+    assert stats["hit_rate"] == 0.0
+
+
+def test_threshold_is_configurable(monkeypatch):
+    monkeypatch.setenv("INTENT_FASTPATH_THRESHOLD", "0.99")
+    clf = IntentClassifier(EXAMPLES, embed=bag_of_words)
+    assert clf.threshold == 0.99
+    assert clf.classify("show my balance") is None
+
+
+def test_audit_accuracy():
+    clf = make_classifier()
+    clf.record_audit("friendly_chat", "friendly_chat")
+    clf.record_audit("friendly_chat", "customer_request")
+    assert clf.stats()["audited_accuracy"] == 0.5
+
+
+def test_evaluate_reports_coverage_and_accuracy():
+    report = make_classifier().evaluate()
+    assert report["examples"] == 6
+    assert 0.0 < report["coverage"] <= 1.0
+    assert report["fastpath_accuracy"] == 1.0
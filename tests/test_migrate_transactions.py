@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import MagicMock
+from MigrateTransactions import TransactionMigration, MIGRATION_ID
+
+
+def _txn(i):
+    return {"date": "23102025", "time": f"1000{i:02d}", "transactionAmount": f"{i}.00", "stanNumber": str(i)}
+
+
+def _db(cards, checkpoint=None):
+    collections = {"cards": MagicMock(), "transactions": MagicMock(), "migrations": MagicMock()}
+    collections["cards"].find.return_value.sort.return_value.batch_size.return_value = iter(cards)
+    collections["migrations"].find_one.return_value = checkpoint
+    db = MagicMock()
+    db.__getitem__.side_effect = collections.__getitem__
+    return db, collections
+
+
+def test_migration_flushes_ordered_batches_at_card_boundaries():
+    cards = [
+        {"_id": 1, "clientId": "1001", "cardNumber": "5000", "transactions": [_txn(1), _txn(2)]},
+        {"_id": 2, "clientId": "1001", "cardNumber": "5001", "transactions": [_txn(3), {"date": "bad"}]},
+        {"_id": 3, "clientId": "1002", "cardNumber": "5002", "transactions": [_txn(4)]},
+    ]
+    db, cols = _db(cards)
+
+    counts = TransactionMigration(db, batch_size=2).run()
+
+    assert counts == {"cards": 3, "transactions": 4, "skipped": 1, "batches": 2}
+    writes = cols["transactions"].bulk_write.call_args_list
+    assert [len(c.args[0]) for c in writes] == [2, 2]
+    assert all(c.kwargs["ordered"] for c in writes)
+    saved = [c.args[1]["$set"] for c in cols["migrations"].update_one.call_args_list]
+    assert [s["last_card_id"] for s in saved] == [1, 3, 3]
+    assert saved[-1]["done"] is True
+    marks = [[(op._filter, op._doc) for op in c.args[0]] for c in cols["cards"].bulk_write.call_args_list]
+    assert marks == [
+        [({"_id": 1}, {"$set": {"migratedTransactions": 2}})],
+        [({"_id": 2}, {"$set": {"migratedTransactions": 2}}), ({"_id": 3}, {"$set": {"migratedTransactions": 1}})],
+    ]
+
+
+def test_migration_resumes_after_checkpoint():
+    db, cols = _db([], checkpoint={"_id": MIGRATION_ID, "last_card_id": 41})
+
+    TransactionMigration(db).run()
+
+    query = cols["cards"].find.call_args.args[0]
+    assert query["_id"] == {"$gt": 41}
+    cols["transactions"].bulk_write.assert_not_called()
+
+
+def test_upserts_are_idempotent():
+    card = {"_id": 1, "clientId": "1001", "cardNumber": "5000", "transactions": [_txn(1)]}
+    db, cols = _db([card])
+    TransactionMigration(db).run()
+    db2, cols2 = _db([dict(card)])
+    TransactionMigration(db2).run()
+
+    first = cols["transactions"].bulk_write.call_args.args[0][0]
+    second = cols2["transactions"].bulk_write.call_args.args[0][0]
+    assert first._filter == second._filter
+
+
+def test_unset_embedded_recopies_changed_cards_first():
+    changed = {"_id": 7, "clientId": "1001", "cardNumber": "5000", "transactions": [_txn(1), _txn(2), _txn(3)]}
+    db, cols = _db([], checkpoint={"_id": MIGRATION_ID, "last_card_id": 9, "done": True})
+    cols["cards"].find.return_value.sort.return_value = iter([changed])
+    cols["cards"].update_many.return_value.modified_count = 4
+
+    assert TransactionMigration(db).unset_embedded() == 4
+
+    recopy_query = cols["cards"].find.call_args.args[0]
+    assert recopy_query["$expr"] == {"$ne": [{"$size": {"$ifNull": ["$transactions", []]}}, "$migratedTransactions"]}
+    assert len(cols["transactions"].bulk_write.call_args.args[0]) == 3
+    mark = cols["cards"].bulk_write.call_args.args[0][0]
+    assert (mark._filter, mark._doc) == ({"_id": 7}, {"$set": {"migratedTransactions": 3}})
+    unset_query, update = cols["cards"].update_many.call_args.args
+    assert unset_query["$expr"]["$eq"][1] == "$migratedTransactions"
+    assert "_id" not in unset_query
+    assert update == {"$unset": {"transactions": ""}}
+    cols["migrations"].update_one.assert_not_called()
+
+
+def test_unset_embedded_requires_a_finished_migration():
+    db, _ = _db([], checkpoint={"_id": MIGRATION_ID, "last_card_id": 9, "done": False})
+    with pytest.raises(RuntimeError):
+        TransactionMigration(db).unset_embedded()
+
+
+def test_cards_without_valid_rows_are_still_flushed_in_batches():
+    cards = [{"_id": i, "clientId": "1001", "cardNumber": f"50{i:02d}", "transactions": [{"date": "bad"}]} for i in range(5)]
+    db, cols = _db(cards)
+
+    counts = TransactionMigration(db, batch_size=2).run()
+
+    assert counts["batches"] == 3
+    assert [len(c.args[0]) for c in cols["cards"].bulk_write.call_args_list] == [2, 2, 1]
+    saved = [c.args[1]["$set"]["last_card_id"] for c in cols["migrations"].update_one.call_args_list]
+    assert saved == [1, 3, 4, 4]
+    cols["transactions"].bulk_write.assert_not_called()
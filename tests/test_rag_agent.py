@@ -0,0 +1,26 @@
+from unittest.mock import MagicMock, patch
+import numpy as np
+from agents.ragAgent import RagAgent
+
+
+@patch("agents.ragAgent.get_vector_store")
+@patch("agents.ragAgent.embed_query")
+@patch("agents.ragAgent.ChatOllama")
+def test_pipeline_passes_arrays_without_tools(mock_llm, mock_embed, mock_store):
+    vector = np.arange(384, dtype=np.float32)
+    mock_embed.return_value = vector
+    mock_store.return_value.search.return_value = [[
+        {"text": "The annual fee is 10 EUR.", "source": "fees.md", "score": 0.1},
+    ]]
+    mock_llm.return_value.bind_tools.return_value.invoke.return_value = MagicMock(content="10 EUR per year.")
+
+    agent = RagAgent("BankA")
+    agent.tools = [MagicMock(), MagicMock()]
+    out = agent.invoke({"user_input": "What is the annual fee?", "bank_name": "BankA"})
+
+    mock_embed.assert_called_once_with("What is the annual fee?")
+    name, searched, top_k = mock_store.return_value.search.call_args.args
+    assert name == "BankA" and searched is vector and top_k == 5
+    assert all(not tool.invoke.called for tool in agent.tools)
+    assert out["context"] == "The annual fee is 10 EUR."
+    assert out["result"] == {"content": "10 EUR per year."}
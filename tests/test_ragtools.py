@@ -0,0 +1,73 @@
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+from tools import ragtools
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(ragtools, "_embedder", None)
+    monkeypatch.setattr(ragtools, "_milvus_connected", False)
+    monkeypatch.setattr(ragtools, "_embedding_cache", None)
+    monkeypatch.setattr(ragtools, "_embedding_batcher", None)
+
+
+def test_import_has_no_side_effects():
+    assert ragtools._embedder is None
+    assert ragtools._milvus_connected is False
+
+
+def test_embedder_is_created_once_across_threads():
+    model = MagicMock()
+    with patch.object(ragtools, "_create_embedder", return_value=model) as create:
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(ragtools.get_embedder())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert create.call_count == 1
+    assert all(m is model for m in seen)
+
+
+def test_milvus_connects_once_and_warmup_uses_both():
+    model = MagicMock()
+    with patch.object(ragtools, "_create_embedder", return_value=model), \
+         patch.object(ragtools, "_connect") as connect:
+        ragtools.warmup()
+        ragtools.connect_milvus()
+    connect.assert_called_once()
+    model.encode.assert_called_once_with(["warmup"])
+
+
+def test_warmup_can_skip_milvus():
+    with patch.object(ragtools, "_create_embedder", return_value=MagicMock()), \
+         patch.object(ragtools, "_connect") as connect:
+        ragtools.warmup(milvus=False)
+    connect.assert_not_called()
+
+
+def test_close_embedding_cache_flushes_the_disk_store(tmp_path, monkeypatch):
+    import metrics
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path))
+    cache = ragtools.get_embedding_cache()
+    cache.set("hello", [1.0, 2.0])
+
+    with patch.object(cache.disk, "flush", wraps=cache.disk.flush) as flush:
+        ragtools.close_embedding_cache()
+        ragtools.close_embedding_cache()
+
+    flush.assert_called_once()
+    assert ragtools._embedding_cache is None
+    assert "embedding_cache" not in metrics.snapshot()
+
+
+def test_close_embedding_batcher_stops_the_worker():
+    with patch.object(ragtools, "_create_embedder", return_value=MagicMock(encode=lambda texts, **kw: [[0.0]] * len(texts))):
+        batcher = ragtools.get_embedding_batcher()
+        batcher.embed("warm")
+        thread = batcher._thread
+        ragtools.close_embedding_batcher()
+
+    assert not thread.is_alive()
+    assert ragtools._embedding_batcher is None
@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from api.services.slack_queue import SlackEventQueue, QUEUED, DUPLICATE, FULL
+
+
+def test_duplicate_event_ids_are_processed_once():
+    handled = []
+
+    async def handler(event):
+        handled.append(event["text"])
+
+    async def run():
+        queue = SlackEventQueue(handler, workers=2, maxsize=10)
+        await queue.start()
+        results = [
+            queue.submit("Ev1", "U1", {"text": "hi"}),
+            queue.submit("Ev1", "U1", {"text": "hi"}),
+            queue.submit("Ev2", "U1", {"text": "again"}),
+        ]
+        await queue.stop()
+        return results, queue.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [QUEUED, DUPLICATE, QUEUED]
+    assert handled == ["hi", "again"]
+    assert stats["duplicates"] == 1
+    assert stats["processed"] == 2
+    assert stats["queue_wait"]["count"] == 2
+
+
+def test_events_of_one_key_run_in_order():
+    log = []
+
+    async def handler(event):
+        log.append(("start", event["key"], event["n"]))
+        await asyncio.sleep(0.01)
+        log.append(("end", event["key"], event["n"]))
+
+    async def run():
+        queue = SlackEventQueue(handler, workers=8, maxsize=10)
+        await queue.start()
+        for n in range(3):
+            queue.submit(f"A{n}", "UA", {"key": "UA", "n": n})
+        queue.submit("B0", "UB", {"key": "UB", "n": 0})
+        await queue.stop()
+
+    asyncio.run(run())
+    ua = [(kind, n) for kind, key, n in log if key == "UA"]
+    assert ua == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+    assert ("end", "UB", 0) in log
+
+
+def test_full_queue_rejects_and_forgets_the_event_id():
+    async def run():
+        gate = asyncio.Event()
+
+        async def handler(event):
+            await gate.wait()
+
+        queue = SlackEventQueue(handler, workers=1, maxsize=2)
+        await queue.start()
+        first = queue.submit("E1", "U1", {})
+        await asyncio.sleep(0)  # lane takes E1; it still counts as pending
+        second = queue.submit("E2", "U1", {})
+        third = queue.submit("E3", "U1", {})
+        retry = queue.submit("E3", "U1", {})
+        gate.set()
+        await queue.stop()
+        return first, second, third, retry, queue.stats()
+
+    first, second, third, retry, stats = asyncio.run(run())
+    assert (first, second, third) == (QUEUED, QUEUED, FULL)
+    assert retry == FULL
+    assert stats["rejected"] == 2
+
+
+def test_slow_prepare_does_not_block_other_keys():
+    handled = []
+
+    async def prepare(event):
+        if event.get("audio"):
+            await asyncio.sleep(0.2)
+        return {**event, "prepared": True}
+
+    async def handler(event):
+        handled.append((event["user"], event["prepared"]))
+
+    async def run():
+        queue = SlackEventQueue(handler, workers=1, maxsize=10, prepare=prepare)
+        await queue.start()
+        queue.submit("E1", "U1", {"user": "U1", "audio": True})
+        queue.submit("E2", "U2", {"user": "U2"})
+        await asyncio.sleep(0.05)
+        early = list(handled)
+        await queue.stop()
+        return early, queue.stats()
+
+    early, stats = asyncio.run(run())
+    assert early == [("U2", True)]
+    assert stats["processed"] == 2
+    assert stats["prepare"]["count"] == 2
+    assert stats["queue_depth"] == 0
+
+
+def test_failed_handler_does_not_stop_the_worker():
+    handled = []
+
+    async def handler(event):
+        if event.get("boom"):
+            raise ValueError("boom")
+        handled.append(event)
+
+    async def run():
+        queue = SlackEventQueue(handler, workers=1, maxsize=5)
+        await queue.start()
+        queue.submit("E1", "U1", {"boom": True})
+        queue.submit("E2", "U1", {"ok": True})
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert handled == [{"ok": True}]
+    assert stats["failed"] == 1
+
+
+def test_submit_requires_start():
+    queue = SlackEventQueue(lambda e: None, workers=1)
+    with pytest.raises(RuntimeError):
+        queue.submit("E1", "U1", {})
@@ -0,0 +1,66 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from api.services.stt_scheduler import STTScheduler, assign_segments, layout_windows
+
+
+def test_layout_windows_never_cross_clips():
+    offsets, windows = layout_windows([25, 70, 0, 10], window=30)
+    assert offsets == [0, 25, 95, 95]
+    assert windows == [
+        {"start": 0, "end": 25},
+        {"start": 25, "end": 55},
+        {"start": 55, "end": 85},
+        {"start": 85, "end": 95},
+        {"start": 95, "end": 105},
+    ]
+
+
+def test_assign_segments_maps_back_by_timestamp():
+    offsets = [0, 25 * 16000, 95 * 16000]
+    segments = [
+        SimpleNamespace(start=0.0, end=25.0, text=" first "),
+        SimpleNamespace(start=25.0, end=55.0, text="second a"),
+        SimpleNamespace(start=55.0, end=95.0, text="second b"),
+        SimpleNamespace(start=95.0, end=96.0, text=""),
+    ]
+    assert assign_segments(offsets, segments) == ["first", "second a second b", ""]
+
+
+def test_concurrent_requests_are_batched():
+    batches = []
+
+    def transcribe_batch(paths):
+        batches.append(list(paths))
+        time.sleep(0.05)
+        return [p.upper() for p in paths]
+
+    async def run():
+        with ThreadPoolExecutor(1) as executor:
+            scheduler = STTScheduler(transcribe_batch, executor, batch_size=4, max_wait=0.02)
+            results = await asyncio.gather(*(scheduler.transcribe(f"f{i}") for i in range(6)))
+            await scheduler.stop()
+            return results, scheduler.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [f"F{i}" for i in range(6)]
+    assert batches == [["f0", "f1", "f2", "f3"], ["f4", "f5"]]
+    assert stats["batches"] == 2
+    assert stats["max_batch"] == 4
+
+
+def test_batch_failure_reaches_every_caller():
+    def transcribe_batch(paths):
+        raise RuntimeError("decoder crashed")
+
+    async def run():
+        with ThreadPoolExecutor(1) as executor:
+            scheduler = STTScheduler(transcribe_batch, executor, batch_size=4, max_wait=0.01)
+            results = await asyncio.gather(scheduler.transcribe("a"), scheduler.transcribe("b"), return_exceptions=True)
+            await scheduler.stop()
+            return results, scheduler.stats()
+
+    results, stats = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert stats["failed"] == 2
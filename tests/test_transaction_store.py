@@ -0,0 +1,53 @@
+import pytest
+from datetime import datetime
+from decimal import Decimal
+import transaction_store
+
+
+LEGACY_TXN = {
+    "date": "23102025",
+    "time": "142501",
+    "transactionAmount": "12.50",
+    "currency": "840",
+    "terminalLocation": "FSB CORE",
+    "stanNumber": "142501000001",
+    "referenceNumber": "142501000001",
+}
+
+
+def test_normalize_transaction():
+    doc = transaction_store.normalize_transaction("1001", "5000", LEGACY_TXN)
+
+    assert doc["timestamp"] == datetime(2025, 10, 23, 14, 25, 1)
+    assert doc["amount"].to_decimal() == Decimal("12.50")
+    assert doc["currency"] == "840"
+    assert doc["terminalLocation"] == "FSB CORE"
+    assert "date" not in doc
+    assert doc["_id"] == transaction_store.normalize_transaction("1001", "5000", dict(LEGACY_TXN))["_id"]
+
+
+def test_normalize_rejects_bad_amount():
+    with pytest.raises(ValueError):
+        transaction_store.normalize_transaction("1001", "5000", {**LEGACY_TXN, "transactionAmount": "abc"})
+
+
+def test_day_range_orders_across_months_and_years():
+    start, end = transaction_store.day_range("30122024", "02012025")
+    assert start == datetime(2024, 12, 30)
+    assert end == datetime(2025, 1, 3)
+    assert start <= datetime(2024, 12, 31, 23, 59) < end
+
+
+def test_cursor_round_trip():
+    doc = {"_id": "abc_def", "timestamp": datetime(2025, 10, 23, 14, 25, 1)}
+    cursor = transaction_store.encode_cursor(doc)
+    assert transaction_store.decode_cursor(cursor) == (doc["timestamp"], "abc_def")
+
+    query, sort = transaction_store.range_query("1001", "5000", datetime(2025, 1, 1), datetime(2026, 1, 1), cursor)
+    assert query["$or"][1] == {"timestamp": doc["timestamp"], "_id": {"$gt": "abc_def"}}
+    assert sort == [("timestamp", 1), ("_id", 1)]
+
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        transaction_store.decode_cursor("garbage")
@@ -0,0 +1,78 @@
+import os
+import stat
+import time
+import asyncio
+from unittest.mock import patch
+from api.services.transcript_cache import TranscriptCache, file_sha256
+
+
+def test_file_id_and_hash_lookup(tmp_path):
+    cache = TranscriptCache(maxsize=8, directory=str(tmp_path))
+    assert cache.get("abc") is None
+    cache.set("abc", "hello there", file_id="F1")
+
+    assert cache.hash_for("F1") == "abc"
+    assert cache.hash_for("F2") is None
+    assert cache.get("abc") == "hello there"
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    TranscriptCache(maxsize=8, directory=str(tmp_path)).set("abc", "hello")
+
+    cache = TranscriptCache(maxsize=8, directory=str(tmp_path))
+    assert cache.stats()["disk_bytes"] == 5
+    assert cache.get("abc") == "hello"
+    assert cache.get("abc") == "hello"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = TranscriptCache(maxsize=8, directory=str(tmp_path), max_disk_bytes=25)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    old = time.time() - 60
+    os.utime(tmp_path / "a.txt", (old, old))
+    os.utime(tmp_path / "b.txt", (old + 1, old + 1))
+    cache.set("c", "z" * 10)
+
+    assert sorted(os.listdir(tmp_path)) == ["b.txt", "c.txt"]
+    assert cache.stats()["disk_bytes"] == 20
+    assert cache.stats()["disk_evictions"] == 1
+
+
+def test_disk_tier_can_be_disabled():
+    cache = TranscriptCache(maxsize=8, directory="")
+    cache.set("a", "text")
+    assert cache.get("a") == "text"
+    assert cache.stats()["disk_bytes"] == 0
+
+
+def test_memory_only_by_default(monkeypatch):
+    monkeypatch.delenv("STT_CACHE_DIR", raising=False)
+    assert TranscriptCache(maxsize=8).directory == ""
+
+
+def test_async_disk_io_runs_off_the_event_loop(tmp_path):
+    cache = TranscriptCache(maxsize=8, directory=str(tmp_path))
+
+    async def run():
+        with patch("api.services.transcript_cache.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+            await cache.aset("abc", "hello", file_id="F1")
+            cache.memory.clear()
+            text = await cache.aget("abc")
+        return text, to_thread.call_count
+
+    assert asyncio.run(run()) == ("hello", 2)
+    assert cache.hash_for("F1") == "abc"
+    assert stat.S_IMODE(os.stat(tmp_path / "abc.txt").st_mode) == 0o600
+
+
+def test_file_sha256(tmp_path):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(b"abc")
+    assert file_sha256(str(path), chunk_size=2) == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
@@ -0,0 +1,170 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+import user_context
+from user_context import UserDataContext, AsyncUserDataContext, CARD_FIELDS
+
+
+def test_get_cards_projects_out_transactions():
+    cards = MagicMock()
+    cards.find.return_value = [{"cardNumber": "5000"}]
+    ctx = UserDataContext("1001", cards, MagicMock())
+
+    assert ctx.get_cards() == [{"cardNumber": "5000"}]
+    projection = cards.find.call_args.args[1]
+    assert projection == CARD_FIELDS
+    assert "transactions" not in projection
+    assert "pinHash" not in projection
+
+
+def test_recent_transactions_use_the_transactions_index():
+    transactions = MagicMock()
+    transactions.find.return_value.sort.return_value.limit.return_value = [{"_id": "a"}]
+    ctx = UserDataContext("1001", MagicMock(), transactions)
+
+    assert ctx.get_recent_transactions("5000", 3) == [{"_id": "a"}]
+    transactions.find.assert_called_once_with({"clientId": "1001", "cardNumber": "5000"})
+    transactions.find.return_value.sort.assert_called_once_with([("timestamp", -1), ("_id", -1)])
+    transactions.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+
+def test_transactions_range_pages_with_cursor():
+    docs = [{"_id": str(i), "timestamp": datetime(2025, 10, 23, 10, i)} for i in range(3)]
+    transactions = MagicMock()
+    transactions.find.return_value.sort.return_value.limit.return_value = docs
+    ctx = UserDataContext("1001", MagicMock(), transactions)
+
+    page, cursor = ctx.get_transactions_range("5000", datetime(2025, 10, 23), datetime(2025, 10, 25), limit=2)
+
+    assert page == docs[:2]
+    assert cursor is not None
+    query = transactions.find.call_args.args[0]
+    assert query["timestamp"] == {"$gte": datetime(2025, 10, 23), "$lt": datetime(2025, 10, 25)}
+    transactions.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+
+def test_async_recent_transactions():
+    cursor = MagicMock()
+    cursor.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[{"_id": "b"}])
+    transactions = MagicMock()
+    transactions.find.return_value = cursor
+    ctx = AsyncUserDataContext("1001", MagicMock(), transactions)
+
+    assert asyncio.run(ctx.get_recent_transactions("5000", 1)) == [{"_id": "b"}]
+
+
+def test_dual_read_falls_back_to_embedded(monkeypatch):
+    monkeypatch.setenv("TRANSACTIONS_READ_MODE", "dual")
+    transactions = MagicMock()
+    transactions.find.return_value.sort.return_value.limit.return_value = []
+    cards = MagicMock()
+    cards.find_one.return_value = {"transactions": [
+        {"date": "23102025", "time": "100000", "transactionAmount": "5.00"},
+        {"date": "01112025", "time": "100000", "transactionAmount": "7.00"},
+    ]}
+    ctx = UserDataContext("1001", cards, transactions)
+
+    page, cursor = ctx.get_transactions_range("5000", datetime(2025, 10, 1), datetime(2025, 11, 1))
+
+    assert [str(d["amount"]) for d in page] == ["5.00"]
+    assert cursor is None
+    assert cards.find_one.call_args.args[0]["migratedTransactions"] == {"$exists": False}
+
+
+def test_dual_read_does_not_fall_back_for_migrated_cards(monkeypatch):
+    monkeypatch.setenv("TRANSACTIONS_READ_MODE", "dual")
+    transactions = MagicMock()
+    transactions.find.return_value.sort.return_value.limit.return_value = []
+    card = {"migratedTransactions": 1, "transactions": [{"date": "23102025", "transactionAmount": "5.00"}]}
+    cards = MagicMock()
+    cards.find_one.side_effect = lambda query, projection: None if "migratedTransactions" in query else card
+    cards.aggregate.side_effect = lambda pipeline: [] if "migratedTransactions" in pipeline[0]["$match"] else [card]
+    ctx = UserDataContext("1001", cards, transactions)
+
+    assert ctx.get_transactions_range("5000", datetime(2025, 10, 1), datetime(2025, 11, 1)) == ([], None)
+    assert ctx.get_recent_transactions("5000", 5) == []
+
+
+def test_recent_transactions_agree_across_read_modes(monkeypatch):
+    from transaction_store import normalize_transaction
+    # Array order is insertion order, not chronological.
+    embedded = [
+        {"date": "23102025", "time": "090000", "transactionAmount": "1.00"},
+        {"date": "02012026", "time": "080000", "transactionAmount": "2.00"},
+        {"date": "15112025", "time": "120000", "transactionAmount": "3.00"},
+        {"date": "02012026", "time": "070000", "transactionAmount": "4.00"},
+    ]
+    migrated = [normalize_transaction("1001", "5000", t) for t in embedded]
+    newest = sorted(migrated, key=lambda d: (d["timestamp"], d["_id"]), reverse=True)
+    transactions = MagicMock()
+    transactions.find.return_value.sort.return_value.limit.side_effect = lambda n: newest[:n]
+    cards = MagicMock()
+    cards.aggregate.return_value = [{"transactions": embedded}]
+
+    def recent(mode):
+        monkeypatch.setenv("TRANSACTIONS_READ_MODE", mode)
+        return [d["_id"] for d in UserDataContext("1001", cards, transactions).get_recent_transactions("5000", 3)]
+
+    assert recent("embedded") == recent("collection") == [d["_id"] for d in newest[:3]]
+    pipeline = cards.aggregate.call_args.args[0]
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert stages.index("$sort") < stages.index("$limit", stages.index("$sort"))
+
+
+def test_collection_mode_never_reads_embedded(monkeypatch):
+    monkeypatch.setenv("TRANSACTIONS_READ_MODE", "collection")
+    transactions = MagicMock()
+    transactions.find.return_value.sort.return_value.limit.return_value = []
+    cards = MagicMock()
+    ctx = UserDataContext("1001", cards, transactions)
+
+    assert ctx.get_recent_transactions("5000", 5) == []
+    cards.aggregate.assert_not_called()
+
+
+def test_card_reads_are_memoized_for_the_turn():
+    cards = MagicMock()
+    cards.find.return_value = [{"cardNumber": "5000"}, {"cardNumber": "5001"}]
+    cards.find_one.return_value = {"cardNumber": "5000", "pinHash": "h"}
+    ctx = UserDataContext("1001", cards, MagicMock())
+    before = user_context.cache_stats()["avoided_round_trips"]
+
+    ctx.get_cards()
+    ctx.get_cards()
+    assert ctx.get_card("5000")["pinHash"] == "h"
+    assert ctx.get_card("5000")["pinHash"] == "h"
+
+    cards.find.assert_called_once()
+    cards.find_one.assert_called_once()
+    assert cards.find_one.call_args.args[1] == {**CARD_FIELDS, "pinHash": 1}
+    assert user_context.cache_stats()["avoided_round_trips"] - before == 2
+
+
+def test_update_pin_invalidates_cached_cards():
+    cards = MagicMock()
+    cards.find_one.side_effect = [{"cardNumber": "5000", "pinHash": "old"}, {"cardNumber": "5000", "pinHash": "new"}]
+    ctx = UserDataContext("1001", cards, MagicMock())
+
+    assert ctx.get_card("5000")["pinHash"] == "old"
+    assert ctx.get_card("5000")["pinHash"] == "old"
+    ctx.update_pin("5000", "new")
+    assert ctx.get_card("5000")["pinHash"] == "new"
+    assert cards.find_one.call_count == 2
+
+
+def test_async_card_reads_are_memoized():
+    cards = MagicMock()
+    cards.find.return_value.to_list = AsyncMock(return_value=[{"cardNumber": "5000"}])
+    cards.find_one = AsyncMock(return_value={"cardNumber": "5000", "pinHash": "h"})
+    cards.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+    ctx = AsyncUserDataContext("1001", cards, MagicMock())
+
+    async def run():
+        await ctx.get_cards()
+        card = await ctx.get_card("5000")
+        await ctx.update_pin("5000", "new")
+        await ctx.get_cards()
+        return card
+
+    assert asyncio.run(run())["pinHash"] == "h"
+    assert cards.find.call_count == 2
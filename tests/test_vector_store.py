@@ -0,0 +1,123 @@
+import threading
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pytest
+from tools import ragtools, vectorstore
+from tools.vectorstore import MilvusVectorStore, NumpyVectorStore, search_params
+
+
+def _corpus(n=200, dim=16, seed=1):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    docs = [{"text": f"chunk {i}", "source": f"doc{i % 3}.pdf"} for i in range(n)]
+    return vectors, docs
+
+
+def test_exact_search_matches_brute_force(tmp_path):
+    vectors, docs = _corpus()
+    store = NumpyVectorStore(str(tmp_path))
+    store.build("BankA", vectors, docs)
+
+    query = vectors[17] + 0.01
+    hits = store.search("BankA", query, top_k=3)[0]
+    expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:3]
+    assert [h["text"] for h in hits] == [f"chunk {i}" for i in expected]
+    assert hits[0]["source"] == "doc2.pdf"
+    assert hits[0]["score"] == pytest.approx(((vectors[17] - query) ** 2).sum(), abs=1e-4)
+
+
+def test_ivf_search_finds_the_nearest_neighbour(tmp_path, monkeypatch):
+    vectors, docs = _corpus()
+    store = NumpyVectorStore(str(tmp_path))
+    store.build("BankA", vectors, docs, nlist=8)
+    monkeypatch.setenv("VECTOR_SEARCH_PARAMS", '{"BankA": {"params": {"nprobe": 2}}}')
+
+    results = store.search("BankA", vectors[:20], top_k=1)
+    assert [r[0]["text"] for r in results] == [f"chunk {i}" for i in range(20)]
+
+
+@pytest.mark.parametrize("nprobe", [0, -1])
+def test_non_positive_nprobe_searches_exactly(tmp_path, monkeypatch, nprobe):
+    vectors, docs = _corpus()
+    store = NumpyVectorStore(str(tmp_path))
+    store.build("BankA", vectors, docs, nlist=8)
+    monkeypatch.setenv("VECTOR_SEARCH_PARAMS", f'{{"BankA": {{"params": {{"nprobe": {nprobe}}}}}}}')
+
+    query = vectors[5] + 0.01
+    hits = store.search("BankA", query, top_k=5)[0]
+    expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:5]
+    assert [h["text"] for h in hits] == [f"chunk {i}" for i in expected]
+
+
+def test_empty_collection_returns_no_hits(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.build("BankA", np.zeros((0, 0), dtype=np.float32), [])
+    assert store.search("BankA", np.ones(8)) == [[]]
+
+
+def test_rebuild_replaces_the_loaded_collection(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.build("BankA", [[0.0, 0.0]], [{"text": "old", "source": "a"}])
+    assert store.search("BankA", [0.0, 0.0])[0][0]["text"] == "old"
+    store.build("BankA", [[0.0, 0.0]], [{"text": "new", "source": "a"}])
+    assert store.search("BankA", [0.0, 0.0])[0][0]["text"] == "new"
+    with pytest.raises(KeyError):
+        store.search("Unknown", [0.0, 0.0])
+
+
+def test_search_params_merge_per_collection(monkeypatch):
+    monkeypatch.setenv("VECTOR_SEARCH_PARAMS", '{"default": {"params": {"nprobe": 4}}, "BankB": {"params": {"nprobe": 32}}}')
+    assert search_params("BankA") == {"metric_type": "L2", "params": {"nprobe": 4}}
+    assert search_params("BankB") == {"metric_type": "L2", "params": {"nprobe": 32}}
+
+
+def test_milvus_collection_handles_are_cached():
+    store = MilvusVectorStore()
+    collection = MagicMock()
+    hit = MagicMock(distance=0.5)
+    hit.entity.get.side_effect = lambda key, default="": {"text": "fees", "source": "b.pdf"}[key]
+    collection.search.return_value = [[hit]]
+    pymilvus = MagicMock(Collection=MagicMock(return_value=collection))
+    with patch.dict("sys.modules", {"pymilvus": pymilvus}), patch.object(ragtools, "connect_milvus"):
+        first = store.search("BankA", [0.1, 0.2], top_k=1)
+        store.search("BankA", [0.1, 0.2], top_k=1)
+
+    assert first == [[{"text": "fees", "source": "b.pdf", "score": 0.5}]]
+    pymilvus.Collection.assert_called_once_with("BankA")
+    collection.load.assert_called_once()
+    assert collection.search.call_args.kwargs["param"] == {"metric_type": "L2", "params": {"nprobe": 8}}
+
+
+def test_similarity_tool_on_the_numpy_backend(tmp_path, monkeypatch):
+    store = NumpyVectorStore(str(tmp_path))
+    store.build("BankA", [[1.0, 0.0], [0.0, 1.0]], [{"text": "a", "source": "x"}, {"text": "b", "source": "y"}])
+    monkeypatch.setattr(vectorstore, "_store", store)
+    hits = ragtools.similarity_tool([0.0, 0.9], "BankA", top_k=1)
+    assert hits == [{"text": "b", "source": "y", "score": pytest.approx(0.01)}]
+
+
+def test_milvus_load_does_not_block_other_collections():
+    store = MilvusVectorStore()
+    release = threading.Event()
+    loading = threading.Event()
+
+    def make(name):
+        collection = MagicMock()
+        if name == "BankA":
+            collection.load.side_effect = lambda: (loading.set(), release.wait(5))
+        return collection
+
+    pymilvus = MagicMock(Collection=MagicMock(side_effect=make))
+    with patch.dict("sys.modules", {"pymilvus": pymilvus}), patch.object(ragtools, "connect_milvus"):
+        slow = threading.Thread(target=store.collection, args=("BankA",))
+        slow.start()
+        assert loading.wait(5)
+        other = threading.Thread(target=store.collection, args=("BankB",))
+        other.start()
+        other.join(2)
+        finished_while_loading = not other.is_alive()
+        release.set()
+        slow.join(5)
+
+    assert finished_while_loading
+    assert set(store._collections) == {"BankA", "BankB"}
@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List
+import bcrypt
+import metrics
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class BcryptPoolBusy(RuntimeError):
+    """Raised when the bcrypt queue is full; callers should ask the user to retry."""
+
+
+class BcryptPool:
+    """
+    A bounded worker pool for bcrypt hashing and verification.
+    1. Runs bcrypt on worker threads; bcrypt releases the GIL while hashing,
+       so workers run in parallel and the event loop stays free.
+    2. Rejects work with BcryptPoolBusy once BCRYPT_MAX_QUEUE jobs are pending,
+       instead of letting a burst of PIN changes queue without bound.
+    3. Hashes with a configurable cost factor (BCRYPT_ROUNDS).
+    4. Tracks queue depth, its high-water mark and time spent queued and hashing.
+    Configuration: BCRYPT_WORKERS, BCRYPT_MAX_QUEUE, BCRYPT_ROUNDS.
+    """
+    def __init__(self, workers: int | None = None, max_queue: int | None = None, rounds: int | None = None):
+        self.workers = workers or int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_queue = max_queue or int(os.getenv("BCRYPT_MAX_QUEUE", "64"))
+        self.rounds = rounds or int(os.getenv("BCRYPT_ROUNDS", "12"))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._counts = {"completed": 0, "rejected": 0, "max_queue_depth": 0, "queue_seconds": 0.0, "work_seconds": 0.0}
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._counts["rejected"] += 1
+                raise BcryptPoolBusy("PIN service is busy")
+            self._pending += 1
+            self._counts["max_queue_depth"] = max(self._counts["max_queue_depth"], self._pending - self._running)
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._counts["completed"] += 1
+                    self._counts["queue_seconds"] += started - submitted
+                    self._counts["work_seconds"] += finished - started
+
+        return self._executor.submit(run)
+
+    def _hash(self, pin: str) -> str:
+        return bcrypt.hashpw(pin.encode(), bcrypt.gensalt(rounds=self.rounds)).decode()
+
+    @staticmethod
+    def _check(pin: str, pin_hash: str) -> bool:
+        return bcrypt.checkpw(pin.encode(), pin_hash.encode())
+
+    def hash_pin(self, pin: str) -> str:
+        return self._submit(self._hash, pin).result()
+
+    def check_pin(self, pin: str, pin_hash: str) -> bool:
+        return self._submit(self._check, pin, pin_hash).result()
+
+    async def ahash_pin(self, pin: str) -> str:
+        """
+        Hash a PIN on the pool without blocking the event loop.
+        Args:
+            pin (str): The clear-text PIN.
+        Returns:
+            str: The bcrypt hash.
+        Raises:
+            BcryptPoolBusy: If too many jobs are already pending.
+        """
+        return await asyncio.wrap_future(self._submit(self._hash, pin))
+
+    async def acheck_pin(self, pin: str, pin_hash: str) -> bool:
+        """
+        Verify a PIN against its bcrypt hash without blocking the event loop.
+        Raises:
+            BcryptPoolBusy: If too many jobs are already pending.
+        """
+        return await asyncio.wrap_future(self._submit(self._check, pin, pin_hash))
+
+    def hash_many(self, pins: Iterable[str]) -> List[str]:
+        """
+        Hash many PINs in parallel, bypassing the queue bound (for batch jobs like the seeder).
+        Args:
+            pins (Iterable[str]): The clear-text PINs.
+        Returns:
+            list[str]: The hashes, in input order.
+        """
+        return list(self._executor.map(self._hash, pins))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["queue_depth"] = self._pending - self._running
+            counts["running"] = self._running
+        counts["workers"] = self.workers
+        counts["max_queue"] = self.max_queue
+        counts["rounds"] = self.rounds
+        return counts
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_lock = threading.Lock()
+_pool: BcryptPool | None = None
+
+
+def get_bcrypt_pool() -> BcryptPool:
+    """
+    Return the process-wide bcrypt pool, creating it on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = BcryptPool()
+                metrics.register("bcrypt", _pool.stats)
+                logger.debug(f"bcrypt pool ready ({_pool.workers} workers, cost {_pool.rounds})")
+    return _pool
+
+
+def shutdown_bcrypt_pool():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+        metrics.unregister("bcrypt")
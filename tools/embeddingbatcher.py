@@ -0,0 +1,140 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches concurrent embedding requests into single encode calls.
+    1. Callers (threads or coroutines) enqueue one text and wait on a future.
+    2. A worker thread takes the first pending text, keeps collecting for up
+       to EMBEDDING_BATCH_WAIT_MS or until EMBEDDING_BATCH_SIZE texts are
+       waiting, then encodes them in one call. Texts that arrive while a
+       batch is encoding form the next batch, so a window of 0 still batches
+       under load.
+    3. Reports batch sizes and time spent waiting and encoding.
+    Configuration: EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WAIT_MS.
+    """
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], Any],
+        batch_size: int | None = None,
+        max_wait: float | None = None,
+    ):
+        self.encode_batch = encode_batch
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")) / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "batches": 0, "max_batch": 0, "failed": 0, "wait_seconds": 0.0, "encode_seconds": 0.0}
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for the next batch.
+        Returns:
+            Future: Resolves to the text's float32 vector.
+        """
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((time.perf_counter(), text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text as part of a batch, blocking until it is encoded.
+        Args:
+            text (str): The text to embed.
+        Returns:
+            np.ndarray: The float32 vector.
+        """
+        return self.submit(text).result()
+
+    async def aembed(self, text: str) -> np.ndarray:
+        """
+        Embed one text as part of a batch without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect(self, first) -> tuple:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            self._run(batch)
+            if stop:
+                return
+
+    def _run(self, batch: Sequence[tuple]):
+        started = time.perf_counter()
+        try:
+            vectors = np.asarray(self.encode_batch([text for _, text, _ in batch]), dtype=np.float32)
+        except Exception as e:
+            logger.exception(f"Embedding batch of {len(batch)} failed")
+            with self._lock:
+                self._counts["failed"] += len(batch)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._counts["requests"] += len(batch)
+                self._counts["batches"] += 1
+                self._counts["max_batch"] = max(self._counts["max_batch"], len(batch))
+                self._counts["wait_seconds"] += sum(started - queued for queued, _, _ in batch)
+                self._counts["encode_seconds"] += finished - started
+        for (_, _, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def close(self, timeout: float = 5.0):
+        """
+        Finish the queued work and stop the worker thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["avg_batch"] = counts["requests"] / counts["batches"] if counts["batches"] else 0.0
+        counts["batch_size"] = self.batch_size
+        counts["max_wait_ms"] = 1000 * self.max_wait
+        return counts
@@ -0,0 +1,205 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict
+import numpy as np
+from dotenv import load_dotenv
+from caching import LRUCache
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case and collapse whitespace (the default embedder is uncased)."""
+    return " ".join(text.lower().split())
+
+
+class _DiskStore:
+    """
+    A fixed-capacity float32 memmap of vectors plus an append-only index of
+    key digest -> row. Rows are reused round-robin once the file is full.
+    """
+    def __init__(self, directory: str, model_name: str, capacity: int):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.capacity = capacity
+        self.data_path = os.path.join(directory, f"{slug}.f32")
+        self.index_path = os.path.join(directory, f"{slug}.idx")
+        self.dim: int | None = None
+        self.vectors: np.memmap | None = None
+        self.rows: Dict[str, int] = {}
+        self.keys: Dict[int, str] = {}
+        self.next_row = 0
+        self._lines = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path) or not os.path.exists(self.data_path):
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            header = f.readline().split()
+            if len(header) != 3 or header[0] != "dim" or int(header[2]) != self.capacity:
+                logger.warning(f"Ignoring embedding store {self.data_path} with a different layout")
+                return
+            self.dim = int(header[1])
+            for line in f:
+                digest, row = line.split()
+                self._assign(digest, int(row))
+                self._lines += 1
+        self.vectors = np.memmap(self.data_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+        if self._lines > 2 * self.capacity:
+            self._compact()
+
+    def _assign(self, digest: str, row: int):
+        old = self.keys.get(row)
+        if old is not None:
+            self.rows.pop(old, None)
+        self.rows[digest] = row
+        self.keys[row] = digest
+        self.next_row = (row + 1) % self.capacity
+
+    def _header(self) -> str:
+        return f"dim {self.dim} {self.capacity}\n"
+
+    def _compact(self):
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self._header())
+            # Oldest first, so replaying the index restores next_row.
+            for row in sorted(self.keys, key=lambda r: (r - self.next_row) % self.capacity):
+                f.write(f"{self.keys[row]} {row}\n")
+        os.replace(tmp, self.index_path)
+        self._lines = len(self.keys)
+
+    def get(self, digest: str) -> np.ndarray | None:
+        row = self.rows.get(digest)
+        return None if row is None else np.array(self.vectors[row])
+
+    def put(self, digest: str, vector: np.ndarray):
+        if self.vectors is None:
+            self.dim = vector.shape[-1]
+            self.vectors = np.memmap(self.data_path, dtype=np.float32, mode="w+", shape=(self.capacity, self.dim))
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                f.write(self._header())
+        if vector.shape[-1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vector.shape[-1]}")
+        row = self.next_row
+        self.vectors[row] = vector
+        self._assign(digest, row)
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(f"{digest} {row}\n")
+        self._lines += 1
+        if self._lines > 2 * self.capacity:
+            self._compact()
+
+    def flush(self):
+        if self.vectors is not None:
+            self.vectors.flush()
+            self._compact()
+
+
+class EmbeddingCache:
+    """
+    Query embeddings keyed by model name and normalized query text.
+    1. Keeps float32 vectors in a bounded in-memory LRU.
+    2. Optionally backs it with a memory-mapped on-disk store
+       (EMBEDDING_CACHE_DIR) of EMBEDDING_CACHE_DISK_ROWS vectors that
+       survives restarts; the oldest rows are overwritten once it is full.
+    3. Counts memory hits, disk hits and misses and reports the hit ratio.
+    Configuration: EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_DIR (empty disables the disk store),
+    EMBEDDING_CACHE_DISK_ROWS.
+    """
+    def __init__(
+        self,
+        model_name: str,
+        maxsize: int | None = None,
+        directory: str | None = None,
+        disk_rows: int | None = None,
+    ):
+        self.model_name = model_name
+        self.memory = LRUCache(maxsize=maxsize or int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")))
+        directory = directory if directory is not None else os.getenv("EMBEDDING_CACHE_DIR", "")
+        disk_rows = disk_rows or int(os.getenv("EMBEDDING_CACHE_DISK_ROWS", "100000"))
+        self.disk = _DiskStore(directory, model_name, disk_rows) if directory else None
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _digest(self, normalized: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def get(self, query: str) -> np.ndarray | None:
+        """
+        Look up the cached embedding of a query.
+        Args:
+            query (str): The raw query text.
+        Returns:
+            np.ndarray | None: A read-only float32 vector, or None on a miss.
+        """
+        digest = self._digest(normalize_query(query))
+        vector = self.memory.get(digest)
+        if vector is not None:
+            self._count("memory_hits")
+            return vector
+
+        if self.disk is not None:
+            with self._lock:
+                vector = self.disk.get(digest)
+            if vector is not None:
+                vector.flags.writeable = False
+                self.memory.set(digest, vector)
+                self._count("disk_hits")
+                return vector
+
+        self._count("misses")
+        return None
+
+    def set(self, query: str, vector) -> np.ndarray:
+        """
+        Store the embedding of a query.
+        Returns:
+            np.ndarray: The stored read-only float32 vector.
+        """
+        vector = np.array(vector, dtype=np.float32).reshape(-1)
+        vector.flags.writeable = False
+        digest = self._digest(normalize_query(query))
+        self.memory.set(digest, vector)
+        if self.disk is not None:
+            with self._lock:
+                self.disk.put(digest, vector)
+        return vector
+
+    def get_or_compute(self, query: str, compute: Callable[[str], Any]) -> np.ndarray:
+        """
+        Return the cached embedding, computing and storing it on a miss.
+        Args:
+            query (str): The raw query text.
+            compute (Callable[[str], Any]): Embeds the normalized query.
+        Returns:
+            np.ndarray: A read-only float32 vector.
+        """
+        vector = self.get(query)
+        if vector is None:
+            vector = self.set(query, compute(normalize_query(query)))
+        return vector
+
+    def flush(self):
+        if self.disk is not None:
+            with self._lock:
+                self.disk.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["disk_rows"] = len(self.disk.rows) if self.disk is not None else 0
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        counts["hit_ratio"] = (counts["memory_hits"] + counts["disk_hits"]) / lookups if lookups else 0.0
+        counts["memory_size"] = len(self.memory)
+        counts["model"] = self.model_name
+        return counts
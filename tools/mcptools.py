@@ -1,10 +1,12 @@
-import bcrypt
 from pydantic import BaseModel, Field
 from langchain_core.tools import StructuredTool
+from langchain_core.runnables import RunnableConfig
 from typing import List
 from datetime import datetime
 
-from user_context import UserDataContext
+import transaction_store
+from tools.bcryptpool import BcryptPoolBusy, get_bcrypt_pool
+from user_context import UserDataContext, AsyncUserDataContext
 
 
 class ChangePINInput(BaseModel):
@@ -29,141 +31,257 @@ class ListTransactionsDateRangeInput(BaseModel):
     cardNumber: str = Field(..., description="The card number associated with the transactions.")
     start_date: str = Field(..., description="Start date in DDMMYYYY format.")
     end_date: str = Field(..., description="End date in DDMMYYYY format.")
+    cursor: str | None = Field(None, description="Cursor returned by a previous call, to fetch the next page.")
+
+
+
+def _user_ctx(config: RunnableConfig) -> UserDataContext | AsyncUserDataContext | None:
+    """Resolve the current user's data context from the run config."""
+    return (config or {}).get("configurable", {}).get("user_ctx")
+
+
+def _format_transactions(txns: List[dict]) -> str:
+    lines = []
+    for t in txns:
+        # Normalized documents carry a datetime and a Decimal128; legacy embedded ones carry strings.
+        if "timestamp" in t:
+            date, time = t["timestamp"].strftime("%d%m%Y"), t["timestamp"].strftime("%H%M%S")
+            amount = f"{t['amount'].to_decimal():.2f}" if "amount" in t else "N/A"
+        else:
+            date, time = t.get("date", "N/A"), t.get("time", "")
+            amount = t.get("transactionAmount", "N/A")
+        lines.append(
+            f"{date} {time} | "
+            f"{amount} {t.get('transactionCurrency', t.get('currency', ''))} | "
+            f"{t.get('terminalLocation', 'N/A')} | {t.get('responseCodeDescription', '')}"
+        )
+    return "\n".join(lines)
+
+
+def _format_cards(cards: List[dict]) -> str:
+    details = ""
+    for idx, card in enumerate(cards, start=1):
+        masked = (
+            "**** **** **** " + card["cardNumber"][-4:]
+            if len(card.get("cardNumber", "")) >= 4
+            else "N/A"
+        )
+        details += f"--- Card {idx} ---\n"
+        details += f"Card Number: {masked}\n"
+        details += f"Expiry Date: {card.get('expiryDate', 'N/A')}\n"
+        details += f"Status: {card.get('status', 'N/A')}\n"
+        details += f"Type: {card.get('type', 'N/A')}\n"
+        details += f"Currency: {card.get('currency', 'N/A')}\n"
+        details += f"Available Balance: {card.get('availableBalance', 'N/A')}\n"
+        details += f"Current Balance: {card.get('currentBalance', 'N/A')}\n\n"
+    return details.strip()
+
+
+def _date_range_result(txns: List[dict], next_cursor: str | None, start_date: str, end_date: str) -> str:
+    if not txns:
+        return f"No transactions between {start_date} and {end_date}."
+
+    result = _format_transactions(txns)
+    if next_cursor:
+        result += f"\nMore transactions available; call again with cursor={next_cursor}"
+    return result
+
+
+# Each tool has a sync implementation (UserDataContext, used by invoke) and an
+# async one (AsyncUserDataContext, used by ainvoke on the API path).
+
+def change_pin(cardNumber: str, old_pin: str, new_pin: str, config: RunnableConfig = None) -> str:
+    user_ctx = _user_ctx(config)
+    if user_ctx is None:
+        return "No user context available."
+
+    cards = user_ctx.get_cards()
+    if not cards:
+        return "No cards found for this user."
+
+    card = user_ctx.get_card(cardNumber)
+    if not card:
+        return "No matching card found for this user."
+
+    pin_hash = card.get("pinHash")
+    if not pin_hash:
+        return "This card has no PIN set."
+
+    pool = get_bcrypt_pool()
+    try:
+        if not pool.check_pin(old_pin, pin_hash):
+            return "The old PIN is incorrect."
+        new_hash = pool.hash_pin(new_pin)
+    except BcryptPoolBusy:
+        return "The PIN service is busy, please try again in a moment."
 
+    modified = user_ctx.update_pin(cardNumber, new_hash)
+    if modified:
+        return "PIN changed successfully."
+    return "PIN update failed."
 
 
-def build_banking_tools(user_ctx: UserDataContext) -> List[StructuredTool]:
+async def achange_pin(cardNumber: str, old_pin: str, new_pin: str, config: RunnableConfig = None) -> str:
+    user_ctx = _user_ctx(config)
+    if user_ctx is None:
+        return "No user context available."
 
-    def change_pin(cardNumber: str, old_pin: str, new_pin: str) -> str:
-        cards = user_ctx.get_cards()
-        if not cards:
-            return "No cards found for this user."
+    cards = await user_ctx.get_cards()
+    if not cards:
+        return "No cards found for this user."
 
-        card = user_ctx.get_card(cardNumber)
-        if not card:
-            return "No matching card found for this user."
+    card = await user_ctx.get_card(cardNumber)
+    if not card:
+        return "No matching card found for this user."
 
-        pin_hash = card.get("pinHash")
-        if not pin_hash:
-            return "This card has no PIN set."
+    pin_hash = card.get("pinHash")
+    if not pin_hash:
+        return "This card has no PIN set."
 
-        if not bcrypt.checkpw(old_pin.encode(), pin_hash.encode()):
+    # bcrypt is CPU bound; it runs on the bounded bcrypt pool, off the event loop.
+    pool = get_bcrypt_pool()
+    try:
+        if not await pool.acheck_pin(old_pin, pin_hash):
             return "The old PIN is incorrect."
+        new_hash = await pool.ahash_pin(new_pin)
+    except BcryptPoolBusy:
+        return "The PIN service is busy, please try again in a moment."
+
+    modified = await user_ctx.update_pin(cardNumber, new_hash)
+    if modified:
+        return "PIN changed successfully."
+    return "PIN update failed."
+
+
+def view_card_details(config: RunnableConfig = None) -> str:
+    user_ctx = _user_ctx(config)
+    if user_ctx is None:
+        return "No user context available."
+
+    cards = user_ctx.get_cards()
+    if not cards:
+        return "No cards found for this user."
+    return _format_cards(cards)
+
+
+async def aview_card_details(config: RunnableConfig = None) -> str:
+    user_ctx = _user_ctx(config)
+    if user_ctx is None:
+        return "No user context available."
+
+    cards = await user_ctx.get_cards()
+    if not cards:
+        return "No cards found for this user."
+    return _format_cards(cards)
+
+
+def list_recent_transactions(cardNumber: str, count: int = 5, config: RunnableConfig = None) -> str:
+    user_ctx = _user_ctx(config)
+    if user_ctx is None:
+        return "No user context available."
+
+    txns = user_ctx.get_recent_transactions(cardNumber, count)
+    if not txns:
+        return "No transactions found."
+
+    return _format_transactions(txns)
 
-        new_hash = bcrypt.hashpw(new_pin.encode(), bcrypt.gensalt()).decode()
-        modified = user_ctx.update_pin(cardNumber, new_hash)
-        if modified:
-            return "PIN changed successfully."
-        return "PIN update failed."
 
-    change_pin_tool = StructuredTool.from_function(
+async def alist_recent_transactions(cardNumber: str, count: int = 5, config: RunnableConfig = None) -> str:
+    user_ctx = _user_ctx(config)
+    if user_ctx is None:
+        return "No user context available."
+
+    txns = await user_ctx.get_recent_transactions(cardNumber, count)
+    if not txns:
+        return "No transactions found."
+
+    return _format_transactions(txns)
+
+
+# --- List Transactions by Date Range ---
+def list_transactions_date_range(
+    cardNumber: str, start_date: str, end_date: str, cursor: str | None = None, config: RunnableConfig = None
+) -> str:
+    user_ctx = _user_ctx(config)
+    if user_ctx is None:
+        return "No user context available."
+
+    try:
+        start, end = transaction_store.day_range(start_date, end_date)
+        txns, next_cursor = user_ctx.get_transactions_range(cardNumber, start, end, cursor)
+    except ValueError as e:
+        return f"{e}. Dates must use the DDMMYYYY format."
+    return _date_range_result(txns, next_cursor, start_date, end_date)
+
+
+async def alist_transactions_date_range(
+    cardNumber: str, start_date: str, end_date: str, cursor: str | None = None, config: RunnableConfig = None
+) -> str:
+    user_ctx = _user_ctx(config)
+    if user_ctx is None:
+        return "No user context available."
+
+    try:
+        start, end = transaction_store.day_range(start_date, end_date)
+        txns, next_cursor = await user_ctx.get_transactions_range(cardNumber, start, end, cursor)
+    except ValueError as e:
+        return f"{e}. Dates must use the DDMMYYYY format."
+    return _date_range_result(txns, next_cursor, start_date, end_date)
+
+
+# Tools are stateless: the current user's UserDataContext is resolved at call
+# time from config["configurable"]["user_ctx"], so one set serves every request.
+BANKING_TOOLS: List[StructuredTool] = [
+    StructuredTool.from_function(
         func=change_pin,
+        coroutine=achange_pin,
         name="change_pin",
         description="Change the PIN for this user's specified card.",
         args_schema=ChangePINInput,
-    )
-
-    def view_card_details() -> str:
-        cards = user_ctx.get_cards()
-        if not cards:
-            return "No cards found for this user."
-
-        details = ""
-        for idx, card in enumerate(cards, start=1):
-            masked = (
-                "**** **** **** " + card["cardNumber"][-4:]
-                if len(card.get("cardNumber", "")) >= 4
-                else "N/A"
-            )
-            details += f"--- Card {idx} ---\n"
-            details += f"Card Number: {masked}\n"
-            details += f"Expiry Date: {card.get('expiryDate', 'N/A')}\n"
-            details += f"Status: {card.get('status', 'N/A')}\n"
-            details += f"Type: {card.get('type', 'N/A')}\n"
-            details += f"Currency: {card.get('currency', 'N/A')}\n"
-            details += f"Available Balance: {card.get('availableBalance', 'N/A')}\n"
-            details += f"Current Balance: {card.get('currentBalance', 'N/A')}\n\n"
-        return details.strip()
-
-    view_card_details_tool = StructuredTool.from_function(
+    ),
+    StructuredTool.from_function(
         func=view_card_details,
+        coroutine=aview_card_details,
         name="view_card_details",
         description="View all card details for this user.",
         args_schema=ViewCardDetailsInput,
-    )
-
-    def list_recent_transactions(cardNumber: str, count: int = 5) -> str:
-        txns = user_ctx.get_transactions(cardNumber)
-        if not txns:
-            return "No transactions found."
-
-        recent = txns[:count]
-        lines = []
-        for t in recent:
-            lines.append(
-                f"{t.get('date', 'N/A')} {t.get('time', '')} | "
-                f"{t.get('transactionAmount', 'N/A')} {t.get('transactionCurrency', '')} | "
-                f"{t.get('terminalLocation', 'N/A')} | {t.get('responseCodeDescription', '')}"
-            )
-        return "\n".join(lines)
-
-    list_recent_transactions_tool = StructuredTool.from_function(
+    ),
+    StructuredTool.from_function(
         func=list_recent_transactions,
+        coroutine=alist_recent_transactions,
         name="list_recent_transactions",
         description="List the most recent transactions for a given card.",
         args_schema=ListRecentTransactionsInput,
-    )
-
-    # --- List Transactions by Date Range ---
-    def list_transactions_date_range(cardNumber: str, start_date: str, end_date: str) -> str:
-        txns = user_ctx.get_transactions(cardNumber)
-        if not txns:
-            return "No transactions available for this card."
-
-        filtered = [t for t in txns if start_date <= t.get("date", "") <= end_date]
-        if not filtered:
-            return f"No transactions between {start_date} and {end_date}."
-
-        lines = []
-        for t in filtered:
-            lines.append(
-                f"{t.get('date', 'N/A')} {t.get('time', '')} | "
-                f"{t.get('transactionAmount', 'N/A')} {t.get('transactionCurrency', '')} | "
-                f"{t.get('terminalLocation', 'N/A')} | {t.get('responseCodeDescription', '')}"
-            )
-        return "\n".join(lines)
-
-    list_transactions_date_range_tool = StructuredTool.from_function(
+    ),
+    StructuredTool.from_function(
         func=list_transactions_date_range,
+        coroutine=alist_transactions_date_range,
         name="list_transactions_date_range",
         description="List all transactions for a given card in a specific date range.",
         args_schema=ListTransactionsDateRangeInput,
-    )
+    ),
+]
+
 
-    return [
-        change_pin_tool,
-        view_card_details_tool,
-        list_recent_transactions_tool,
-        list_transactions_date_range_tool,
-    ]
+def build_banking_tools() -> List[StructuredTool]:
+    """Return the shared banking tools."""
+    return BANKING_TOOLS
 
 
 # --- Manual test ---
 if __name__ == "__main__":
-    from pymongo import MongoClient
-    from dotenv import load_dotenv
-    import os
+    from database import get_db
 
-    load_dotenv()
-    client = MongoClient(os.getenv("MONGO_URI"))
-    db = client["fransa_demo"]
+    db = get_db()
 
     from user_context import UserDataContext
 
     ctx = UserDataContext("1001", db["cards"], db["transactions"])
-    tools = build_banking_tools(ctx)
+    config = {"configurable": {"user_ctx": ctx}}
+    tools = build_banking_tools()
 
-    print(tools[0].invoke({"cardNumber": "5007673290469960", "old_pin": "0000", "new_pin": "1234"}))
-    print(tools[1].invoke({}))  # view_card_details
-    print(tools[2].invoke({"cardNumber": "5007673290469960", "count": 3}))
-    print(tools[3].invoke({"cardNumber": "5007673290469960", "start_date": "23102025", "end_date": "24102025"}))
+    print(tools[0].invoke({"cardNumber": "5007673290469960", "old_pin": "0000", "new_pin": "1234"}, config))
+    print(tools[1].invoke({}, config))  # view_card_details
+    print(tools[2].invoke({"cardNumber": "5007673290469960", "count": 3}, config))
+    print(tools[3].invoke({"cardNumber": "5007673290469960", "start_date": "23102025", "end_date": "24102025"}, config))
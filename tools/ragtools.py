@@ -1,21 +1,145 @@
 from pydantic import BaseModel, Field
 from langchain_core.tools import StructuredTool
-from sentence_transformers import SentenceTransformer
-from pymilvus import connections, Collection
 from typing import List, Dict, Any
+from dotenv import load_dotenv
 import numpy as np
+import threading
+import logging
 import os
+import metrics
+from tools.embeddingcache import EmbeddingCache
+from tools.embeddingbatcher import EmbeddingBatcher
+from tools.vectorstore import get_vector_store, vector_backend
+
+load_dotenv()
+logger = logging.getLogger(__name__)
 
 MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
 MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
-connections.connect(
-    "default",
-    host=MILVUS_HOST,
-    port=MILVUS_PORT,
-    db_name="Banks_DB"
-)
-
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+MILVUS_DB = os.getenv("MILVUS_DB", "Banks_DB")
+
+# The embedder and the Milvus connection are created on first use, so importing
+# this module stays cheap and works without sentence-transformers or Milvus.
+_embedder_lock = threading.Lock()
+_milvus_lock = threading.Lock()
+_embedder = None
+_embedding_cache: EmbeddingCache | None = None
+_embedding_batcher: EmbeddingBatcher | None = None
+_milvus_connected = False
+
+
+def _create_embedder():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+
+
+def _connect():
+    from pymilvus import connections
+    connections.connect("default", host=MILVUS_HOST, port=MILVUS_PORT, db_name=MILVUS_DB)
+
+
+def get_embedder():
+    """
+    Return the process-wide sentence embedder, loading it on first use.
+    Returns:
+        SentenceTransformer: The shared model (EMBEDDING_MODEL).
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                logger.debug("Loading sentence embedder")
+                _embedder = _create_embedder()
+    return _embedder
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Return the process-wide query embedding cache for EMBEDDING_MODEL.
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedder_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+                metrics.register("embedding_cache", _embedding_cache.stats)
+    return _embedding_cache
+
+
+def close_embedding_cache():
+    """
+    Flush the embedding cache's disk store (compacting its index) and drop the cache.
+    """
+    global _embedding_cache
+    with _embedder_lock:
+        cache, _embedding_cache = _embedding_cache, None
+    if cache is not None:
+        cache.flush()
+        metrics.unregister("embedding_cache")
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    return get_embedder().encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """
+    Return the process-wide batcher that encodes concurrent queries together.
+    """
+    global _embedding_batcher
+    if _embedding_batcher is None:
+        with _embedder_lock:
+            if _embedding_batcher is None:
+                _embedding_batcher = EmbeddingBatcher(_encode_batch)
+                metrics.register("embedding_batching", _embedding_batcher.stats)
+    return _embedding_batcher
+
+
+def close_embedding_batcher():
+    """
+    Finish the queued embedding requests and stop the batcher's worker thread.
+    """
+    global _embedding_batcher
+    with _embedder_lock:
+        batcher, _embedding_batcher = _embedding_batcher, None
+    if batcher is not None:
+        batcher.close()
+        metrics.unregister("embedding_batching")
+
+
+def embed_query(query: str) -> np.ndarray:
+    """
+    Embed a query, served from the embedding cache when it was seen before
+    and otherwise encoded in a batch with concurrent queries.
+    Returns:
+        np.ndarray: A read-only float32 vector.
+    """
+    return get_embedding_cache().get_or_compute(query, get_embedding_batcher().embed)
+
+
+def connect_milvus():
+    """
+    Open the default Milvus connection once; later calls are no-ops.
+    """
+    global _milvus_connected
+    if not _milvus_connected:
+        with _milvus_lock:
+            if not _milvus_connected:
+                logger.debug(f"Connecting to Milvus at {MILVUS_HOST}:{MILVUS_PORT}")
+                _connect()
+                _milvus_connected = True
+
+
+def warmup(milvus: bool = True):
+    """
+    Load the embedder (running one encode) and optionally connect to Milvus,
+    so the first RAG request does not pay for it.
+    Args:
+        milvus (bool): Also open the Milvus connection (when VECTOR_BACKEND is milvus).
+    """
+    get_embedder().encode(["warmup"])
+    if milvus and vector_backend() == "milvus":
+        connect_milvus()
 
 
 # --- Tool input schemas ---
@@ -32,31 +156,16 @@ class SimilaritySearchInput(BaseModel):
 # --- Define actual tool functions ---
 def embedding_query_tool(query: str) -> List[float]:
     """Embed the input text using a transformer model."""
-    print(f"[DEBUG] Embedding query: {query[:60]}")
-    emb = embedder.encode(query).tolist()
+    logger.debug(f"Embedding query: {query[:60]}")
+    emb = embed_query(query).tolist()
     return emb
 
 
 def similarity_tool(embedding: List[float], collection_name: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    """Query Milvus for top-k similar document chunks."""
-    print(f"[DEBUG] Searching Milvus collection: {collection_name}")
-    collection = Collection(collection_name)
-    search_params = {"metric_type": "L2", "params": {"nprobe": 8}}
-    results = collection.search(
-        data=[embedding],
-        anns_field="embedding",
-        param=search_params,
-        limit=top_k,
-        output_fields=["text", "source"],
-    )
-    hits = []
-    for r in results[0]:
-        hits.append({
-            "text": r.entity.get("text", ""),
-            "source": r.entity.get("source", ""),
-            "score": r.distance,
-        })
-    print(f"[DEBUG] Retrieved {len(hits)} results")
+    """Query the vector store (Milvus or the local NumPy index) for top-k similar document chunks."""
+    logger.debug(f"Searching vector collection: {collection_name}")
+    hits = get_vector_store().search(collection_name, np.asarray(embedding, dtype=np.float32), top_k)[0]
+    logger.debug(f"Retrieved {len(hits)} results")
     return hits
 
 
@@ -71,7 +180,7 @@ embedding_query_structured_tool = StructuredTool.from_function(
 similarity_structured_tool = StructuredTool.from_function(
     func=similarity_tool,
     name="similarity_tool",
-    description="Compute similarity between a query embedding and Milvus document vectors.",
+    description="Compute similarity between a query embedding and the bank's document vectors.",
     args_schema=SimilaritySearchInput,
 )
 
@@ -0,0 +1,284 @@
+import os
+import json
+import shutil
+import logging
+import threading
+from typing import Any, Dict, List, Sequence
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_PARAMS: Dict[str, Any] = {"metric_type": "L2", "params": {"nprobe": 8}}
+
+Hit = Dict[str, Any]
+
+
+def search_params(collection_name: str) -> Dict[str, Any]:
+    """
+    Search parameters for a collection: VECTOR_SEARCH_PARAMS is a JSON object
+    mapping collection names (or "default") to Milvus-style parameters, e.g.
+    {"default": {"metric_type": "L2", "params": {"nprobe": 8}}, "BankA": {"params": {"nprobe": 32}}}.
+    Returns:
+        dict: The default parameters updated with the collection's overrides.
+    """
+    configured = json.loads(os.getenv("VECTOR_SEARCH_PARAMS", "{}") or "{}")
+    params = {**DEFAULT_SEARCH_PARAMS, **configured.get("default", {})}
+    override = configured.get(collection_name, {})
+    return {
+        **params,
+        **override,
+        "params": {**params.get("params", {}), **override.get("params", {})},
+    }
+
+
+def _as_matrix(vectors) -> np.ndarray:
+    return np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+
+
+class MilvusVectorStore:
+    """
+    Vector search on Milvus.
+    1. Connects lazily and keeps one loaded Collection handle per collection.
+    2. Searches with per-collection parameters (VECTOR_SEARCH_PARAMS).
+    """
+    def __init__(self):
+        self._collections: Dict[str, Any] = {}
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _name_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            return self._loading.setdefault(name, threading.Lock())
+
+    def collection(self, name: str):
+        """
+        Return the cached Collection handle, loading it into memory once.
+        Loads hold a per-collection lock, so a slow load does not block
+        searches on other collections.
+        """
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._name_lock(name):
+                collection = self._collections.get(name)
+                if collection is None:
+                    from pymilvus import Collection
+                    from tools.ragtools import connect_milvus
+                    connect_milvus()
+                    collection = Collection(name)
+                    collection.load()
+                    self._collections[name] = collection
+                    logger.debug(f"Loaded Milvus collection {name}")
+        return collection
+
+    def search(self, collection_name: str, vectors, top_k: int = 5) -> List[List[Hit]]:
+        """
+        Find the top_k nearest chunks for each query vector.
+        Args:
+            collection_name (str): The collection (bank) to search.
+            vectors (array-like): One vector or a (n, dim) matrix.
+            top_k (int): Hits per query.
+        Returns:
+            list[list[dict]]: Per query, hits with "text", "source" and "score" (distance).
+        """
+        results = self.collection(collection_name).search(
+            data=_as_matrix(vectors),
+            anns_field="embedding",
+            param=search_params(collection_name),
+            limit=top_k,
+            output_fields=["text", "source"],
+        )
+        return [
+            [{"text": r.entity.get("text", ""), "source": r.entity.get("source", ""), "score": r.distance} for r in hits]
+            for hits in results
+        ]
+
+    def invalidate(self, name: str | None = None):
+        with self._lock:
+            if name is None:
+                self._collections.clear()
+            else:
+                self._collections.pop(name, None)
+
+
+class _NumpyIndex:
+    """One collection on disk: vectors.f32 (memmap), docs.jsonl, meta.json and optional IVF lists."""
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        count, dim = self.meta["count"], self.meta["dim"]
+        self.vectors = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim)) \
+            if count else np.zeros((0, dim), dtype=np.float32)
+        self.norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        with open(os.path.join(path, "docs.jsonl"), encoding="utf-8") as f:
+            self.docs = [json.loads(line) for line in f]
+        self.centroids = None
+        if os.path.exists(os.path.join(path, "centroids.npy")):
+            self.centroids = np.load(os.path.join(path, "centroids.npy"))
+            assignments = np.load(os.path.join(path, "assignments.npy"))
+            self.order = np.argsort(assignments, kind="stable")
+            self.offsets = np.searchsorted(assignments[self.order], np.arange(len(self.centroids) + 1))
+
+    def _distances(self, query: np.ndarray, rows: np.ndarray | None) -> np.ndarray:
+        if rows is None:
+            return self.norms - 2 * (self.vectors @ query) + query @ query
+        return self.norms[rows] - 2 * (self.vectors[rows] @ query) + query @ query
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray | None:
+        # nprobe <= 0 (or >= nlist) means an exact search over every row.
+        if self.centroids is None or nprobe <= 0 or nprobe >= len(self.centroids):
+            return None
+        distances = ((self.centroids - query) ** 2).sum(axis=1)
+        lists = np.argpartition(distances, nprobe - 1)[:nprobe]
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+
+    def search(self, query: np.ndarray, top_k: int, nprobe: int) -> List[Hit]:
+        if self.meta["count"] == 0:
+            return []
+        rows = self._candidates(query, nprobe)
+        distances = self._distances(query, rows)
+        k = min(top_k, len(distances))
+        if k == 0:
+            return []
+        best = np.argpartition(distances, k - 1)[:k]
+        best = best[np.argsort(distances[best])]
+        ids = best if rows is None else rows[best]
+        return [
+            {"text": self.docs[i].get("text", ""), "source": self.docs[i].get("source", ""), "score": float(max(distances[b], 0.0))}
+            for i, b in zip(ids, best)
+        ]
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    for _ in range(iterations):
+        distances = norms[:, None] - 2 * vectors @ centroids.T + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+        assignments = distances.argmin(axis=1)
+        for c in range(k):
+            members = vectors[assignments == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return centroids, assignments
+
+
+class NumpyVectorStore:
+    """
+    In-process vector search over memory-mapped float32 matrices, one
+    directory per collection under VECTOR_STORE_DIR; no server needed.
+    1. Searches exactly (squared L2, like Milvus' L2 metric), or through an
+       IVF index when the collection was built with nlist > 0: k-means
+       centroids partition the rows and a search scans only the nprobe
+       nearest lists.
+    2. Loads each collection once and keeps it mapped.
+    3. Uses the same per-collection parameters as Milvus (params.nprobe);
+       an nprobe of 0 or less searches exactly.
+    Configuration: VECTOR_STORE_DIR, VECTOR_SEARCH_PARAMS.
+    """
+    def __init__(self, directory: str | None = None):
+        self.directory = directory or os.getenv("VECTOR_STORE_DIR", ".cache/vectors")
+        self._indexes: Dict[str, _NumpyIndex] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self._path(name), "meta.json"))
+
+    def collection(self, name: str) -> _NumpyIndex:
+        index = self._indexes.get(name)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    if not self.exists(name):
+                        raise KeyError(f"Unknown vector collection '{name}'")
+                    index = self._indexes[name] = _NumpyIndex(self._path(name))
+        return index
+
+    def search(self, collection_name: str, vectors, top_k: int = 5) -> List[List[Hit]]:
+        """
+        Same contract as MilvusVectorStore.search.
+        """
+        index = self.collection(collection_name)
+        nprobe = int(search_params(collection_name).get("params", {}).get("nprobe", 8))
+        return [index.search(query, top_k, nprobe) for query in _as_matrix(vectors)]
+
+    def build(
+        self,
+        name: str,
+        vectors,
+        docs: Sequence[Dict[str, Any]],
+        nlist: int = 0,
+    ):
+        """
+        Write a collection, replacing any previous version atomically.
+        Args:
+            name (str): Collection name.
+            vectors (array-like): (n, dim) embeddings.
+            docs (Sequence[dict]): Per-row fields returned with hits (text, source, ...).
+            nlist (int): Number of IVF lists; 0 builds an exact-search collection.
+        """
+        vectors = _as_matrix(vectors)
+        if len(vectors) != len(docs):
+            raise ValueError("vectors and docs must have the same length")
+        final = self._path(name)
+        tmp = f"{final}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        vectors.tofile(os.path.join(tmp, "vectors.f32"))
+        with open(os.path.join(tmp, "docs.jsonl"), "w", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(json.dumps(doc) + "\n")
+        nlist = min(nlist, len(vectors))
+        if nlist > 0:
+            centroids, assignments = _kmeans(vectors, nlist)
+            np.save(os.path.join(tmp, "centroids.npy"), centroids.astype(np.float32))
+            np.save(os.path.join(tmp, "assignments.npy"), assignments.astype(np.int32))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"count": len(vectors), "dim": vectors.shape[1], "metric": "L2", "nlist": nlist}, f)
+
+        with self._lock:
+            self._indexes.pop(name, None)
+            old = f"{final}.old"
+            shutil.rmtree(old, ignore_errors=True)
+            if os.path.exists(final):
+                os.replace(final, old)
+            os.replace(tmp, final)
+            shutil.rmtree(old, ignore_errors=True)
+
+    def invalidate(self, name: str | None = None):
+        with self._lock:
+            if name is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(name, None)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def vector_backend() -> str:
+    backend = os.getenv("VECTOR_BACKEND", "milvus").lower()
+    if backend not in ("milvus", "numpy"):
+        raise ValueError(f"VECTOR_BACKEND must be 'milvus' or 'numpy', not '{backend}'")
+    return backend
+
+
+def get_vector_store():
+    """
+    Return the process-wide vector store selected by VECTOR_BACKEND.
+    Returns:
+        MilvusVectorStore | NumpyVectorStore: The shared store.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = NumpyVectorStore() if vector_backend() == "numpy" else MilvusVectorStore()
+    return _store
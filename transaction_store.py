@@ -0,0 +1,292 @@
+"""
+Normalized transaction documents.
+
+Transactions live in their own `transactions` collection, one document per
+transaction, instead of an array embedded in the card document:
+    {_id, clientId, cardNumber, timestamp: datetime, amount: Decimal128, currency, ...}
+The compound index (clientId, cardNumber, timestamp, _id) serves recent-N
+reads and date-range scans, and doubles as the keyset for cursor pagination.
+
+While MigrateTransactions.py moves existing cards over, TRANSACTIONS_READ_MODE
+selects where reads go:
+    collection  only the transactions collection
+    dual        the collection, falling back to the embedded array when it has
+                nothing and the card has not been migrated yet
+    embedded    only the arrays embedded in card documents
+Configuration: TRANSACTIONS_PAGE_SIZE, TRANSACTIONS_READ_MODE.
+"""
+import os
+import hashlib
+import logging
+import threading
+import metrics
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+from bson.decimal128 import Decimal128
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "client_card_timestamp"
+# Set on a card once its embedded transactions are in the collection: the
+# length of the embedded array that was copied.
+MIGRATED_FIELD = "migratedTransactions"
+INDEX_KEYS = [("clientId", ASCENDING), ("cardNumber", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+# Fields copied as-is from the legacy embedded transaction.
+_COPIED_FIELDS = (
+    "terminalLocation", "transactionStatus", "stanNumber", "terminalId",
+    "responseCode", "responseCodeDescription", "transactionType",
+    "transactionTypeDescription", "referenceNumber",
+)
+
+
+READ_MODES = ("collection", "dual", "embedded")
+
+_lock = threading.Lock()
+_reads = {"collection": 0, "embedded": 0, "embedded_fallbacks": 0, "invalid_embedded": 0}
+
+
+def page_size() -> int:
+    return int(os.getenv("TRANSACTIONS_PAGE_SIZE", "20"))
+
+
+def read_mode() -> str:
+    mode = os.getenv("TRANSACTIONS_READ_MODE", "dual")
+    if mode not in READ_MODES:
+        raise ValueError(f"TRANSACTIONS_READ_MODE must be one of {READ_MODES}, got {mode!r}")
+    return mode
+
+
+def count_read(source: str, fallback: bool = False):
+    with _lock:
+        _reads[source] += 1
+        if fallback:
+            _reads["embedded_fallbacks"] += 1
+
+
+def read_stats() -> Dict[str, Any]:
+    with _lock:
+        counts = dict(_reads)
+    counts["mode"] = os.getenv("TRANSACTIONS_READ_MODE", "dual")
+    return counts
+
+
+metrics.register("transactions_reads", read_stats)
+
+
+def parse_ddmmyyyy(value: str, hhmmss: str | None = None) -> datetime:
+    """
+    Parse a DDMMYYYY date, optionally with an HHMMSS time.
+    Args:
+        value (str): The date, e.g. "23102025".
+        hhmmss (str | None): The time of day, e.g. "142501".
+    Returns:
+        datetime: The naive UTC timestamp.
+    Raises:
+        ValueError: If the date or time is malformed.
+    """
+    if hhmmss:
+        return datetime.strptime(f"{value}{hhmmss}", "%d%m%Y%H%M%S")
+    return datetime.strptime(value, "%d%m%Y")
+
+
+def parse_amount(value: Any) -> Decimal128:
+    try:
+        return Decimal128(Decimal(str(value)).quantize(Decimal("0.01")))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid transaction amount: {value!r}")
+
+
+def transaction_id(client_id: str, card_number: str, txn: Dict[str, Any]) -> str:
+    """
+    Deterministic _id of a legacy transaction, so re-imports upsert instead of duplicating.
+    """
+    parts = [client_id, card_number] + [
+        str(txn.get(k, "")) for k in ("date", "time", "stanNumber", "referenceNumber", "transactionAmount")
+    ]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def normalize_transaction(client_id: str, card_number: str, txn: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a transaction embedded in a card document into a `transactions` document.
+    Args:
+        client_id (str): Owner of the card.
+        card_number (str): The card the transaction belongs to.
+        txn (dict): The legacy transaction with DDMMYYYY date and string amount.
+    Returns:
+        dict: The normalized document.
+    Raises:
+        ValueError: If the date or amount cannot be parsed.
+    """
+    doc = {
+        "_id": transaction_id(client_id, card_number, txn),
+        "clientId": client_id,
+        "cardNumber": card_number,
+        "timestamp": parse_ddmmyyyy(txn["date"], txn.get("time") or None),
+        "amount": parse_amount(txn.get("transactionAmount")),
+        "currency": txn.get("transactionCurrency") or txn.get("currency"),
+    }
+    for field in _COPIED_FIELDS:
+        if field in txn:
+            doc[field] = txn[field]
+    return doc
+
+
+def normalize_embedded(client_id: str, card_number: str, txns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Normalize embedded transactions read during the dual-read period, skipping malformed ones.
+    """
+    docs = []
+    for txn in txns:
+        try:
+            docs.append(normalize_transaction(client_id, card_number, txn))
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Skipping malformed embedded transaction on card ...{card_number[-4:]}: {e}")
+            with _lock:
+                _reads["invalid_embedded"] += 1
+    return docs
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    millis = int(doc["timestamp"].replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return f"{millis}_{doc['_id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        millis, _id = cursor.split("_", 1)
+        return datetime.fromtimestamp(int(millis) / 1000, timezone.utc).replace(tzinfo=None), _id
+    except ValueError:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}")
+
+
+def recent_query(client_id: str, card_number: str) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """
+    Filter and sort for the newest transactions of a card.
+    Returns:
+        tuple[dict, list]: The find filter and sort spec.
+    """
+    return (
+        {"clientId": client_id, "cardNumber": card_number},
+        [("timestamp", DESCENDING), ("_id", DESCENDING)],
+    )
+
+
+def range_query(
+    client_id: str,
+    card_number: str,
+    start: datetime,
+    end: datetime,
+    cursor: str | None = None,
+) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """
+    Filter and sort for a chronological page of transactions in [start, end).
+    The cursor is the position of the last document of the previous page.
+    Returns:
+        tuple[dict, list]: The find filter and sort spec.
+    """
+    query: Dict[str, Any] = {
+        "clientId": client_id,
+        "cardNumber": card_number,
+        "timestamp": {"$gte": start, "$lt": end},
+    }
+    if cursor:
+        after_ts, after_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"timestamp": {"$gt": after_ts}},
+            {"timestamp": after_ts, "_id": {"$gt": after_id}},
+        ]
+    return query, [("timestamp", ASCENDING), ("_id", ASCENDING)]
+
+
+def day_range(start_date: str, end_date: str) -> Tuple[datetime, datetime]:
+    """
+    Convert inclusive DDMMYYYY dates into a half-open datetime range.
+    Raises:
+        ValueError: If a date is malformed.
+    """
+    return parse_ddmmyyyy(start_date), parse_ddmmyyyy(end_date) + timedelta(days=1)
+
+
+def embedded_filter(client_id: str, card_number: str, unmigrated_only: bool = False) -> Dict[str, Any]:
+    """
+    Card filter for legacy embedded reads. In dual mode only cards the
+    migration has not reached yet are read, so a migrated card with no
+    matching transactions does not fall back to its stale array.
+    """
+    query: Dict[str, Any] = {"clientId": client_id, "cardNumber": card_number}
+    if unmigrated_only:
+        query[MIGRATED_FIELD] = {"$exists": False}
+    return query
+
+
+def _embedded_sort_key(field: str) -> Dict[str, Any]:
+    # DDMMYYYY + HHMMSS -> YYYYMMDDHHMMSS, which sorts chronologically.
+    return {"$concat": [
+        {"$substrCP": [f"${field}.date", 4, 4]},
+        {"$substrCP": [f"${field}.date", 2, 2]},
+        {"$substrCP": [f"${field}.date", 0, 2]},
+        {"$ifNull": [f"${field}.time", ""]},
+    ]}
+
+
+def embedded_recent_pipeline(
+    client_id: str, card_number: str, count: int, unmigrated_only: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Legacy read: the newest `count` embedded transactions, sorted server-side
+    by date and time like recent_query, so only those are returned.
+    """
+    return [
+        {"$match": embedded_filter(client_id, card_number, unmigrated_only)},
+        {"$limit": 1},
+        {"$unwind": "$transactions"},
+        {"$addFields": {"_sortKey": _embedded_sort_key("transactions")}},
+        {"$sort": {"_sortKey": DESCENDING}},
+        {"$limit": count},
+        {"$group": {"_id": None, "transactions": {"$push": "$transactions"}}},
+        {"$project": {"_id": 0, "transactions": 1}},
+    ]
+
+
+def newest_first(docs: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """
+    Order normalized documents like recent_query (timestamp, then _id, descending).
+    """
+    return sorted(docs, key=lambda d: (d["timestamp"], d["_id"]), reverse=True)[:count]
+
+
+def filter_range(
+    docs: List[Dict[str, Any]],
+    start: datetime,
+    end: datetime,
+    cursor: str | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Apply range_query to normalized documents in memory (legacy embedded reads).
+    """
+    after = decode_cursor(cursor) if cursor else None
+    docs = sorted(
+        (d for d in docs if start <= d["timestamp"] < end),
+        key=lambda d: (d["timestamp"], d["_id"]),
+    )
+    if after:
+        docs = [d for d in docs if (d["timestamp"], d["_id"]) > after]
+    return docs
+
+
+def page(docs: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], str | None]:
+    """
+    Split a limit+1 fetch into the page and the cursor of the next page.
+    """
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1])
+    return docs, None
+
+
+def ensure_indexes(collection):
+    collection.create_index(INDEX_KEYS, name=INDEX_NAME)
@@ -1,29 +1,255 @@
 # user_context.py
-from dataclasses import dataclass
-from typing import Any, Dict, List
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
 from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
+import metrics
+import transaction_store
+
+# Card fields the tools display; embedded transactions and PII stay in MongoDB.
+CARD_FIELDS = {
+    "_id": 0, "cardNumber": 1, "expiryDate": 1, "status": 1, "type": 1,
+    "currency": 1, "availableBalance": 1, "currentBalance": 1,
+}
+# Embedded transaction fields the tools display, plus those that make up its _id.
+TRANSACTION_FIELDS = (
+    "date", "time", "transactionAmount", "transactionCurrency", "currency",
+    "terminalLocation", "responseCodeDescription", "stanNumber", "referenceNumber",
+)
+_TRANSACTIONS_PROJECTION = {"_id": 0, **{f"transactions.{f}": 1 for f in TRANSACTION_FIELDS}}
+# Only get_card (used by change_pin) reads the pinHash; card listings stay on CARD_FIELDS.
+_PIN_CARD_PROJECTION = {**CARD_FIELDS, "pinHash": 1}
+
+_lock = threading.Lock()
+_cache_counts = {"card_reads": 0, "avoided_round_trips": 0, "invalidations": 0}
+
+
+def _count(name: str):
+    with _lock:
+        _cache_counts[name] += 1
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _lock:
+        counts = dict(_cache_counts)
+    lookups = counts["card_reads"] + counts["avoided_round_trips"]
+    counts["hit_ratio"] = counts["avoided_round_trips"] / lookups if lookups else 0.0
+    return counts
+
+
+metrics.register("user_context_cache", cache_stats)
+
+
+def _card_filter(client_id: str, card_number: str) -> Dict[str, Any]:
+    return {"clientId": client_id, "cardNumber": card_number}
+
+
+class _CardCache:
+    """
+    Read-through memo of card documents, shared by both contexts. A context
+    lives for one turn, so the memo never outlives the request that filled it.
+    """
+    _cards: List[Dict[str, Any]] | None
+    _cards_by_number: Dict[str, Dict[str, Any] | None]
+
+    def _cached_cards(self) -> List[Dict[str, Any]] | None:
+        if self._cards is not None:
+            _count("avoided_round_trips")
+        return self._cards
+
+    def _cached_card(self, card_number: str) -> Tuple[bool, Dict[str, Any] | None]:
+        # Not served from _cards: those are read without the pinHash.
+        if card_number in self._cards_by_number:
+            _count("avoided_round_trips")
+            return True, self._cards_by_number[card_number]
+        return False, None
+
+    def _store_cards(self, cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        _count("card_reads")
+        self._cards = cards
+        return cards
+
+    def _store_card(self, card_number: str, card: Dict[str, Any] | None) -> Dict[str, Any] | None:
+        _count("card_reads")
+        self._cards_by_number[card_number] = card
+        return card
+
+    def invalidate_cards(self, card_number: str | None = None):
+        """Forget cached card reads after a write."""
+        _count("invalidations")
+        self._cards = None
+        if card_number is None:
+            self._cards_by_number.clear()
+        else:
+            self._cards_by_number.pop(card_number, None)
+
 
 @dataclass
-class UserDataContext:
+class UserDataContext(_CardCache):
+    """
+    Data access for one client during one turn. Card reads are memoized for
+    the lifetime of the context and invalidated by update_pin. Transactions
+    are read from the transactions collection; during the migration period
+    (TRANSACTIONS_READ_MODE=dual or embedded) the card's embedded array is
+    read and normalized instead; in dual mode only for cards the migration
+    has not reached yet.
+    """
     client_id: str
     cards_col: Collection
     transactions_col: Collection
+    _cards: List[Dict[str, Any]] | None = field(default=None, init=False, repr=False)
+    _cards_by_number: Dict[str, Dict[str, Any] | None] = field(default_factory=dict, init=False, repr=False)
 
     def get_cards(self) -> List[Dict[str, Any]]:
-        return list(self.cards_col.find({"clientId": self.client_id}))
+        cards = self._cached_cards()
+        if cards is not None:
+            return cards
+        return self._store_cards(list(self.cards_col.find({"clientId": self.client_id}, CARD_FIELDS)))
 
     def get_card(self, card_number: str) -> Dict[str, Any] | None:
-        return self.cards_col.find_one({"clientId": self.client_id, "cardNumber": card_number})
+        hit, card = self._cached_card(card_number)
+        if hit:
+            return card
+        card = self.cards_col.find_one(_card_filter(self.client_id, card_number), _PIN_CARD_PROJECTION)
+        return self._store_card(card_number, card)
 
     def update_pin(self, card_number: str, new_hash: str) -> int:
         res = self.cards_col.update_one(
             {"clientId": self.client_id, "cardNumber": card_number},
             {"$set": {"pinHash": new_hash}},
         )
+        self.invalidate_cards(card_number)
         return res.modified_count
 
-    def get_transactions(self, card_number: str) -> List[Dict[str, Any]]:
-        card = self.get_card(card_number)
+    def get_transactions(self, card_number: str, unmigrated_only: bool = False) -> List[Dict[str, Any]]:
+        query = transaction_store.embedded_filter(self.client_id, card_number, unmigrated_only)
+        card = self.cards_col.find_one(query, _TRANSACTIONS_PROJECTION)
         if not card:
             return []
         return card.get("transactions", [])
+
+    def get_recent_transactions(self, card_number: str, count: int) -> List[Dict[str, Any]]:
+        mode = transaction_store.read_mode()
+        if mode != "embedded":
+            query, sort = transaction_store.recent_query(self.client_id, card_number)
+            docs = list(self.transactions_col.find(query).sort(sort).limit(count))
+            if docs or mode == "collection":
+                transaction_store.count_read("collection")
+                return docs
+
+        pipeline = transaction_store.embedded_recent_pipeline(self.client_id, card_number, count, mode == "dual")
+        cards = list(self.cards_col.aggregate(pipeline))
+        if cards or mode == "embedded":
+            transaction_store.count_read("embedded", fallback=mode == "dual")
+        else:
+            transaction_store.count_read("collection")
+        txns = cards[0].get("transactions", []) if cards else []
+        docs = transaction_store.normalize_embedded(self.client_id, card_number, txns)
+        return transaction_store.newest_first(docs, count)
+
+    def get_transactions_range(
+        self, card_number: str, start: datetime, end: datetime,
+        cursor: str | None = None, limit: int | None = None,
+    ) -> Tuple[List[Dict[str, Any]], str | None]:
+        """
+        One chronological page of transactions in [start, end), read through the
+        (clientId, cardNumber, timestamp) index.
+        Returns:
+            tuple[list[dict], str | None]: The page and the cursor of the next page, if any.
+        """
+        limit = limit or transaction_store.page_size()
+        mode = transaction_store.read_mode()
+        if mode != "embedded":
+            query, sort = transaction_store.range_query(self.client_id, card_number, start, end, cursor)
+            docs = list(self.transactions_col.find(query).sort(sort).limit(limit + 1))
+            if docs or mode == "collection":
+                transaction_store.count_read("collection")
+                return transaction_store.page(docs, limit)
+
+        txns = self.get_transactions(card_number, unmigrated_only=mode == "dual")
+        if txns or mode == "embedded":
+            transaction_store.count_read("embedded", fallback=mode == "dual")
+        else:
+            transaction_store.count_read("collection")
+        docs = transaction_store.normalize_embedded(self.client_id, card_number, txns)
+        return transaction_store.page(transaction_store.filter_range(docs, start, end, cursor), limit)
+
+
+@dataclass
+class AsyncUserDataContext(_CardCache):
+    """Same API as UserDataContext over the shared async pool; every read is awaited."""
+    client_id: str
+    cards_col: AsyncCollection
+    transactions_col: AsyncCollection
+    _cards: List[Dict[str, Any]] | None = field(default=None, init=False, repr=False)
+    _cards_by_number: Dict[str, Dict[str, Any] | None] = field(default_factory=dict, init=False, repr=False)
+
+    async def get_cards(self) -> List[Dict[str, Any]]:
+        cards = self._cached_cards()
+        if cards is not None:
+            return cards
+        return self._store_cards(await self.cards_col.find({"clientId": self.client_id}, CARD_FIELDS).to_list())
+
+    async def get_card(self, card_number: str) -> Dict[str, Any] | None:
+        hit, card = self._cached_card(card_number)
+        if hit:
+            return card
+        card = await self.cards_col.find_one(_card_filter(self.client_id, card_number), _PIN_CARD_PROJECTION)
+        return self._store_card(card_number, card)
+
+    async def update_pin(self, card_number: str, new_hash: str) -> int:
+        res = await self.cards_col.update_one(
+            {"clientId": self.client_id, "cardNumber": card_number},
+            {"$set": {"pinHash": new_hash}},
+        )
+        self.invalidate_cards(card_number)
+        return res.modified_count
+
+    async def get_transactions(self, card_number: str, unmigrated_only: bool = False) -> List[Dict[str, Any]]:
+        query = transaction_store.embedded_filter(self.client_id, card_number, unmigrated_only)
+        card = await self.cards_col.find_one(query, _TRANSACTIONS_PROJECTION)
+        if not card:
+            return []
+        return card.get("transactions", [])
+
+    async def get_recent_transactions(self, card_number: str, count: int) -> List[Dict[str, Any]]:
+        mode = transaction_store.read_mode()
+        if mode != "embedded":
+            query, sort = transaction_store.recent_query(self.client_id, card_number)
+            docs = await self.transactions_col.find(query).sort(sort).limit(count).to_list()
+            if docs or mode == "collection":
+                transaction_store.count_read("collection")
+                return docs
+
+        pipeline = transaction_store.embedded_recent_pipeline(self.client_id, card_number, count, mode == "dual")
+        cards = await (await self.cards_col.aggregate(pipeline)).to_list()
+        if cards or mode == "embedded":
+            transaction_store.count_read("embedded", fallback=mode == "dual")
+        else:
+            transaction_store.count_read("collection")
+        txns = cards[0].get("transactions", []) if cards else []
+        docs = transaction_store.normalize_embedded(self.client_id, card_number, txns)
+        return transaction_store.newest_first(docs, count)
+
+    async def get_transactions_range(
+        self, card_number: str, start: datetime, end: datetime,
+        cursor: str | None = None, limit: int | None = None,
+    ) -> Tuple[List[Dict[str, Any]], str | None]:
+        limit = limit or transaction_store.page_size()
+        mode = transaction_store.read_mode()
+        if mode != "embedded":
+            query, sort = transaction_store.range_query(self.client_id, card_number, start, end, cursor)
+            docs = await self.transactions_col.find(query).sort(sort).limit(limit + 1).to_list()
+            if docs or mode == "collection":
+                transaction_store.count_read("collection")
+                return transaction_store.page(docs, limit)
+
+        txns = await self.get_transactions(card_number, unmigrated_only=mode == "dual")
+        if txns or mode == "embedded":
+            transaction_store.count_read("embedded", fallback=mode == "dual")
+        else:
+            transaction_store.count_read("collection")
+        docs = transaction_store.normalize_embedded(self.client_id, card_number, txns)
+        return transaction_store.page(transaction_store.filter_range(docs, start, end, cursor), limit)